@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""
+Import throughput benchmark
+- Generates deterministic synthetic account parquet files and proposals_predictions /
+  outreach CSVs at any scale (files are cached per row count and seed)
+- Runs each import path against a local MySQL database or a null sink
+  (null = read + convert only, the client-side cost of the path)
+- Every path runs in its own process so peak RSS is per path
+- Writes rows/sec, bytes/sec and peak RSS to a JSON file; --compare diffs two runs
+
+Usage:
+  python3 benchmark_imports.py --rows 1000000 --target null
+  python3 benchmark_imports.py --rows 5000000 --target mysql --database proxy_bench --output after.json
+  python3 benchmark_imports.py --compare before.json after.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+from db_drivers import default_driver
+from parquet_ingest import get_table_config
+
+# Import paths the harness knows how to run
+BENCHMARK_PATHS = ("sds_load_data", "sds_batch_insert", "sel_import", "outreach_csv", "proposals_csv")
+
+# Rows generated per chunk (a multiple of ROWS_PER_PROPOSAL, so proposals never straddle chunks)
+GENERATE_CHUNK_ROWS = 1000000
+
+# Accounts per synthetic proposal
+ROWS_PER_PROPOSAL = 2000
+
+# Parquet row group size of the synthetic account files
+ROW_GROUP_ROWS = 500000
+
+ACCOUNT_TYPES = ["Institution", "Individual", "Broker", "Fund", "Trust"]
+
+# proposals_predictions CSV header, as exported by the prediction notebooks
+PROPOSALS_CSV_COLUMNS = [
+    'proposal_master_skey', 'director_master_skey', 'final_key', 'job_number', 'issuer_name',
+    'service', 'cusip6', 'mt_date', 'ml_date', 'record_date', 'mgmt_rec', 'proposal',
+    'proposal_type', 'director_number', 'director_name', 'Category', 'Subcategory',
+    'predicted_for_shares', 'predicted_against_shares', 'predicted_abstain_shares',
+    'predicted_unvoted_shares', 'total_for_shares', 'total_against_shares',
+    'total_abstain_shares', 'total_unvoted_shares', 'ForRatioAmongVoted', 'ForRatioAmongElig',
+    'VotingRatio', 'ForRatioAmongVoted_true', 'ForRatioAmongElig_true', 'VotingRatio_true',
+    'ForRatioAmongVotedInclAbs', 'ForRatioAmongEligInclAbs', 'VotingRatioInclAbs',
+    'ForRatioAmongVotedInclAbs_true', 'ForRatioAmongEligInclAbs_true', 'VotingRatioInclAbs_true',
+    'For %', 'Against %', 'Abstain %', 'For % True', 'Against % True', 'Abstain % True',
+    'prediction_correct', 'approved', 'For (%) - From Prospectus 2026 File',
+    'Against (%) - From Prospectus 2026 File', 'Abstain/Withhold (%) - From Prospectus 2026 File',
+    'merged_proposal'
+]
+
+def _hash_keys(rng, n):
+    """32-character hex account keys"""
+    values = rng.integers(0, np.iinfo(np.int64).max, size=n, dtype=np.int64)
+    return pd.Series(values).map('{:032x}'.format).to_numpy()
+
+def _account_chunk(rng, start, n, config):
+    """One sorted chunk of account rows shaped like the config's source file"""
+    proposal = (start + np.arange(n)) // ROWS_PER_PROPOSAL + 1
+    director = np.where(rng.random(n) < 0.2, proposal % 50 + 1, -1)
+    data = {
+        'account_hash_key': _hash_keys(rng, n),
+        'proposal_master_skey': proposal,
+        'director_master_skey': director,
+        'account_type': rng.choice(ACCOUNT_TYPES, size=n),
+        'shares_summable': np.round(rng.lognormal(8, 2, size=n), 2),
+        'rank_of_shareholding': rng.integers(1, 5000, size=n),
+        config['score_field']: rng.random(n),
+        config['prediction_field']: (rng.random(n) < 0.5).astype(np.int64),
+        'Target_encoded': rng.integers(0, 2, size=n),
+    }
+    table = pa.table({column: data[column] for column in config['columns']})
+    return table.sort_by([(column, "ascending") for column in
+                          ('proposal_master_skey', 'director_master_skey', 'account_hash_key')])
+
+def generate_account_parquet(path, rows, table_name="account_voted", variant="sds", seed=42):
+    """Deterministic *_sorted.parquet-like account file"""
+    config = get_table_config(table_name, variant)
+    writer = None
+    try:
+        for chunk_index, start in enumerate(range(0, rows, GENERATE_CHUNK_ROWS)):
+            rng = np.random.default_rng([seed, chunk_index])
+            table = _account_chunk(rng, start, min(GENERATE_CHUNK_ROWS, rows - start), config)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema, compression='snappy')
+            writer.write_table(table, row_group_size=ROW_GROUP_ROWS)
+    finally:
+        if writer is not None:
+            writer.close()
+
+def _proposals_chunk(rng, start, n):
+    """One chunk of proposals_predictions CSV rows (all fields as text, like the exports)"""
+    skey = start + np.arange(n) + 1
+    shares = lambda: rng.integers(0, 10**9, size=n).astype(str)
+    ratio = lambda: np.round(rng.random(n), 4).astype(str)
+    dates = pd.to_datetime("2025-01-01") + pd.to_timedelta(rng.integers(0, 240, size=n), unit="D")
+    text = lambda prefix: np.char.add(prefix, (skey % 997).astype(str))
+    data = {
+        'proposal_master_skey': skey.astype(str),
+        'director_master_skey': np.where(rng.random(n) < 0.3, (skey % 50 + 1).astype(str), "-1"),
+        'final_key': text("FK"), 'job_number': text("J"), 'issuer_name': text("Issuer "),
+        'service': np.full(n, "Full"), 'cusip6': text("C"),
+        'mt_date': dates.strftime("%m/%d/%Y").to_numpy(), 'ml_date': dates.strftime("%m/%d/%Y").to_numpy(),
+        'record_date': dates.strftime("%Y-%m-%d").to_numpy(), 'mgmt_rec': np.full(n, "For"),
+        'proposal': text("Proposal text "), 'proposal_type': np.full(n, "Management"),
+        'director_number': rng.integers(1, 12, size=n).astype(str), 'director_name': text("Director "),
+        'Category': np.full(n, "Governance"), 'Subcategory': np.full(n, "Board"),
+        'prediction_correct': rng.integers(0, 2, size=n).astype(str),
+        'approved': rng.integers(0, 2, size=n).astype(str),
+        'merged_proposal': text("merged "),
+    }
+    for column in PROPOSALS_CSV_COLUMNS:
+        if column in data:
+            continue
+        data[column] = shares() if 'shares' in column else ratio()
+    return pa.table({column: data[column] for column in PROPOSALS_CSV_COLUMNS})
+
+def _outreach_chunk(rng, start, n):
+    """One chunk of outreach CSV rows"""
+    index = start + np.arange(n)
+    return pa.table({
+        'row_index': index.astype(str),
+        'unnamed_col': index.astype(str),
+        'account_hash_key': _hash_keys(rng, n),
+        'proposal_master_skey': (index // ROWS_PER_PROPOSAL + 1).astype(str),
+        'director_master_skey': np.full(n, "-1"),
+        'account_type': rng.choice(ACCOUNT_TYPES, size=n),
+        'shares_summable': np.round(rng.lognormal(8, 2, size=n), 2).astype(str),
+        'rank_of_shareholding': rng.integers(1, 5000, size=n).astype(str),
+        'score_model1': np.round(rng.random(n), 6).astype(str),
+        'prediction_model1': rng.integers(0, 2, size=n).astype(str),
+        'Target_encoded': rng.integers(0, 2, size=n).astype(str),
+    })
+
+def generate_csv(path, rows, make_chunk, seed=42):
+    """Deterministic CSV written chunk by chunk"""
+    writer = None
+    try:
+        for chunk_index, start in enumerate(range(0, rows, GENERATE_CHUNK_ROWS)):
+            rng = np.random.default_rng([seed, chunk_index])
+            table = make_chunk(rng, start, min(GENERATE_CHUNK_ROWS, rows - start))
+            if writer is None:
+                writer = pacsv.CSVWriter(path, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+def prepare_datasets(data_dir, rows, csv_rows, table_name, seed):
+    """Generate (or reuse) every benchmark input; returns {name: path}"""
+    os.makedirs(data_dir, exist_ok=True)
+    datasets = {
+        'sds_parquet': (f"bench_sds_{table_name}_{rows}_{seed}.parquet",
+                        lambda path: generate_account_parquet(path, rows, table_name, "sds", seed)),
+        'sel_parquet': (f"bench_sel_{table_name}_{rows}_{seed}.parquet",
+                        lambda path: generate_account_parquet(path, rows, table_name, "sel", seed)),
+        'outreach_csv': (f"bench_outreach_{csv_rows}_{seed}.csv",
+                         lambda path: generate_csv(path, csv_rows, _outreach_chunk, seed)),
+        'proposals_csv': (f"bench_proposals_{csv_rows}_{seed}.csv",
+                          lambda path: generate_csv(path, csv_rows, _proposals_chunk, seed)),
+    }
+    paths = {}
+    for name, (file_name, generate) in datasets.items():
+        path = os.path.join(data_dir, file_name)
+        if not os.path.exists(path):
+            print(f"🧪 Generating {path}...")
+            start_time = time.time()
+            generate(path + ".tmp")
+            os.replace(path + ".tmp", path)
+            print(f"✅ Generated in {time.time() - start_time:.1f}s ({os.path.getsize(path) / 1024**2:,.1f} MB)")
+        paths[name] = path
+    return paths
+
+def account_table_ddl(table_name, config):
+    """Benchmark account table with the importer's column names"""
+    types = {'string': 'VARCHAR(255)', 'int': 'BIGINT', 'float': 'DOUBLE'}
+    columns = ",\n        ".join(f"{column} {types[config['column_types'][column]]}" for column in config['columns'])
+    return f"""
+    CREATE TABLE {table_name} (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        {columns},
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        INDEX idx_proposal_skey (proposal_master_skey)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+    """
+
+def _fresh_account_table(connection, table_name, variant):
+    """Recreate the benchmark account table and forget its manifest rows"""
+    from import_manifest import ensure_manifest_table, MANIFEST_TABLE
+    cursor = connection.cursor()
+    cursor.execute(f"DROP TABLE IF EXISTS {table_name}")
+    cursor.execute(account_table_ddl(table_name, get_table_config(table_name, variant)))
+    ensure_manifest_table(connection)
+    cursor.execute(f"DELETE FROM {MANIFEST_TABLE} WHERE target_table = %s", (table_name,))
+    connection.commit()
+    cursor.close()
+
+def _count_rows(database, table_name):
+    from ingest_engine import connect_mysql
+    connection = connect_mysql(database, prompt_root=False)
+    cursor = connection.cursor()
+    cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
+    rows = cursor.fetchone()[0]
+    cursor.close()
+    connection.close()
+    return rows
+
+def run_null_path(path, source, table_name, memory_budget):
+    """Read + convert only; returns the number of rows produced"""
+    from parquet_ingest import (open_account_parquet, read_account_row_group, convert_arrow_table,
+                                iter_tsv_chunks, arrow_to_rows)
+    from ingest_engine import CsvSource, NullSink, column_transform, run_ingest
+    if path in ("sds_load_data", "sds_batch_insert"):
+        config = get_table_config(table_name, "sds")
+        pf = open_account_parquet(source)
+        rows = 0
+        for row_group_idx in range(pf.num_row_groups):
+            converted = convert_arrow_table(read_account_row_group(pf, row_group_idx, config), config)
+            if path == "sds_load_data":
+                for chunk in iter_tsv_chunks(converted):
+                    pass
+            else:
+                arrow_to_rows(converted)
+            rows += converted.num_rows
+        return rows
+    if path == "sel_import":
+        import import_proxy_sel_unified
+        _, _, batches = import_proxy_sel_unified.load_with_arrow(source, table_name, 1000, memory_budget)
+        return sum(len(batch) for batch in batches)
+    if path == "outreach_csv":
+        import import_outreach
+        transform = column_transform(import_outreach.OUTREACH_SPEC, required=('account_hash_key',))
+        return run_ingest(CsvSource(source), NullSink(), transform)['rows_written']
+    import import_proposals_predictions_bulk as bulk
+    transform = column_transform(bulk.PROPOSALS_PREDICTIONS_SPEC)
+    return run_ingest(CsvSource(source, exclude=bulk.is_merge_column), NullSink(), transform)['rows_written']
+
+def run_mysql_path(path, source, table_name, database, memory_budget):
+    """Run the real importer function into the benchmark database; returns the imported rows"""
+    from ingest_engine import connect_mysql, optimize_mysql_settings
+    if path == "outreach_csv":
+        import import_outreach
+        import_outreach.create_outreach_table(database)
+        import_outreach.import_csv_to_database(source, database)
+        return _count_rows(database, 'outreach')
+    if path == "proposals_csv":
+        import import_proposals_predictions_bulk as bulk
+        bulk.drop_and_create_proposals_predictions_table(database)
+        bulk.import_csv_to_database(source, database)
+        return _count_rows(database, 'proposals_predictions')
+
+    connection = connect_mysql(database, prompt_root=False)
+    if connection is None:
+        raise RuntimeError(f"could not connect to {database}")
+    try:
+        if path == "sel_import":
+            import import_proxy_sel_unified
+            _fresh_account_table(connection, table_name, "sel")
+            return import_proxy_sel_unified.import_parquet_to_table(connection, source, table_name, "arrow",
+                                                                    memory_budget=memory_budget)
+        import import_sds_unified_parquet
+        _fresh_account_table(connection, table_name, "sds")
+        optimize_mysql_settings(connection, verbose=False)
+        if path == "sds_load_data":
+            return import_sds_unified_parquet.import_parquet_with_load_data(connection, source, table_name)
+        return import_sds_unified_parquet.import_parquet_with_batch_insert(connection, source, table_name)
+    finally:
+        connection.close()
+
+def _run_case(case, results):
+    """Child process: run one path and report its own peak RSS"""
+    if not case['verbose']:
+        sys.stdout = open(os.devnull, 'w')
+    try:
+        start_time = time.perf_counter()
+        if case['target'] == 'null':
+            rows = run_null_path(case['path'], case['source'], case['table'], case['memory_budget'])
+        else:
+            rows = run_mysql_path(case['path'], case['source'], case['table'], case['database'], case['memory_budget'])
+        seconds = time.perf_counter() - start_time
+        results.put({'rows': int(rows or 0), 'seconds': seconds, 'error': None,
+                     'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024})
+    except Exception as e:
+        results.put({'rows': 0, 'seconds': 0.0, 'error': str(e),
+                     'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024})
+
+def run_case(case):
+    """Run one benchmark case in a fresh process and collect its metrics"""
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    process = context.Process(target=_run_case, args=(case, results))
+    process.start()
+    process.join()
+    result = results.get() if not results.empty() else {
+        'rows': 0, 'seconds': 0.0, 'peak_rss_mb': 0.0, 'error': f"exit code {process.exitcode}"}
+
+    source_bytes = os.path.getsize(case['source'])
+    seconds = result['seconds']
+    return {
+        'path': case['path'],
+        'target': case['target'],
+        'source': os.path.basename(case['source']),
+        'rows': result['rows'],
+        'seconds': round(seconds, 3),
+        'rows_per_sec': round(result['rows'] / seconds, 1) if seconds > 0 else 0.0,
+        'source_bytes': source_bytes,
+        'bytes_per_sec': round(source_bytes / seconds, 1) if seconds > 0 else 0.0,
+        'peak_rss_mb': round(result['peak_rss_mb'], 1),
+        'error': result['error'],
+    }
+
+def compare_runs(before_file, after_file):
+    """Print per-path throughput and memory changes between two result files"""
+    with open(before_file) as f:
+        before = {(r['path'], r['target']): r for r in json.load(f)['results']}
+    with open(after_file) as f:
+        after = json.load(f)['results']
+
+    print(f"{'path':<18} {'target':<6} {'rows/sec before':>16} {'after':>12} {'change':>8} {'RSS MB':>14}")
+    for result in after:
+        old = before.get((result['path'], result['target']))
+        if old is None or not old['rows_per_sec']:
+            print(f"{result['path']:<18} {result['target']:<6} {'-':>16} {result['rows_per_sec']:>12,.0f}")
+            continue
+        change = (result['rows_per_sec'] / old['rows_per_sec'] - 1) * 100
+        print(f"{result['path']:<18} {result['target']:<6} {old['rows_per_sec']:>16,.0f} "
+              f"{result['rows_per_sec']:>12,.0f} {change:>+7.1f}% "
+              f"{old['peak_rss_mb']:>6,.0f}→{result['peak_rss_mb']:<6,.0f}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the parquet and CSV import paths')
+    parser.add_argument('--rows', type=int, default=1000000,
+                       help='Rows in the synthetic account parquet files (default: 1000000)')
+    parser.add_argument('--csv-rows', type=int,
+                       help='Rows in the synthetic CSV files (default: --rows)')
+    parser.add_argument('--paths', default=','.join(BENCHMARK_PATHS),
+                       help=f"Comma-separated import paths (default: all of {', '.join(BENCHMARK_PATHS)})")
+    parser.add_argument('--target', choices=['null', 'mysql'], default='null',
+                       help='null: read + convert only; mysql: run the importers against --database')
+    parser.add_argument('--database', default='proxy_bench',
+                       help='Scratch database for --target mysql (tables are dropped and recreated)')
+    parser.add_argument('--table', choices=['account_voted', 'account_unvoted'], default='account_voted',
+                       help='Account table layout to generate and load (default: account_voted)')
+    parser.add_argument('--data-dir', default='./benchmark_data',
+                       help='Where synthetic inputs are generated and cached (default: ./benchmark_data)')
+    parser.add_argument('--seed', type=int, default=42, help='Generator seed (default: 42)')
+    parser.add_argument('--memory-budget-mb', type=int, default=512,
+                       help='Streaming memory budget of the SEL path in MB (default: 512)')
+    parser.add_argument('--output', default='benchmark_results.json', help='Result file (default: benchmark_results.json)')
+    parser.add_argument('--source-cache', action='store_true',
+                       help='Read the CSVs through the decoded source cache (default: parse them on every run)')
+    parser.add_argument('--verbose', action='store_true', help='Show the importers\' own output')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'), help='Compare two result files and exit')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare_runs(*args.compare)
+        return
+
+    paths = [path.strip() for path in args.paths.split(',') if path.strip()]
+    unknown = [path for path in paths if path not in BENCHMARK_PATHS]
+    if unknown:
+        parser.error(f"unknown path(s): {', '.join(unknown)}")
+
+    if not args.source_cache:
+        # Inherited by the spawned path processes; a warm cache would skip the CSV parse being measured
+        os.environ["IMPORT_SOURCE_CACHE_MB"] = "0"
+
+    print("=== Import Throughput Benchmark ===")
+    datasets = prepare_datasets(args.data_dir, args.rows, args.csv_rows or args.rows, args.table, args.seed)
+    sources = {
+        'sds_load_data': datasets['sds_parquet'],
+        'sds_batch_insert': datasets['sds_parquet'],
+        'sel_import': datasets['sel_parquet'],
+        'outreach_csv': datasets['outreach_csv'],
+        'proposals_csv': datasets['proposals_csv'],
+    }
+
+    results = []
+    for path in paths:
+        print(f"⏱️ {path} → {args.target}...")
+        result = run_case({
+            'path': path, 'target': args.target, 'source': sources[path], 'table': args.table,
+            'database': args.database, 'memory_budget': args.memory_budget_mb * 1024 * 1024,
+            'verbose': args.verbose,
+        })
+        results.append(result)
+        if result['error']:
+            print(f"  ❌ {result['error']}")
+        else:
+            print(f"  ✅ {result['rows']:,} rows in {result['seconds']:.1f}s - {result['rows_per_sec']:,.0f} rows/sec, "
+                  f"{result['bytes_per_sec'] / 1024**2:,.1f} MB/sec, peak RSS {result['peak_rss_mb']:,.0f} MB")
+
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'host': platform.node(),
+        'python': platform.python_version(),
+        'pyarrow': pa.__version__,
+        'rows': args.rows,
+        'csv_rows': args.csv_rows or args.rows,
+        'seed': args.seed,
+        'target': args.target,
+        'source_cache': args.source_cache,
+        'driver': default_driver() if args.target == 'mysql' else None,
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"📄 Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Selectable MySQL driver backends for the import tooling
+- mysql-connector-c: mysql.connector with the C extension
+- mysqlclient: MySQLdb (libmysqlclient), when installed
+- pymysql: PyMySQL (pure Python)
+- mysql-connector: mysql.connector pure Python implementation
+
+All backends take the mysql.connector style options used by ingest_engine and
+return DB-API connections with %s placeholders, multi-row executemany rewriting and
+LOAD DATA LOCAL INFILE support.
+
+The default is IMPORT_DB_DRIVER when set, else the fastest backend in the last
+benchmark (python3 db_drivers.py --benchmark), else the first available one in
+DRIVER_PREFERENCE.
+
+Usage:
+  python3 db_drivers.py                       # list available backends
+  python3 db_drivers.py --benchmark --database proxy_bench --rows 200000
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+# Fastest first when no benchmark results exist
+DRIVER_PREFERENCE = ("mysqlclient", "mysql-connector-c", "pymysql", "mysql-connector")
+
+# Benchmark results consulted by the default selection
+DRIVER_BENCHMARK_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "db_driver_benchmark.json")
+
+# mysql.connector options the other drivers do not understand
+_CONNECTOR_ONLY_OPTIONS = ("raise_on_warnings", "allow_local_infile", "use_pure", "buffered")
+
+def _load_module(name):
+    try:
+        return __import__(name, fromlist=["*"])
+    except ImportError:
+        return None
+
+_mysql_connector = _load_module("mysql.connector")
+_pymysql = _load_module("pymysql")
+_mysqldb = _load_module("MySQLdb")
+
+def _connector_options(options, use_pure):
+    return dict(options, use_pure=use_pure)
+
+def _libmysql_options(options):
+    """mysql.connector options translated for PyMySQL / mysqlclient"""
+    translated = {key: value for key, value in options.items() if key not in _CONNECTOR_ONLY_OPTIONS}
+    if options.get('allow_local_infile'):
+        translated['local_infile'] = True
+    return translated
+
+class DriverBackend:
+    """One MySQL client library behind the ingest_engine connection interface"""
+
+    def __init__(self, name, module, connect, translate, available, error, integrity_error):
+        self.name = name
+        self.module = module
+        self._connect = connect
+        self._translate = translate
+        self.available = available
+        self.Error = error
+        self.IntegrityError = integrity_error
+
+    def connect(self, **options):
+        return self._connect(**self._translate(options))
+
+    def version(self):
+        return getattr(self.module, '__version__', None) or getattr(self.module, 'version_info', '')
+
+def _backends():
+    backends = {}
+    if _mysql_connector is not None:
+        have_cext = bool(getattr(_mysql_connector, 'HAVE_CEXT', False))
+        for name, use_pure, available in (("mysql-connector-c", False, have_cext), ("mysql-connector", True, True)):
+            backends[name] = DriverBackend(
+                name, _mysql_connector, _mysql_connector.connect,
+                lambda options, use_pure=use_pure: _connector_options(options, use_pure),
+                available, _mysql_connector.Error, _mysql_connector.IntegrityError)
+    if _pymysql is not None:
+        backends["pymysql"] = DriverBackend("pymysql", _pymysql, _pymysql.connect, _libmysql_options, True,
+                                            _pymysql.err.MySQLError, _pymysql.err.IntegrityError)
+    if _mysqldb is not None:
+        backends["mysqlclient"] = DriverBackend("mysqlclient", _mysqldb, _mysqldb.connect, _libmysql_options, True,
+                                                _mysqldb.MySQLError, _mysqldb.IntegrityError)
+    return backends
+
+BACKENDS = _backends()
+
+# Catch-alls for code that must handle errors from whichever backend is active
+DRIVER_ERRORS = tuple({backend.Error for backend in BACKENDS.values()}) or (Exception,)
+INTEGRITY_ERRORS = tuple({backend.IntegrityError for backend in BACKENDS.values()}) or (Exception,)
+
+_selected = None
+
+def available_drivers():
+    return [name for name in DRIVER_PREFERENCE if name in BACKENDS and BACKENDS[name].available]
+
+def error_code(error):
+    """MySQL error number of any backend's exception (None when there is none)"""
+    code = getattr(error, 'errno', None)
+    if code is None and getattr(error, 'args', None) and isinstance(error.args[0], int):
+        code = error.args[0]
+    return code
+
+def streaming_cursor(connection):
+    """Unbuffered cursor for any backend's connection (rows are fetched as they are read)"""
+    module = type(connection).__module__
+    if module.startswith('pymysql'):
+        return connection.cursor(_pymysql.cursors.SSCursor)
+    if module.startswith('MySQLdb'):
+        return connection.cursor(_mysqldb.cursors.SSCursor)
+    return connection.cursor(buffered=False)
+
+def whole_statement_executemany(cursor):
+    """Make executemany send a multi-row INSERT as one statement; returns whether it will
+
+    PyMySQL and mysqlclient split it into statements of max_stmt_length (about 1 MB and
+    64 KB), so a failure in a later piece would leave the earlier pieces applied.
+    mysql.connector never splits.
+    """
+    if hasattr(cursor, 'max_stmt_length'):
+        cursor.max_stmt_length = sys.maxsize
+        return True
+    return type(cursor).__module__.startswith('mysql.connector')
+
+def _benchmarked_driver():
+    """Fastest available backend of the last benchmark run, if any"""
+    try:
+        with open(DRIVER_BENCHMARK_FILE) as f:
+            results = json.load(f)['results']
+    except (OSError, ValueError, KeyError):
+        return None
+    available = set(available_drivers())
+    ranked = sorted((result for result in results if result['driver'] in available and not result.get('error')),
+                    key=lambda result: -(result.get('load_data_rows_per_sec') or result.get('executemany_rows_per_sec') or 0))
+    return ranked[0]['driver'] if ranked else None
+
+def default_driver():
+    """IMPORT_DB_DRIVER, else the benchmark winner, else the preferred available backend"""
+    requested = os.environ.get("IMPORT_DB_DRIVER")
+    if requested:
+        return requested
+    available = available_drivers()
+    if not available:
+        raise RuntimeError("No MySQL driver installed (mysql-connector-python, PyMySQL or mysqlclient)")
+    return _benchmarked_driver() or available[0]
+
+def select_driver(name=None):
+    """Make name (or the default) the backend used by every new connection"""
+    global _selected
+    name = name or default_driver()
+    backend = BACKENDS.get(name)
+    if backend is None or not backend.available:
+        raise ValueError(f"MySQL driver '{name}' is not available (installed: {', '.join(available_drivers()) or 'none'})")
+    _selected = backend
+    return backend
+
+def get_driver():
+    if _selected is None:
+        select_driver()
+    return _selected
+
+def connect(**options):
+    """Connection from the selected backend; options use mysql.connector names"""
+    return get_driver().connect(**options)
+
+def add_driver_argument(parser):
+    parser.add_argument('--driver', choices=list(DRIVER_PREFERENCE), default=os.environ.get("IMPORT_DB_DRIVER"),
+                        help='MySQL driver backend (default: fastest available, see db_drivers.py --benchmark)')
+
+def configure_driver_from_args(args):
+    backend = select_driver(args.driver)
+    print(f"🔌 MySQL driver: {backend.name}")
+    return backend
+
+BENCHMARK_TABLE = "driver_benchmark"
+
+def _benchmark_rows(rows):
+    return [(f"{i:032x}", i // 2000 + 1, -1, "Institution", i * 1.5, i % 5000, (i % 1000) / 1000.0, i % 2)
+            for i in range(rows)]
+
+def benchmark_driver(name, database, rows, batch_size=5000):
+    """executemany and LOAD DATA LOCAL throughput of one backend"""
+    import pyarrow as pa
+    from ingest_engine import BULK_CONNECTION_OPTIONS, SESSION_CREDENTIALS, WEBAPP_CREDENTIALS
+    from parquet_ingest import iter_tsv_chunks, load_data_from_stream
+
+    backend = select_driver(name)
+    columns = ["account_hash_key", "proposal_master_skey", "director_master_skey", "account_type",
+               "shares_summable", "rank_of_shareholding", "score", "prediction"]
+    data = _benchmark_rows(rows)
+    result = {'driver': name, 'version': str(backend.version()), 'rows': rows, 'error': None}
+
+    credentials = SESSION_CREDENTIALS.get(database, WEBAPP_CREDENTIALS)
+    connection = backend.connect(database=database, **credentials, **BULK_CONNECTION_OPTIONS)
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"DROP TABLE IF EXISTS {BENCHMARK_TABLE}")
+        cursor.execute(f"""
+            CREATE TABLE {BENCHMARK_TABLE} (
+                id BIGINT AUTO_INCREMENT PRIMARY KEY,
+                account_hash_key VARCHAR(64), proposal_master_skey BIGINT, director_master_skey BIGINT,
+                account_type VARCHAR(32), shares_summable DOUBLE, rank_of_shareholding INT,
+                score DOUBLE, prediction TINYINT
+            ) ENGINE=InnoDB
+        """)
+        insert_query = (f"INSERT INTO {BENCHMARK_TABLE} ({', '.join(columns)}) "
+                        f"VALUES ({', '.join(['%s'] * len(columns))})")
+        start_time = time.perf_counter()
+        for i in range(0, rows, batch_size):
+            cursor.executemany(insert_query, data[i:i + batch_size])
+            connection.commit()
+        seconds = time.perf_counter() - start_time
+        result['executemany_seconds'] = round(seconds, 3)
+        result['executemany_rows_per_sec'] = round(rows / seconds, 1) if seconds > 0 else 0.0
+
+        cursor.execute(f"TRUNCATE TABLE {BENCHMARK_TABLE}")
+        table = pa.table(dict(zip(columns, zip(*data))))
+        try:
+            start_time = time.perf_counter()
+            load_data_from_stream(cursor, BENCHMARK_TABLE, f"({', '.join(columns)})", iter_tsv_chunks(table))
+            connection.commit()
+            seconds = time.perf_counter() - start_time
+            result['load_data_seconds'] = round(seconds, 3)
+            result['load_data_rows_per_sec'] = round(rows / seconds, 1) if seconds > 0 else 0.0
+        except DRIVER_ERRORS as e:
+            # local_infile disabled on the server or the client
+            result['load_data_rows_per_sec'] = None
+            result['load_data_error'] = str(e)
+        cursor.execute(f"DROP TABLE IF EXISTS {BENCHMARK_TABLE}")
+    finally:
+        cursor.close()
+        connection.close()
+    return result
+
+def run_benchmark(database, rows, output=DRIVER_BENCHMARK_FILE):
+    """Benchmark every available backend and save the results for default_driver()"""
+    results = []
+    for name in available_drivers():
+        print(f"⏱️ {name}...")
+        try:
+            result = benchmark_driver(name, database, rows)
+            load_rate = result.get('load_data_rows_per_sec')
+            print(f"  ✅ executemany {result['executemany_rows_per_sec']:,.0f} rows/sec, LOAD DATA "
+                  + (f"{load_rate:,.0f} rows/sec" if load_rate else f"unavailable ({result.get('load_data_error')})"))
+        except Exception as e:
+            print(f"  ❌ {name} failed: {e}")
+            result = {'driver': name, 'rows': rows, 'error': str(e)}
+        results.append(result)
+
+    with open(output, 'w') as f:
+        json.dump({'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'database': database, 'results': results}, f, indent=2)
+    print(f"📄 Results written to {output}")
+    print(f"🏆 Default driver is now: {_benchmarked_driver() or default_driver()}")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='List or benchmark the MySQL driver backends')
+    parser.add_argument('--benchmark', action='store_true', help='Benchmark executemany and LOAD DATA LOCAL per backend')
+    parser.add_argument('--database', default='proxy_bench', help='Scratch database for --benchmark (default: proxy_bench)')
+    parser.add_argument('--rows', type=int, default=200000, help='Rows per benchmark (default: 200000)')
+    args = parser.parse_args()
+
+    if args.benchmark:
+        run_benchmark(args.database, args.rows)
+        return
+
+    for name in DRIVER_PREFERENCE:
+        backend = BACKENDS.get(name)
+        status = "✅ available" if backend and backend.available else "❌ not installed"
+        version = f" ({backend.version()})" if backend and backend.available else ""
+        print(f"  {name:<18} {status}{version}")
+    print(f"🔌 Default driver: {default_driver()}")
+
+if __name__ == "__main__":
+    main()
@@ -2,13 +2,35 @@
 """
 Optimize SQL dumps by converting individual INSERT statements to bulk format
 This will dramatically improve import performance by reducing transaction overhead
+
+The rewrite is sequential by default. Pass --workers N (N > 1) to opt in to the
+parallel mode: the dump is split into line-aligned chunks of --chunk-mb that are
+rewritten (and gzip-compressed) in a process pool and written back in order, while
+one thread decompresses the input and another writes the output. A run of INSERTs
+crossing a chunk boundary becomes two bulk INSERTs; rows and their order are unchanged.
+Up to N + 1 chunks are in flight, each held several times over (text, rewritten text,
+compressed output), so size N and --chunk-mb to the build host's memory.
 """
 
+import argparse
+import io
 import re
 import sys
 import gzip
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+INSERT_PATTERN = re.compile(r'^INSERT INTO `([^`]+)` VALUES (.+);$')
+
+# Uncompressed bytes per chunk of the parallel mode
+CHUNK_BYTES = 32 * 1024 * 1024
+
+# gzip.open's default, so .gz outputs match the sequential mode
+COMPRESS_LEVEL = 9
+
 def optimize_sql_dump(input_file, output_file, batch_size=1000):
     """Convert individual INSERT statements to bulk INSERT format"""
     
@@ -27,61 +49,188 @@ def optimize_sql_dump(input_file, output_file, batch_size=1000):
         output_handle = open(output_file, 'w', encoding='utf-8')
     
     try:
-        current_table = None
-        current_batch = []
-        insert_pattern = re.compile(r'^INSERT INTO `([^`]+)` VALUES (.+);$')
-        lines_processed = 0
-        inserts_converted = 0
+        lines_processed, inserts_converted = rewrite_lines(input_handle, output_handle, batch_size, progress=True)
         
-        for line in input_handle:
-            lines_processed += 1
-            if lines_processed % 100000 == 0:
-                print(f"📈 Processed {lines_processed:,} lines, converted {inserts_converted:,} INSERTs...")
-            
-            # Check if this is an INSERT statement
-            match = insert_pattern.match(line.strip())
-            
-            if match:
-                table_name = match.group(1)
-                values_part = match.group(2)
-                
-                # If we're starting a new table, flush previous batch
-                if table_name != current_table:
-                    if current_batch and current_table:
-                        _write_batch(output_handle, current_table, current_batch)
-                        inserts_converted += len(current_batch)
-                        current_batch = []
-                    current_table = table_name
-                
-                # Add values to current batch
-                current_batch.append(values_part)
-                
-                # Write batch if it's full
-                if len(current_batch) >= batch_size:
-                    _write_batch(output_handle, current_table, current_batch)
-                    inserts_converted += len(current_batch)
-                    current_batch = []
+        print(f"✅ Optimization complete!")
+        print(f"📊 Lines processed: {lines_processed:,}")
+        print(f"🚀 INSERT statements converted: {inserts_converted:,}")
+        
+    finally:
+        input_handle.close()
+        output_handle.close()
+
+def rewrite_lines(lines, output_handle, batch_size=1000, progress=False):
+    """Rewrite runs of single-row INSERTs as bulk INSERTs; returns (lines, INSERTs converted)"""
+    current_table = None
+    current_batch = []
+    lines_processed = 0
+    inserts_converted = 0
+    
+    for line in lines:
+        lines_processed += 1
+        if progress and lines_processed % 100000 == 0:
+            print(f"📈 Processed {lines_processed:,} lines, converted {inserts_converted:,} INSERTs...")
+        
+        # Check if this is an INSERT statement
+        match = INSERT_PATTERN.match(line.strip())
+        
+        if match:
+            table_name = match.group(1)
+            values_part = match.group(2)
             
-            else:
-                # Not an INSERT statement - write as-is, but flush batch first
+            # If we're starting a new table, flush previous batch
+            if table_name != current_table:
                 if current_batch and current_table:
                     _write_batch(output_handle, current_table, current_batch)
                     inserts_converted += len(current_batch)
                     current_batch = []
-                    current_table = None
+                current_table = table_name
+            
+            # Add values to current batch
+            current_batch.append(values_part)
+            
+            # Write batch if it's full
+            if len(current_batch) >= batch_size:
+                _write_batch(output_handle, current_table, current_batch)
+                inserts_converted += len(current_batch)
+                current_batch = []
+        
+        else:
+            # Not an INSERT statement - write as-is, but flush batch first
+            if current_batch and current_table:
+                _write_batch(output_handle, current_table, current_batch)
+                inserts_converted += len(current_batch)
+                current_batch = []
+                current_table = None
+            
+            output_handle.write(line)
+    
+    # Flush any remaining batch
+    if current_batch and current_table:
+        _write_batch(output_handle, current_table, current_batch)
+        inserts_converted += len(current_batch)
+    
+    return lines_processed, inserts_converted
+
+def rewrite_chunk(data, batch_size, compress):
+    """Process pool task: rewrite one line-aligned chunk; returns (output bytes, lines, INSERTs)"""
+    # Universal newlines, like the text-mode files of the sequential mode
+    lines = io.StringIO(data.decode('utf-8'), newline=None)
+    output = io.StringIO()
+    lines_processed, inserts_converted = rewrite_lines(lines, output, batch_size)
+    result = output.getvalue().encode('utf-8')
+    if compress is not None:
+        # Concatenated gzip members form one valid .gz stream (gzip -d, zcat and gzip.open read it)
+        result = gzip.compress(result, compresslevel=compress)
+    return result, lines_processed, inserts_converted
+
+def _open_binary(path, mode):
+    if str(path).endswith('.gz'):
+        # Chunks arrive compressed, so only the input side goes through gzip here
+        return gzip.open(path, mode) if 'r' in mode else open(path, mode)
+    return open(path, mode)
+
+def _read_chunks(input_handle, chunk_bytes, chunks, stop):
+    """Reader thread: decompress and split the input at line ends into roughly chunk_bytes"""
+    try:
+        while not stop.is_set():
+            data = input_handle.read(chunk_bytes)
+            if not data:
+                break
+            if not data.endswith(b'\n'):
+                data += input_handle.readline()
+            chunks.put(data)
+    except Exception as e:
+        chunks.put(e)
+    chunks.put(None)
+
+def _write_chunks(output_handle, results, errors):
+    """Writer thread: write rewritten chunks in input order"""
+    while True:
+        data = results.get()
+        if data is None:
+            break
+        if errors:
+            continue  # keep draining so the main thread never blocks
+        try:
+            output_handle.write(data)
+        except Exception as e:
+            errors.append(e)
+
+def optimize_sql_dump_parallel(input_file, output_file, batch_size=1000, workers=2,
+                               chunk_bytes=CHUNK_BYTES, compresslevel=COMPRESS_LEVEL):
+    """optimize_sql_dump with chunks rewritten in a process pool and written back in order"""
+    workers = max(1, workers)
+    compress = compresslevel if str(output_file).endswith('.gz') else None
+    
+    print(f"🔄 Optimizing {input_file} -> {output_file}")
+    print(f"📊 Batch size: {batch_size} rows per INSERT, {workers} workers, "
+          f"{chunk_bytes / 1024 / 1024:.0f} MB chunks")
+    
+    input_handle = _open_binary(input_file, 'rb')
+    output_handle = _open_binary(output_file, 'wb')
+    
+    # Bounded queues: about two chunks per worker are held in memory
+    chunks = queue.Queue(maxsize=2)
+    results = queue.Queue(maxsize=2)
+    stop = threading.Event()
+    write_errors = []
+    reader = threading.Thread(target=_read_chunks, args=(input_handle, chunk_bytes, chunks, stop), daemon=True)
+    writer = threading.Thread(target=_write_chunks, args=(output_handle, results, write_errors), daemon=True)
+    reader.start()
+    writer.start()
+    
+    lines_processed = 0
+    inserts_converted = 0
+    chunk_count = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            done_reading = False
+            while not done_reading or pending:
+                # Keep every worker busy plus one chunk queued for the next free one
+                while not done_reading and len(pending) < workers + 1:
+                    data = chunks.get()
+                    if data is None:
+                        done_reading = True
+                    elif isinstance(data, Exception):
+                        raise data
+                    else:
+                        pending.append(pool.submit(rewrite_chunk, data, batch_size, compress))
+                if not pending:
+                    break
                 
-                output_handle.write(line)
+                data, lines, inserts = pending.popleft().result()
+                if write_errors:
+                    raise write_errors[0]
+                results.put(data)
+                lines_processed += lines
+                inserts_converted += inserts
+                chunk_count += 1
+                print(f"📈 Chunk {chunk_count:,}: processed {lines_processed:,} lines, "
+                      f"converted {inserts_converted:,} INSERTs...")
         
-        # Flush any remaining batch
-        if current_batch and current_table:
-            _write_batch(output_handle, current_table, current_batch)
-            inserts_converted += len(current_batch)
+        results.put(None)
+        writer.join()
+        if write_errors:
+            raise write_errors[0]
         
         print(f"✅ Optimization complete!")
         print(f"📊 Lines processed: {lines_processed:,}")
         print(f"🚀 INSERT statements converted: {inserts_converted:,}")
-        
+    
     finally:
+        stop.set()
+        # Unblock both threads whatever state they were left in
+        while reader.is_alive():
+            try:
+                chunks.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        if writer.is_alive():
+            write_errors.append(RuntimeError("aborted"))
+            results.put(None)
+            writer.join()
         input_handle.close()
         output_handle.close()
 
@@ -103,12 +252,21 @@ def _write_batch(output_handle, table_name, batch):
             output_handle.write(f"{values},\n")
 
 def main():
-    if len(sys.argv) != 3:
-        print("Usage: python3 optimize_sql_dumps.py input.sql output.sql")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description='Rewrite single-row INSERTs of a SQL dump (.sql or .sql.gz) as bulk INSERTs')
+    parser.add_argument('input_file', type=Path)
+    parser.add_argument('output_file', type=Path)
+    parser.add_argument('--batch-size', type=int, default=1000, help='Rows per bulk INSERT (default: 1000)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Processes rewriting chunks in parallel, e.g. 4; memory grows with '
+                             'workers x --chunk-mb (default: 1 = sequential)')
+    parser.add_argument('--chunk-mb', type=int, default=CHUNK_BYTES // (1024 * 1024),
+                        help='Uncompressed MB per parallel chunk (default: %(default)s)')
+    parser.add_argument('--compresslevel', type=int, default=COMPRESS_LEVEL,
+                        help='gzip level of a .gz output in parallel mode (default: %(default)s)')
+    args = parser.parse_args()
     
-    input_file = Path(sys.argv[1])
-    output_file = Path(sys.argv[2])
+    input_file = args.input_file
+    output_file = args.output_file
     
     if not input_file.exists():
         print(f"❌ Input file not found: {input_file}")
@@ -118,7 +276,11 @@ def main():
     input_size = input_file.stat().st_size
     print(f"📂 Input file: {input_file} ({input_size / 1024 / 1024 / 1024:.1f} GB)")
     
-    optimize_sql_dump(input_file, output_file)
+    if args.workers > 1:
+        optimize_sql_dump_parallel(input_file, output_file, args.batch_size, args.workers,
+                                   args.chunk_mb * 1024 * 1024, args.compresslevel)
+    else:
+        optimize_sql_dump(input_file, output_file, args.batch_size)
     
     # Show output size
     output_size = output_file.stat().st_size
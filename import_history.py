@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Import history for skipping unchanged imports
+- One row per finished import: target table, source files, source fingerprint and table generation
+- Parquet files are fingerprinted from their footer plus size/mtime (no data pages are read),
+  CSV and Excel files by a streaming SHA-256 of their content
+- An import is skipped when the source fingerprint and the table generation (creation time,
+  emptiness and manifest row groups) both match the last recorded import, so a table rebuilt,
+  swapped or emptied since is reloaded; the check never scans the table
+- An import that goes ahead first records a "started" marker, so one that fails partway
+  (after a DELETE, or midway through an append) never matches and is redone next run
+"""
+
+import hashlib
+import os
+import sys
+import pyarrow.parquet as pq
+from ingest_engine import open_worker_connection
+from db_drivers import DRIVER_ERRORS
+from import_manifest import MANIFEST_TABLE, parquet_row_group_checksums, table_has_rows
+
+HISTORY_TABLE = "import_history"
+
+# table_generation of an import that has not finished (yet)
+STARTED_GENERATION = "started"
+
+HASH_CHUNK_BYTES = 8 * 1024 * 1024
+
+PARQUET_SUFFIXES = ('.parquet', '.pq')
+
+# Fingerprints of this run, keyed by (path, size, mtime); several targets often share a file
+_fingerprints = {}
+
+def ensure_history_table(connection):
+    """Create the history table if it does not exist"""
+    cursor = connection.cursor()
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {HISTORY_TABLE} (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            table_name VARCHAR(64) NOT NULL,
+            importer VARCHAR(64) NOT NULL,
+            source_path VARCHAR(1024) NOT NULL,
+            fingerprint CHAR(64) NOT NULL,
+            table_generation VARCHAR(64) NOT NULL,
+            row_count BIGINT NOT NULL,
+            imported_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            INDEX idx_table_imported (table_name, imported_at)
+        ) ENGINE=InnoDB
+    """)
+    cursor.close()
+
+def parquet_fingerprint(path, stat):
+    """SHA-256 of a parquet footer (schema, row groups, chunk checksums) plus size and mtime"""
+    pf = pq.ParquetFile(path)
+    digest = hashlib.sha256()
+    digest.update(f"{stat.st_size}|{stat.st_mtime_ns}|{pf.metadata.num_rows}|{pf.num_row_groups}|".encode("utf-8"))
+    digest.update(str(pf.schema_arrow).encode("utf-8"))
+    for checksum in parquet_row_group_checksums(pf):
+        digest.update(f"|{checksum}".encode("utf-8"))
+    return digest.hexdigest()
+
+def content_fingerprint(path):
+    """Streaming SHA-256 of a file's content (CSV, Excel)"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def file_fingerprint(path):
+    """Fingerprint of one source file, computed once per run"""
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    fingerprint = _fingerprints.get(key)
+    if fingerprint is None:
+        if path.lower().endswith(PARQUET_SUFFIXES):
+            fingerprint = parquet_fingerprint(path, stat)
+        else:
+            fingerprint = content_fingerprint(path)
+        _fingerprints[key] = fingerprint
+    return fingerprint
+
+def source_fingerprint(paths):
+    """Fingerprint of an import's source files (in the order given)"""
+    fingerprints = [file_fingerprint(path) for path in paths]
+    if len(fingerprints) == 1:
+        return fingerprints[0]
+    return hashlib.sha256("|".join(fingerprints).encode("utf-8")).hexdigest()
+
+def manifest_rows(connection, table_name):
+    """(row groups, rows) committed for a table in the import manifest, None without a manifest table"""
+    cursor = connection.cursor()
+    try:
+        cursor.execute(
+            "SELECT 1 FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+            (MANIFEST_TABLE,)
+        )
+        if not cursor.fetchall():
+            return None
+        cursor.execute(f"SELECT COUNT(*), COALESCE(SUM(row_count), 0) FROM {MANIFEST_TABLE} WHERE target_table = %s",
+                       (table_name,))
+        row_groups, rows = cursor.fetchone()
+        return int(row_groups), int(rows)
+    finally:
+        cursor.close()
+
+def table_generation(connection, table_name):
+    """(generation, approximate row count) of a table in the current database, (None, 0) if it does not exist
+
+    The generation changes whenever the table is recreated, swapped in or altered
+    (CREATE_TIME), emptied (a one-row probe) or, for parquet targets, gains or loses
+    manifest row groups. Nothing here scans the table; the row count is
+    information_schema's estimate unless the manifest knows the exact one.
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute(
+            "SELECT CREATE_TIME, TABLE_ROWS FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+            (table_name,)
+        )
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+    if not rows:
+        return None, 0
+    create_time, row_count = rows[0]
+    generation = f"{create_time}/{'rows' if table_has_rows(connection, table_name) else 'empty'}"
+    manifest = manifest_rows(connection, table_name)
+    if manifest and manifest[0]:
+        generation += f"/{manifest[0]}:{manifest[1]}"
+        row_count = manifest[1]
+    return generation, int(row_count or 0)
+
+def last_import(connection, table_name):
+    """(fingerprint, table_generation) of the table's last recorded import, or None"""
+    cursor = connection.cursor()
+    cursor.execute(
+        f"SELECT fingerprint, table_generation FROM {HISTORY_TABLE} WHERE table_name = %s "
+        f"ORDER BY id DESC LIMIT 1",
+        (table_name,)
+    )
+    rows = cursor.fetchall()
+    cursor.close()
+    return rows[0] if rows else None
+
+def importer_name():
+    return os.path.splitext(os.path.basename(sys.argv[0] or "import"))[0]
+
+def mark_import_started(connection, table_name, paths):
+    """Record that an import of table_name is under way; only record_import supersedes it"""
+    ensure_history_table(connection)
+    cursor = connection.cursor()
+    cursor.execute(
+        f"INSERT INTO {HISTORY_TABLE} (table_name, importer, source_path, fingerprint, table_generation, row_count) "
+        f"VALUES (%s, %s, %s, '', %s, 0)",
+        (table_name, importer_name(), ",".join(paths)[:1024], STARTED_GENERATION)
+    )
+    connection.commit()
+    cursor.close()
+
+def import_unchanged(connection, table_name, paths, force=False):
+    """Whether the sources and the table are unchanged since the last recorded import
+
+    When they are not, a started marker is recorded before the caller touches the table.
+    """
+    try:
+        if not force:
+            ensure_history_table(connection)
+            previous = last_import(connection, table_name)
+            if previous is not None:
+                generation, row_count = table_generation(connection, table_name)
+                if generation is not None and tuple(previous) == (source_fingerprint(paths), generation):
+                    print(f"⏭️ {table_name} is up to date with {', '.join(paths)} (~{row_count:,} rows), "
+                          f"skipping (--force reloads)")
+                    return True
+        mark_import_started(connection, table_name, paths)
+    except (OSError, *DRIVER_ERRORS) as e:
+        print(f"⚠️ Could not check the import history of {table_name}, importing: {e}")
+    return False
+
+def record_import(connection, table_name, paths):
+    """Record a finished import; call after indexes are rebuilt or a staging table is swapped in"""
+    try:
+        ensure_history_table(connection)
+        generation, row_count = table_generation(connection, table_name)
+        if generation is None:
+            return
+        cursor = connection.cursor()
+        cursor.execute(
+            f"INSERT INTO {HISTORY_TABLE} (table_name, importer, source_path, fingerprint, table_generation, row_count) "
+            f"VALUES (%s, %s, %s, %s, %s, %s)",
+            (table_name, importer_name(), ",".join(paths)[:1024], source_fingerprint(paths), generation, row_count)
+        )
+        connection.commit()
+        cursor.close()
+    except (OSError, *DRIVER_ERRORS) as e:
+        print(f"⚠️ Data loaded but the import history of {table_name} could not be updated: {e}")
+
+def import_unchanged_in(database, table_name, paths, force=False):
+    """import_unchanged on a short-lived connection to database"""
+    try:
+        connection = open_worker_connection(database)
+    except DRIVER_ERRORS as e:
+        print(f"⚠️ Could not check the import history in {database}, importing: {e}")
+        return False
+    try:
+        return import_unchanged(connection, table_name, paths, force)
+    finally:
+        connection.close()
+
+def record_import_in(database, table_name, paths):
+    """record_import on a short-lived connection to database"""
+    try:
+        connection = open_worker_connection(database)
+    except DRIVER_ERRORS as e:
+        print(f"⚠️ Data loaded but the import history in {database} could not be updated: {e}")
+        return
+    try:
+        record_import(connection, table_name, paths)
+    finally:
+        connection.close()
+
+def add_history_arguments(parser):
+    parser.add_argument('--force', action='store_true',
+                        help='Import even when the source and table match the last recorded import')
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Import manifest for the parquet importers
+- One row per committed parquet row group, written in the same transaction as its data
+- Resume is an exact primary-key lookup instead of a COUNT(*) estimate
+- Checksums come from the parquet footer, so verifying a file never reads its data
+"""
+
+import os
+import zlib
+
+MANIFEST_TABLE = "import_manifest"
+
+def ensure_manifest_table(connection):
+    """Create the manifest table if it does not exist"""
+    cursor = connection.cursor()
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {MANIFEST_TABLE} (
+            target_table VARCHAR(64) NOT NULL,
+            source_file VARCHAR(255) NOT NULL,
+            row_group INT NOT NULL,
+            row_count INT NOT NULL,
+            checksum INT UNSIGNED NOT NULL,
+            loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (target_table, source_file, row_group)
+        ) ENGINE=InnoDB
+    """)
+    cursor.close()
+
+def parquet_source_key(parquet_file):
+    """Identify a parquet file by name; checksums catch a file replaced under the same name"""
+    return os.path.basename(parquet_file)
+
+def row_group_checksum(row_group):
+    """CRC32 of a row group's footer metadata (column chunk offsets, sizes and value counts)"""
+    parts = [str(row_group.num_rows)]
+    for i in range(row_group.num_columns):
+        column = row_group.column(i)
+        parts.append(f"{column.path_in_schema}:{column.file_offset}:"
+                     f"{column.total_compressed_size}:{column.num_values}")
+    return zlib.crc32("|".join(parts).encode("utf-8"))
+
+def parquet_row_group_checksums(pf):
+    """Checksums of every row group in an open ParquetFile"""
+    return [row_group_checksum(pf.metadata.row_group(i)) for i in range(pf.num_row_groups)]
+
+def get_manifest(connection, table_name, source_key):
+    """Committed row groups of a source file: {row_group: (row_count, checksum)}"""
+    cursor = connection.cursor()
+    cursor.execute(
+        f"SELECT row_group, row_count, checksum FROM {MANIFEST_TABLE} "
+        f"WHERE target_table = %s AND source_file = %s",
+        (table_name, source_key)
+    )
+    manifest = {row_group: (row_count, checksum) for row_group, row_count, checksum in cursor.fetchall()}
+    cursor.close()
+    return manifest
+
+def record_row_group(cursor, table_name, source_key, row_group, row_count, checksum):
+    """Record a loaded row group; call before the data transaction commits"""
+    cursor.execute(
+        f"INSERT INTO {MANIFEST_TABLE} (target_table, source_file, row_group, row_count, checksum) "
+        f"VALUES (%s, %s, %s, %s, %s)",
+        (table_name, source_key, row_group, row_count, checksum)
+    )
+
+def table_has_manifest(connection, table_name):
+    """Whether any source file has been recorded for the table"""
+    cursor = connection.cursor()
+    cursor.execute(f"SELECT 1 FROM {MANIFEST_TABLE} WHERE target_table = %s LIMIT 1", (table_name,))
+    has_manifest = len(cursor.fetchall()) > 0
+    cursor.close()
+    return has_manifest
+
+def adopt_row_groups(connection, table_name, source_key, pf, checksums, row_groups):
+    """Record row groups loaded before the manifest existed (resume estimate of a legacy table)"""
+    cursor = connection.cursor()
+    for row_group in row_groups:
+        record_row_group(cursor, table_name, source_key, row_group,
+                         pf.metadata.row_group(row_group).num_rows, checksums[row_group])
+    connection.commit()
+    cursor.close()
+
+def table_has_rows(connection, table_name):
+    """Cheap emptiness check (reads at most one index entry)"""
+    cursor = connection.cursor()
+    cursor.execute(f"SELECT 1 FROM {table_name} LIMIT 1")
+    has_rows = len(cursor.fetchall()) > 0
+    cursor.close()
+    return has_rows
+
+def plan_row_groups(manifest, checksums):
+    """Split row groups into (pending, mismatched) against the manifest"""
+    pending = []
+    mismatched = []
+    for row_group, checksum in enumerate(checksums):
+        entry = manifest.get(row_group)
+        if entry is None:
+            pending.append(row_group)
+        elif entry[1] != checksum:
+            mismatched.append(row_group)
+    return pending, mismatched
+
+def clear_manifest(connection, table_name, source_key):
+    """Forget a source file's row groups (before recording a full reload)"""
+    cursor = connection.cursor()
+    cursor.execute(f"DELETE FROM {MANIFEST_TABLE} WHERE target_table = %s AND source_file = %s",
+                   (table_name, source_key))
+    cursor.close()
+
+def reconcile_manifest(connection, table_name):
+    """Forget every row group of a table that is empty although the manifest has rows for it
+
+    The table was truncated or recreated after they were written; trusting them would
+    report an empty table as fully loaded. Returns whether the manifest was cleared.
+    """
+    if not table_has_manifest(connection, table_name) or table_has_rows(connection, table_name):
+        return False
+    cursor = connection.cursor()
+    cursor.execute(f"DELETE FROM {MANIFEST_TABLE} WHERE target_table = %s", (table_name,))
+    connection.commit()
+    cursor.close()
+    return True
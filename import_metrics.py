@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Per-stage timing and throughput metrics for the importers
+- Stages: read (parquet/CSV decode), convert (type conversion), serialize (TSV/tuples),
+  load (LOAD DATA / executemany statement) and commit
+- Every timed batch is appended as one JSON line (--metrics-jsonl / IMPORT_METRICS_JSONL)
+- Totals and latency histograms are written as a Prometheus textfile
+  (--metrics-prom / IMPORT_METRICS_PROM) for the node_exporter textfile collector
+- A per-stage summary is printed when the importer exits
+
+For streamed LOAD DATA the TSV is produced while the server consumes it, so the
+load stage spans the whole statement and serialize is the part of it spent in Python.
+"""
+
+import argparse
+import atexit
+import itertools
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+STAGES = ("read", "convert", "serialize", "load", "commit")
+
+# Histogram bucket upper bounds in seconds (per batch / row group)
+HISTOGRAM_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+METRIC_PREFIX = "proxy_import"
+
+def _label_value(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(**labels):
+    return "{" + ",".join(f'{name}="{_label_value(value)}"' for name, value in labels.items()) + "}"
+
+class StageTimer:
+    """Mutable result of one timed stage; set rows/bytes inside the with block"""
+
+    def __init__(self):
+        self.rows = 0
+        self.bytes = 0
+
+class ImportMetrics:
+    """Thread-safe per-(table, stage) totals and histograms, with an optional JSON lines log"""
+
+    def __init__(self, importer, jsonl_path=None, prometheus_path=None):
+        self.importer = importer
+        self.jsonl_path = jsonl_path
+        self.prometheus_path = prometheus_path
+        self.run_id = f"{socket.gethostname()}-{os.getpid()}-{int(time.time())}"
+        self.started = time.time()
+        self.stages = {}
+        self._lock = threading.Lock()
+        self._jsonl = None
+        self.closed = False
+        if jsonl_path:
+            self._jsonl = open(jsonl_path, 'a', buffering=1)
+
+    def _write_line(self, record):
+        if self._jsonl is None:
+            return
+        with self._lock:
+            self._jsonl.write(json.dumps(record) + "\n")
+
+    def record(self, stage, seconds, table=None, rows=0, nbytes=0, unit=None):
+        """Add one timed batch to the totals and the JSON lines log"""
+        key = (table or "", stage)
+        with self._lock:
+            totals = self.stages.get(key)
+            if totals is None:
+                totals = {'count': 0, 'seconds': 0.0, 'max_seconds': 0.0, 'rows': 0, 'bytes': 0,
+                          'buckets': [0] * len(HISTOGRAM_BUCKETS)}
+                self.stages[key] = totals
+            totals['count'] += 1
+            totals['seconds'] += seconds
+            totals['max_seconds'] = max(totals['max_seconds'], seconds)
+            totals['rows'] += rows
+            totals['bytes'] += nbytes
+            for i, bound in enumerate(HISTOGRAM_BUCKETS):
+                if seconds <= bound:
+                    totals['buckets'][i] += 1
+        self._write_line({'ts': round(time.time(), 3), 'run_id': self.run_id, 'importer': self.importer,
+                          'table': table, 'stage': stage, 'unit': unit, 'seconds': round(seconds, 6),
+                          'rows': rows, 'bytes': nbytes})
+
+    @contextmanager
+    def stage(self, stage, table=None, unit=None):
+        """Time a block; failed blocks are not recorded"""
+        timer = StageTimer()
+        start_time = time.perf_counter()
+        yield timer
+        self.record(stage, time.perf_counter() - start_time, table, timer.rows, timer.bytes, unit)
+
+    def timed_batches(self, batches, stage="read", table=None):
+        """Pass batches through, recording the time spent producing each one under stage"""
+        iterator = iter(batches)
+        for unit in itertools.count():
+            start_time = time.perf_counter()
+            try:
+                batch = next(iterator)
+            except StopIteration:
+                return
+            rows = batch.num_rows if hasattr(batch, 'num_rows') else len(batch)
+            self.record(stage, time.perf_counter() - start_time, table, rows, 0, unit)
+            yield batch
+
+    def timed_chunks(self, chunks, table=None, unit=None):
+        """Pass TSV chunks through, recording the time spent producing them as serialize"""
+        seconds = 0.0
+        nbytes = 0
+        iterator = iter(chunks)
+        while True:
+            start_time = time.perf_counter()
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                seconds += time.perf_counter() - start_time
+                break
+            seconds += time.perf_counter() - start_time
+            nbytes += len(chunk)
+            yield chunk
+        self.record("serialize", seconds, table, 0, nbytes, unit)
+
+    def write_prometheus(self):
+        """Write totals and histograms atomically to the Prometheus textfile"""
+        if not self.prometheus_path:
+            return
+        with self._lock:
+            stages = {key: dict(totals, buckets=list(totals['buckets'])) for key, totals in self.stages.items()}
+
+        lines = [
+            f"# HELP {METRIC_PREFIX}_stage_seconds Time spent per import stage and batch",
+            f"# TYPE {METRIC_PREFIX}_stage_seconds histogram",
+        ]
+        for (table, stage), totals in sorted(stages.items()):
+            labels = {'importer': self.importer, 'table': table, 'stage': stage}
+            for bound, count in zip(HISTOGRAM_BUCKETS, totals['buckets']):
+                lines.append(f"{METRIC_PREFIX}_stage_seconds_bucket{_labels(**labels, le=bound)} {count}")
+            lines.append(f"{METRIC_PREFIX}_stage_seconds_bucket{_labels(**labels, le='+Inf')} {totals['count']}")
+            lines.append(f"{METRIC_PREFIX}_stage_seconds_sum{_labels(**labels)} {totals['seconds']:.6f}")
+            lines.append(f"{METRIC_PREFIX}_stage_seconds_count{_labels(**labels)} {totals['count']}")
+        for name, field, help_text in (("rows", 'rows', "Rows processed per import stage"),
+                                       ("bytes", 'bytes', "Bytes produced per import stage")):
+            lines.append(f"# HELP {METRIC_PREFIX}_stage_{name}_total {help_text}")
+            lines.append(f"# TYPE {METRIC_PREFIX}_stage_{name}_total counter")
+            for (table, stage), totals in sorted(stages.items()):
+                labels = _labels(importer=self.importer, table=table, stage=stage)
+                lines.append(f"{METRIC_PREFIX}_stage_{name}_total{labels} {totals[field]}")
+        lines.append(f"# HELP {METRIC_PREFIX}_last_run_timestamp_seconds When the importer last wrote metrics")
+        lines.append(f"# TYPE {METRIC_PREFIX}_last_run_timestamp_seconds gauge")
+        lines.append(f"{METRIC_PREFIX}_last_run_timestamp_seconds{_labels(importer=self.importer)} {time.time():.0f}")
+        lines.append(f"# HELP {METRIC_PREFIX}_run_duration_seconds Wall time of the last importer run")
+        lines.append(f"# TYPE {METRIC_PREFIX}_run_duration_seconds gauge")
+        lines.append(f"{METRIC_PREFIX}_run_duration_seconds{_labels(importer=self.importer)} "
+                     f"{time.time() - self.started:.3f}")
+
+        temp_path = f"{self.prometheus_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w') as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(temp_path, self.prometheus_path)
+
+    def print_summary(self):
+        """Per-stage totals, slowest stage first"""
+        with self._lock:
+            stages = sorted(self.stages.items(), key=lambda item: -item[1]['seconds'])
+        if not stages:
+            return
+        total_seconds = sum(totals['seconds'] for _, totals in stages) or 1
+        print("📊 Stage timings:")
+        for (table, stage), totals in stages:
+            rate = totals['rows'] / totals['seconds'] if totals['seconds'] > 0 and totals['rows'] else 0
+            throughput = f" - {rate:,.0f} rows/sec" if rate else ""
+            volume = f" - {totals['bytes'] / 1024**2:,.1f} MB" if totals['bytes'] else ""
+            print(f"  {table or '-':<22} {stage:<9} {totals['seconds']:8.1f}s ({totals['seconds'] / total_seconds:5.1%}) "
+                  f"in {totals['count']:,} batch(es), max {totals['max_seconds']:.2f}s{throughput}{volume}")
+
+    def close(self):
+        """Print the summary, write the summary line and the Prometheus textfile (once)"""
+        if self.closed:
+            return
+        self.closed = True
+        self.print_summary()
+        with self._lock:
+            totals = {f"{table}.{stage}" if table else stage: {k: v for k, v in stage_totals.items() if k != 'buckets'}
+                      for (table, stage), stage_totals in self.stages.items()}
+        self._write_line({'ts': round(time.time(), 3), 'run_id': self.run_id, 'importer': self.importer,
+                          'event': 'summary', 'seconds': round(time.time() - self.started, 3), 'stages': totals})
+        try:
+            self.write_prometheus()
+        except OSError as e:
+            print(f"⚠️ Could not write metrics to {self.prometheus_path}: {e}")
+        if self._jsonl is not None:
+            self._jsonl.close()
+            self._jsonl = None
+
+_metrics = None
+
+def configure_metrics(importer=None, jsonl_path=None, prometheus_path=None):
+    """Replace the process-wide recorder (defaults come from the IMPORT_METRICS_* environment)"""
+    global _metrics
+    if _metrics is not None:
+        _metrics.close()
+    importer = importer or os.path.splitext(os.path.basename(sys.argv[0] or "import"))[0]
+    _metrics = ImportMetrics(importer,
+                             jsonl_path or os.environ.get("IMPORT_METRICS_JSONL"),
+                             prometheus_path or os.environ.get("IMPORT_METRICS_PROM"))
+    return _metrics
+
+def get_metrics():
+    """The process-wide recorder, created from the environment on first use"""
+    if _metrics is None:
+        configure_metrics()
+    return _metrics
+
+def stage_timer(stage, table=None, unit=None):
+    return get_metrics().stage(stage, table, unit)
+
+def timed_batches(batches, stage="read", table=None):
+    return get_metrics().timed_batches(batches, stage, table)
+
+def timed_chunks(chunks, table=None, unit=None):
+    return get_metrics().timed_chunks(chunks, table, unit)
+
+def add_metrics_arguments(parser):
+    parser.add_argument('--metrics-jsonl', default=os.environ.get("IMPORT_METRICS_JSONL"),
+                        help='Append per-batch stage timings as JSON lines to this file')
+    parser.add_argument('--metrics-prom', default=os.environ.get("IMPORT_METRICS_PROM"),
+                        help='Write stage totals and histograms to this Prometheus textfile')
+
+def configure_metrics_from_args(args, importer=None):
+    return configure_metrics(importer, args.metrics_jsonl, args.metrics_prom)
+
+@atexit.register
+def _close_metrics():
+    if _metrics is not None:
+        _metrics.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Summarize a stage timing JSON lines file')
+    parser.add_argument('jsonl_file')
+    args = parser.parse_args()
+
+    summary = ImportMetrics("report")
+    with open(args.jsonl_file) as f:
+        for line in f:
+            record = json.loads(line)
+            if record.get('stage'):
+                summary.record(record['stage'], record['seconds'], record.get('table'),
+                               record.get('rows', 0), record.get('bytes', 0), record.get('unit'))
+    summary.print_summary()
@@ -5,27 +5,46 @@ Creates outreach table in proxy_sds_calibrated, proxy_sel, and proxy_sel_calibra
 with identical structure to proxy.outreach
 """
 
-import mysql.connector
-import csv
 import os
 import argparse
+import time
 from datetime import datetime
+from ingest_engine import (connect_mysql, arrow_float, arrow_int, arrow_text, arrow_tinyint, CsvSource, QuerySource,
+                           FanOutSink, KeySnapshot, choose_sink, column_transform, dedupe_transform, delta_transform,
+                           run_ingest)
+from table_ops import (COPY_CHUNK_ROWS, copy_table_by_id_range, decimal_scales, defer_table_indexes,
+                       finish_deferred_indexes, table_exists)
+from db_drivers import DRIVER_ERRORS, add_driver_argument, configure_driver_from_args, error_code
+from import_metrics import add_metrics_arguments, configure_metrics_from_args
+from import_history import add_history_arguments, import_unchanged_in, record_import_in
 
-def get_db_connection(database_name):
+# (target column, CSV column, converter) for the CSV import
+OUTREACH_SPEC = [
+    ('row_index', 'row_index', arrow_int),
+    ('unnamed_col', 'unnamed_col', arrow_text),
+    ('account_hash_key', 'account_hash_key', arrow_text),  # NOT NULL, rows without it are skipped
+    ('proposal_master_skey', 'proposal_master_skey', arrow_int),
+    ('director_master_skey', 'director_master_skey', arrow_int),
+    ('account_type', 'account_type', arrow_text),
+    ('shares_summable', 'shares_summable', arrow_float),
+    ('rank_of_shareholding', 'rank_of_shareholding', arrow_int),
+    ('score_model1', 'score_model1', arrow_float),
+    ('prediction_model1', 'prediction_model1', arrow_tinyint),
+    ('Target_encoded', 'Target_encoded', arrow_int),
+]
+
+# Columns copied between outreach tables (id and created_at are generated)
+OUTREACH_COLUMNS = [target for target, _, _ in OUTREACH_SPEC]
+
+# Unique key of an outreach row (uniq_outreach_triplet)
+OUTREACH_KEY = ['account_hash_key', 'proposal_master_skey', 'director_master_skey']
+
+def get_db_connection(database_name, **options):
     """Create database connection"""
-    try:
-        connection = mysql.connector.connect(
-            host='localhost',
-            user='webapp',
-            password='webapppass',
-            database=database_name,
-            autocommit=False,
-            buffered=True
-        )
-        return connection
-    except mysql.connector.Error as err:
-        print(f"❌ Error connecting to {database_name}: {err}")
-        return None
+    connection = connect_mysql(database_name, prompt_root=False, buffered=True, **options)
+    if not connection:
+        print(f"❌ Error connecting to {database_name}")
+    return connection
 
 def create_outreach_table(database_name):
     """Create outreach table with identical structure to proxy.outreach"""
@@ -67,7 +86,7 @@ def create_outreach_table(database_name):
         print(f"✅ Created outreach table in {database_name}")
         return True
         
-    except mysql.connector.Error as err:
+    except DRIVER_ERRORS as err:
         print(f"❌ Error creating table in {database_name}: {err}")
         connection.rollback()
         return False
@@ -75,62 +94,60 @@ def create_outreach_table(database_name):
         cursor.close()
         connection.close()
 
-def safe_float(value):
-    """Safely convert to float"""
-    if not value or value.strip() == '':
-        return None
-    try:
-        return float(value)
-    except (ValueError, TypeError):
-        return None
+def import_csv_to_database(csv_file, database_name, on_duplicate='ignore'):
+    """Import CSV data into the specified database
 
-def safe_int(value):
-    """Safely convert to int"""
-    if not value or value.strip() == '' or str(value).strip() == '-1':
-        return None
-    try:
-        return int(float(value))  # Handle cases like "123.0"
-    except (ValueError, TypeError):
-        return None
-
-def safe_bigint(value):
-    """Safely convert to bigint"""
-    if not value or value.strip() == '' or str(value).strip() == '-1':
-        return None
+    Repeated triplets within the file are dropped before loading; triplets already in the
+    table are skipped (on_duplicate='ignore') or have their other columns updated ('update').
+    """
+    if not os.path.exists(csv_file):
+        print(f"❌ CSV file not found: {csv_file}")
+        return False
+    
+    connection = get_db_connection(database_name)
+    if not connection:
+        return False
+    
+    cursor = connection.cursor()
+    
     try:
-        return int(float(value))  # Handle cases like "123.0"
-    except (ValueError, TypeError):
-        return None
+        print(f"📂 Reading CSV file: {csv_file}")
+        file_size = os.path.getsize(csv_file) / (1024 * 1024)  # MB
+        print(f"📊 File size: {file_size:.2f} MB")
+        
+        # Duplicate triplets (uniq_outreach_triplet) are never fatal
+        transform = dedupe_transform(column_transform(OUTREACH_SPEC, required=('account_hash_key',)), OUTREACH_KEY)
+        sink = choose_sink(connection, 'outreach', OUTREACH_COLUMNS, batch_size=1000, on_duplicate=on_duplicate,
+                           update_columns=[column for column in OUTREACH_COLUMNS if column not in OUTREACH_KEY])
+        stats = run_ingest(CsvSource(csv_file), sink, transform, label=f"{database_name}.outreach")
+        
+        print(f"✅ Successfully imported {stats['rows_written']} rows into {database_name}")
+        if transform.state['duplicates']:
+            print(f"⚠️ Dropped {transform.state['duplicates']:,} repeated triplets within the CSV")
+        
+        # Verify import
+        cursor.execute("SELECT COUNT(*) FROM outreach")
+        total = cursor.fetchone()[0]
+        print(f"📊 Total rows in {database_name}.outreach: {total}")
+        return True
+            
+    except Exception as err:
+        print(f"❌ Error importing to {database_name}: {err}")
+        connection.rollback()
+        return False
+    finally:
+        cursor.close()
+        connection.close()
 
-def safe_tinyint(value):
-    """Safely convert to tinyint (0-255)"""
-    if not value or value.strip() == '':
-        return None
-    try:
-        val = int(float(value))
-        return max(0, min(255, val))  # Clamp to tinyint range
-    except (ValueError, TypeError):
-        return None
+# Access denied to the source schema: fall back to copying through the client
+ACCESS_DENIED_ERRNOS = (1044, 1142)
 
-def process_row_data(row):
-    """Process a CSV row into database-ready format"""
-    data = {
-        'row_index': safe_int(row.get('row_index')),
-        'unnamed_col': row.get('unnamed_col') or None,
-        'account_hash_key': row.get('account_hash_key') or '',  # NOT NULL field
-        'proposal_master_skey': safe_bigint(row.get('proposal_master_skey')),
-        'director_master_skey': safe_bigint(row.get('director_master_skey')),
-        'account_type': row.get('account_type') or None,
-        'shares_summable': safe_float(row.get('shares_summable')),
-        'rank_of_shareholding': safe_int(row.get('rank_of_shareholding')),
-        'score_model1': safe_float(row.get('score_model1')),
-        'prediction_model1': safe_tinyint(row.get('prediction_model1')),
-        'Target_encoded': safe_int(row.get('Target_encoded')),
-    }
-    return data
+def import_csv_incremental(csv_file, database_name):
+    """Insert only the CSV triplets not yet in the outreach table
 
-def import_csv_to_database(csv_file, database_name):
-    """Import CSV data into the specified database"""
+    Existing rows, the table and its indexes are left as they are. Rows whose triplet exists
+    are reported as unchanged or conflicting (same key, different values) and not loaded.
+    """
     if not os.path.exists(csv_file):
         print(f"❌ CSV file not found: {csv_file}")
         return False
@@ -141,92 +158,33 @@ def import_csv_to_database(csv_file, database_name):
     
     cursor = connection.cursor()
     
-    # Insert SQL with all columns except id and created_at (auto-generated)
-    insert_sql = """
-    INSERT INTO outreach (
-        row_index, unnamed_col, account_hash_key, proposal_master_skey,
-        director_master_skey, account_type, shares_summable, rank_of_shareholding,
-        score_model1, prediction_model1, Target_encoded
-    ) VALUES (
-        %(row_index)s, %(unnamed_col)s, %(account_hash_key)s, %(proposal_master_skey)s,
-        %(director_master_skey)s, %(account_type)s, %(shares_summable)s, %(rank_of_shareholding)s,
-        %(score_model1)s, %(prediction_model1)s, %(Target_encoded)s
-    )
-    """
-    
     try:
+        if not table_exists(connection, 'outreach'):
+            print(f"❌ {database_name}.outreach does not exist - run a full import first")
+            return False
+        
+        value_columns = [column for column in OUTREACH_COLUMNS if column not in OUTREACH_KEY]
+        snapshot = KeySnapshot(OUTREACH_KEY, value_columns, decimal_scales(connection, 'outreach'))
+        snapshot.load(QuerySource(connection, f"SELECT {', '.join(OUTREACH_KEY + value_columns)} FROM outreach"))
+        
         print(f"📂 Reading CSV file: {csv_file}")
-        file_size = os.path.getsize(csv_file) / (1024 * 1024)  # MB
-        print(f"📊 File size: {file_size:.2f} MB")
+        transform = delta_transform(
+            dedupe_transform(column_transform(OUTREACH_SPEC, required=('account_hash_key',)), OUTREACH_KEY), snapshot)
+        # INSERT IGNORE / LOCAL still guard against keys the snapshot cannot see (e.g. case-insensitive matches)
+        sink = choose_sink(connection, 'outreach', OUTREACH_COLUMNS, batch_size=1000, on_duplicate='ignore')
+        stats = run_ingest(CsvSource(csv_file), sink, transform, label=f"{database_name}.outreach (incremental)")
         
-        with open(csv_file, 'r', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
-            
-            count = 0
-            batch_size = 1000
-            batch_data = []
-            duplicate_count = 0
-            
-            for row in reader:
-                data = process_row_data(row)
-                
-                # Skip rows with empty account_hash_key (required field)
-                if not data['account_hash_key']:
-                    continue
-                    
-                batch_data.append(data)
-                count += 1
-                
-                # Process in batches
-                if count % batch_size == 0:
-                    try:
-                        cursor.executemany(insert_sql, batch_data)
-                        connection.commit()
-                        batch_data = []
-                        print(f"📝 Processed {count} rows...")
-                    except mysql.connector.IntegrityError as err:
-                        if "Duplicate entry" in str(err):
-                            # Handle duplicate entries by inserting one by one
-                            connection.rollback()
-                            for data_row in batch_data:
-                                try:
-                                    cursor.execute(insert_sql, data_row)
-                                    connection.commit()
-                                except mysql.connector.IntegrityError:
-                                    duplicate_count += 1
-                                    connection.rollback()
-                            batch_data = []
-                            print(f"📝 Processed {count} rows (skipped {duplicate_count} duplicates)...")
-                        else:
-                            raise
-            
-            # Process remaining batch
-            if batch_data:
-                try:
-                    cursor.executemany(insert_sql, batch_data)
-                    connection.commit()
-                except mysql.connector.IntegrityError as err:
-                    if "Duplicate entry" in str(err):
-                        connection.rollback()
-                        for data_row in batch_data:
-                            try:
-                                cursor.execute(insert_sql, data_row)
-                                connection.commit()
-                            except mysql.connector.IntegrityError:
-                                duplicate_count += 1
-                                connection.rollback()
-                    else:
-                        raise
-            
-            print(f"✅ Successfully imported {count - duplicate_count} rows into {database_name}")
-            if duplicate_count > 0:
-                print(f"⚠️  Skipped {duplicate_count} duplicate entries")
-            
-            # Verify import
-            cursor.execute("SELECT COUNT(*) FROM outreach")
-            total = cursor.fetchone()[0]
-            print(f"📊 Total rows in {database_name}.outreach: {total}")
-            return True
+        print(f"\n📊 Delta for {database_name}.outreach:")
+        print(f"   🆕 New: {transform.state['new']:,} rows ({stats['rows_written']:,} inserted)")
+        print(f"   ✔️ Unchanged: {transform.state['unchanged']:,} rows")
+        print(f"   ⚠️ Conflicting: {transform.state['conflicting']:,} rows (existing triplet, different values - kept as stored)")
+        if transform.state['duplicates']:
+            print(f"   🔁 Repeated within the CSV: {transform.state['duplicates']:,} rows")
+        
+        cursor.execute("SELECT COUNT(*) FROM outreach")
+        total = cursor.fetchone()[0]
+        print(f"📊 Total rows in {database_name}.outreach: {total}")
+        return True
             
     except Exception as err:
         print(f"❌ Error importing to {database_name}: {err}")
@@ -236,73 +194,39 @@ def import_csv_to_database(csv_file, database_name):
         cursor.close()
         connection.close()
 
-def copy_from_proxy_database(target_database):
-    """Copy outreach data from proxy database to target database"""
-    source_connection = get_db_connection('proxy')
+def copy_from_proxy_database(target_database, mode='server', chunk_rows=COPY_CHUNK_ROWS, source_host=None):
+    """Copy outreach data from proxy database to target database
+
+    server: INSERT IGNORE ... SELECT on the MySQL server in id ranges (both schemas share a server)
+    client: stream the rows through this process into the target's bulk sink
+    """
+    if mode == 'server' and not source_host:
+        result = copy_on_server(target_database, chunk_rows)
+        if result is not None:
+            return result
+        print("↩️ Falling back to copying through the client")
+
+    source_connection = get_db_connection('proxy', **source_options(source_host))
     target_connection = get_db_connection(target_database)
     
     if not source_connection or not target_connection:
         return False
     
-    source_cursor = source_connection.cursor()
     target_cursor = target_connection.cursor()
     
     try:
         print(f"📂 Copying data from proxy.outreach to {target_database}.outreach")
         
-        # Get all data from source
-        source_cursor.execute("""
-            SELECT row_index, unnamed_col, account_hash_key, proposal_master_skey,
-                   director_master_skey, account_type, shares_summable, rank_of_shareholding,
-                   score_model1, prediction_model1, Target_encoded
-            FROM outreach
-        """)
-        
-        rows = source_cursor.fetchall()
-        print(f"📊 Found {len(rows)} rows in proxy.outreach")
+        # Stream the source rows in batches instead of fetchall()
+        source = QuerySource(source_connection, f"SELECT {', '.join(OUTREACH_COLUMNS)} FROM outreach")
+        sink = choose_sink(target_connection, 'outreach', OUTREACH_COLUMNS, batch_size=1000, skip_duplicates=True)
+        stats = run_ingest(source, sink, label=f"{target_database}.outreach")
         
-        if not rows:
+        if stats['rows_read'] == 0:
             print("⚠️  No data found in proxy.outreach")
             return True
         
-        # Insert into target database
-        insert_sql = """
-        INSERT INTO outreach (
-            row_index, unnamed_col, account_hash_key, proposal_master_skey,
-            director_master_skey, account_type, shares_summable, rank_of_shareholding,
-            score_model1, prediction_model1, Target_encoded
-        ) VALUES (
-            %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-        )
-        """
-        
-        batch_size = 1000
-        duplicate_count = 0
-        
-        for i in range(0, len(rows), batch_size):
-            batch = rows[i:i+batch_size]
-            try:
-                target_cursor.executemany(insert_sql, batch)
-                target_connection.commit()
-                print(f"📝 Copied {min(i+batch_size, len(rows))} rows...")
-            except mysql.connector.IntegrityError as err:
-                if "Duplicate entry" in str(err):
-                    target_connection.rollback()
-                    # Insert one by one for this batch
-                    for row in batch:
-                        try:
-                            target_cursor.execute(insert_sql, row)
-                            target_connection.commit()
-                        except mysql.connector.IntegrityError:
-                            duplicate_count += 1
-                            target_connection.rollback()
-                    print(f"📝 Copied {min(i+batch_size, len(rows))} rows (skipped {duplicate_count} duplicates)...")
-                else:
-                    raise
-        
-        print(f"✅ Successfully copied {len(rows) - duplicate_count} rows to {target_database}")
-        if duplicate_count > 0:
-            print(f"⚠️  Skipped {duplicate_count} duplicate entries")
+        print(f"✅ Successfully copied {stats['rows_written']} rows to {target_database}")
         
         # Verify copy
         target_cursor.execute("SELECT COUNT(*) FROM outreach")
@@ -315,11 +239,87 @@ def copy_from_proxy_database(target_database):
         target_connection.rollback()
         return False
     finally:
-        source_cursor.close()
         source_connection.close()
         target_cursor.close()
         target_connection.close()
 
+def source_options(source_host):
+    """Connection options for proxy when it lives on another server"""
+    return {'host': source_host} if source_host else {}
+
+def fan_out_from_proxy_database(target_databases, source_host=None):
+    """Read proxy.outreach once and write each batch to all target databases concurrently
+
+    Returns {database: success}.
+    """
+    results = {database: False for database in target_databases}
+    source_connection = get_db_connection('proxy', **source_options(source_host))
+    if not source_connection:
+        return results
+    
+    connections = {}
+    try:
+        sinks = {}
+        for database in target_databases:
+            connection = get_db_connection(database)
+            if connection:
+                connections[database] = connection
+                sinks[database] = choose_sink(connection, 'outreach', OUTREACH_COLUMNS, batch_size=1000,
+                                              skip_duplicates=True)
+        if not sinks:
+            return results
+        
+        print(f"📂 Copying proxy.outreach once to {', '.join(sinks)}")
+        source = QuerySource(source_connection, f"SELECT {', '.join(OUTREACH_COLUMNS)} FROM outreach")
+        fan_out = FanOutSink(sinks)
+        stats = run_ingest(source, fan_out, label="proxy.outreach fan-out")
+        if stats['rows_read'] == 0:
+            print("⚠️  No data found in proxy.outreach")
+        
+        for database, result in fan_out.results.items():
+            results[database] = result['error'] is None
+        return results
+        
+    except Exception as err:
+        print(f"❌ Error copying proxy.outreach: {err}")
+        return results
+    finally:
+        source_connection.close()
+        for connection in connections.values():
+            connection.close()
+
+def copy_on_server(target_database, chunk_rows=COPY_CHUNK_ROWS):
+    """Server-side copy of proxy.outreach; None when the target user cannot read the proxy schema"""
+    target_connection = get_db_connection(target_database)
+    if not target_connection:
+        return False
+    
+    target_cursor = target_connection.cursor()
+    
+    try:
+        print(f"📂 Copying data from proxy.outreach to {target_database}.outreach on the server")
+        copied = copy_table_by_id_range(target_connection, 'proxy', 'outreach', OUTREACH_COLUMNS, chunk_rows)
+        
+        if copied == 0:
+            print("⚠️  No rows copied from proxy.outreach")
+        
+        # Verify copy
+        target_cursor.execute("SELECT COUNT(*) FROM outreach")
+        total = target_cursor.fetchone()[0]
+        print(f"📊 Total rows in {target_database}.outreach: {total}")
+        return True
+        
+    except DRIVER_ERRORS as err:
+        target_connection.rollback()
+        if error_code(err) in ACCESS_DENIED_ERRNOS:
+            print(f"⚠️ Cannot read proxy.outreach from {target_database}: {err}")
+            return None
+        print(f"❌ Error copying to {target_database}: {err}")
+        return False
+    finally:
+        target_cursor.close()
+        target_connection.close()
+
 def main():
     parser = argparse.ArgumentParser(description='Import outreach data into multiple databases')
     parser.add_argument('--database', choices=['sds_calibrated', 'sel', 'sel_calibrated', 'all'], 
@@ -330,8 +330,36 @@ def main():
                        help='CSV file to import (if not specified, copies from proxy.outreach)')
     parser.add_argument('--copy-from-proxy', action='store_true',
                        help='Copy data from proxy.outreach instead of importing CSV')
+    parser.add_argument('--incremental', action='store_true',
+                       help='With --csv-file: insert only triplets not yet in the table (no table or index rebuild)')
+    parser.add_argument('--on-duplicate', choices=['ignore', 'update'], default='ignore',
+                       help='Triplets already in the table: skip them or update their other columns (default: ignore)')
+    parser.add_argument('--copy-mode', choices=['server', 'client', 'fanout'], default='server',
+                       help='Copy proxy.outreach with INSERT ... SELECT on the server, through this client per target, '
+                            'or through this client once for all targets (default: server)')
+    parser.add_argument('--source-host', type=str,
+                       help='MySQL host of the proxy database when it is not on the target server (client copy)')
+    parser.add_argument('--copy-chunk-rows', type=int, default=COPY_CHUNK_ROWS,
+                       help=f'Primary key range per server-side INSERT ... SELECT (default: {COPY_CHUNK_ROWS})')
+    parser.add_argument('--defer-indexes', action='store_true',
+                       help='Drop secondary indexes before loading and rebuild them afterwards')
+    parser.add_argument('--index-workers', type=int, default=3,
+                       help='Tables whose indexes are rebuilt in parallel (default: 3)')
     
+    add_history_arguments(parser)
+    add_metrics_arguments(parser)
+    add_driver_argument(parser)
     args = parser.parse_args()
+    configure_metrics_from_args(args)
+    configure_driver_from_args(args)
+    
+    if args.incremental:
+        if not args.csv_file or args.copy_from_proxy:
+            parser.error("--incremental needs --csv-file (and no --copy-from-proxy)")
+        if args.create_tables or args.defer_indexes:
+            print("⚠️ --incremental keeps the existing tables and indexes: ignoring --create-tables/--defer-indexes")
+            args.create_tables = False
+            args.defer_indexes = False
     
     # Database mappings
     database_configs = {
@@ -352,34 +380,78 @@ def main():
     
     success_count = 0
     total_count = len(targets)
+    index_jobs = []
+    fan_out_targets = []
+    loaded = []
+    load_seconds = 0.0
     
     for target in targets:
         database_name = database_configs[target]
         
         print(f"\n🔄 Processing {target} ({database_name})...")
         
+        # CSV sources are fingerprinted; checked before --create-tables so an unchanged table is not dropped
+        if (args.csv_file and not args.copy_from_proxy
+                and import_unchanged_in(database_name, 'outreach', [args.csv_file], args.force)):
+            success_count += 1
+            print("-" * 40)
+            continue
+        
         # Create table if requested
         if args.create_tables:
             if not create_outreach_table(database_name):
                 print(f"❌ Failed to create table in {database_name}")
                 continue
         
+        # The UNIQUE triplet key stays: duplicate rows are skipped against it during the load
+        if args.defer_indexes:
+            try:
+                index_jobs.append(defer_table_indexes(database_name, 'outreach'))
+            except Exception as err:
+                print(f"⚠️ Could not defer indexes in {database_name}, loading with them: {err}")
+        
+        # One read of proxy.outreach feeds every target after this loop
+        if (args.copy_from_proxy or not args.csv_file) and args.copy_mode == 'fanout':
+            fan_out_targets.append(database_name)
+            print("-" * 40)
+            continue
+        
         # Import data
+        load_start = time.time()
         if args.copy_from_proxy:
             # Copy from proxy database
-            if copy_from_proxy_database(database_name):
+            if copy_from_proxy_database(database_name, args.copy_mode, args.copy_chunk_rows, args.source_host):
                 success_count += 1
+        elif args.csv_file and args.incremental:
+            # Only the triplets the table does not have yet
+            if import_csv_incremental(args.csv_file, database_name):
+                success_count += 1
+                loaded.append(database_name)
         elif args.csv_file:
             # Import from CSV file
-            if import_csv_to_database(args.csv_file, database_name):
+            if import_csv_to_database(args.csv_file, database_name, args.on_duplicate):
                 success_count += 1
+                loaded.append(database_name)
         else:
             # Default: copy from proxy database
-            if copy_from_proxy_database(database_name):
+            if copy_from_proxy_database(database_name, args.copy_mode, args.copy_chunk_rows, args.source_host):
                 success_count += 1
+        load_seconds += time.time() - load_start
         
         print("-" * 40)
     
+    if fan_out_targets:
+        load_start = time.time()
+        results = fan_out_from_proxy_database(fan_out_targets, args.source_host)
+        success_count += sum(1 for succeeded in results.values() if succeeded)
+        load_seconds += time.time() - load_start
+    
+    # Rebuild even after failed loads so no table is left without its indexes
+    failed_indexes = finish_deferred_indexes(index_jobs, load_seconds, args.index_workers)
+    for database_name in loaded:
+        if f"{database_name}.outreach" not in failed_indexes:
+            record_import_in(database_name, 'outreach', [args.csv_file])
+    
     print(f"\n🎯 Import Summary:")
     print(f"✅ Successful: {success_count}/{total_count}")
     print(f"❌ Failed: {total_count - success_count}/{total_count}")
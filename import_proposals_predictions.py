@@ -4,36 +4,79 @@ Import proposal predictions CSV data into multiple proxy databases
 Creates proposals_predictions table in proxy_sds_calibrated, proxy_sel, and proxy_sel_calibrated
 """
 
-import mysql.connector
-import csv
 import os
 import argparse
-from datetime import datetime
+import time
+from ingest_engine import (connect_mysql, arrow_bool, arrow_date, arrow_float, arrow_int, arrow_text, CsvSource,
+                           choose_sink, column_transform, run_ingest)
+from table_ops import defer_table_indexes, finish_deferred_indexes
+from db_drivers import DRIVER_ERRORS, add_driver_argument, configure_driver_from_args
+from import_metrics import add_metrics_arguments, configure_metrics_from_args
+from import_history import add_history_arguments, import_unchanged_in, record_import_in
 
-def parse_date(date_str):
-    """Parse date in M/D/YYYY format"""
-    if not date_str or date_str.strip() == '':
-        return None
-    try:
-        return datetime.strptime(date_str, '%m/%d/%Y').strftime('%Y-%m-%d')
-    except ValueError:
-        return None
+def director_name(array):
+    """director_name column ('-1' means no director)"""
+    return arrow_text(array, missing=('', '-1'))
+
+# (target column, CSV column, converter) in table order (id and created_at are generated)
+PROPOSALS_PREDICTIONS_SPEC = [
+    ('proposal_master_skey', 'proposal_master_skey', arrow_int),
+    ('director_master_skey', 'director_master_skey', arrow_int),
+    ('final_key', 'final_key', arrow_text),
+    ('job_number', 'job_number', arrow_text),
+    ('issuer_name', 'issuer_name', arrow_text),
+    ('service', 'service', arrow_text),
+    ('cusip6', 'cusip6', arrow_text),
+    ('mt_date', 'mt_date', arrow_date),
+    ('ml_date', 'ml_date', arrow_date),
+    ('record_date', 'record_date', arrow_date),
+    ('mgmt_rec', 'mgmt_rec', arrow_text),
+    ('proposal', 'proposal', arrow_text),
+    ('proposal_type', 'proposal_type', arrow_text),
+    ('director_number', 'director_number', arrow_int),
+    ('director_name', 'director_name', director_name),
+    ('category', 'Category', arrow_text),
+    ('subcategory', 'Subcategory', arrow_text),
+    ('predicted_for_shares', 'predicted_for_shares', arrow_int),
+    ('predicted_against_shares', 'predicted_against_shares', arrow_int),
+    ('predicted_abstain_shares', 'predicted_abstain_shares', arrow_int),
+    ('predicted_unvoted_shares', 'predicted_unvoted_shares', arrow_int),
+    ('total_for_shares', 'total_for_shares', arrow_int),
+    ('total_against_shares', 'total_against_shares', arrow_int),
+    ('total_abstain_shares', 'total_abstain_shares', arrow_int),
+    ('total_unvoted_shares', 'total_unvoted_shares', arrow_int),
+    ('for_ratio_among_voted', 'ForRatioAmongVoted', arrow_float),
+    ('for_ratio_among_elig', 'ForRatioAmongElig', arrow_float),
+    ('voting_ratio', 'VotingRatio', arrow_float),
+    ('for_ratio_among_voted_true', 'ForRatioAmongVoted_true', arrow_float),
+    ('for_ratio_among_elig_true', 'ForRatioAmongElig_true', arrow_float),
+    ('voting_ratio_true', 'VotingRatio_true', arrow_float),
+    ('for_ratio_among_voted_incl_abs', 'ForRatioAmongVotedInclAbs', arrow_float),
+    ('for_ratio_among_elig_incl_abs', 'ForRatioAmongEligInclAbs', arrow_float),
+    ('voting_ratio_incl_abs', 'VotingRatioInclAbs', arrow_float),
+    ('for_ratio_among_voted_incl_abs_true', 'ForRatioAmongVotedInclAbs_true', arrow_float),
+    ('for_ratio_among_elig_incl_abs_true', 'ForRatioAmongEligInclAbs_true', arrow_float),
+    ('voting_ratio_incl_abs_true', 'VotingRatioInclAbs_true', arrow_float),
+    ('for_percentage', 'For %', arrow_float),
+    ('against_percentage', 'Against %', arrow_float),
+    ('abstain_percentage', 'Abstain %', arrow_float),
+    ('for_percentage_true', 'For % True', arrow_float),
+    ('against_percentage_true', 'Against % True', arrow_float),
+    ('abstain_percentage_true', 'Abstain % True', arrow_float),
+    ('prediction_correct', 'prediction_correct', arrow_bool),
+    ('approved', 'approved', arrow_bool),
+    ('for_prospectus_2026', 'For (%) - From Prospectus 2026 File', arrow_float),
+    ('against_prospectus_2026', 'Against (%) - From Prospectus 2026 File', arrow_text),
+    ('abstain_prospectus_2026', 'Abstain/Withhold (%) - From Prospectus 2026 File', arrow_text),
+]
+PROPOSALS_PREDICTIONS_COLUMNS = [target for target, _, _ in PROPOSALS_PREDICTIONS_SPEC]
 
 def get_db_connection(database_name):
     """Create database connection"""
-    try:
-        connection = mysql.connector.connect(
-            host='localhost',
-            user='webapp',
-            password='webapppass',
-            database=database_name,
-            autocommit=False,
-            buffered=True
-        )
-        return connection
-    except mysql.connector.Error as err:
-        print(f"❌ Error connecting to {database_name}: {err}")
-        return None
+    connection = connect_mysql(database_name, prompt_root=False, buffered=True)
+    if not connection:
+        print(f"❌ Error connecting to {database_name}")
+    return connection
 
 def create_proposals_predictions_table(database_name):
     """Create proposals_predictions table with proper schema"""
@@ -112,7 +155,7 @@ def create_proposals_predictions_table(database_name):
         print(f"✅ Created proposals_predictions table in {database_name}")
         return True
         
-    except mysql.connector.Error as err:
+    except DRIVER_ERRORS as err:
         print(f"❌ Error creating table in {database_name}: {err}")
         connection.rollback()
         return False
@@ -120,90 +163,6 @@ def create_proposals_predictions_table(database_name):
         cursor.close()
         connection.close()
 
-def safe_float(value):
-    """Safely convert to float"""
-    if not value or value.strip() == '':
-        return None
-    try:
-        return float(value)
-    except (ValueError, TypeError):
-        return None
-
-def safe_int(value):
-    """Safely convert to int"""
-    if not value or value.strip() == '' or str(value).strip() == '-1':
-        return None
-    try:
-        return int(float(value))  # Handle cases like "123.0"
-    except (ValueError, TypeError):
-        return None
-
-def safe_bool(value):
-    """Safely convert to boolean"""
-    if not value or value.strip() == '':
-        return None
-    value_upper = str(value).upper().strip()
-    if value_upper in ['TRUE', '1', 'YES', 'Y']:
-        return True
-    elif value_upper in ['FALSE', '0', 'NO', 'N']:
-        return False
-    return None
-
-def process_row_data(row):
-    """Process a CSV row into database-ready format"""
-    # Handle different CSV formats (quoted vs unquoted)
-    data = {
-        'proposal_master_skey': safe_int(row.get('proposal_master_skey')),
-        'director_master_skey': safe_int(row.get('director_master_skey')),
-        'final_key': row.get('final_key') or None,
-        'job_number': row.get('job_number') or None,
-        'issuer_name': row.get('issuer_name') or None,
-        'service': row.get('service') or None,
-        'cusip6': row.get('cusip6') or None,
-        'mt_date': parse_date(row.get('mt_date')),
-        'ml_date': parse_date(row.get('ml_date')),
-        'record_date': parse_date(row.get('record_date')),
-        'mgmt_rec': row.get('mgmt_rec') or None,
-        'proposal': row.get('proposal') or None,
-        'proposal_type': row.get('proposal_type') or None,
-        'director_number': safe_int(row.get('director_number')),
-        'director_name': row.get('director_name') if row.get('director_name') not in ['', '-1'] else None,
-        'category': row.get('Category') or None,
-        'subcategory': row.get('Subcategory') or None,
-        'predicted_for_shares': safe_int(row.get('predicted_for_shares')),
-        'predicted_against_shares': safe_int(row.get('predicted_against_shares')),
-        'predicted_abstain_shares': safe_int(row.get('predicted_abstain_shares')),
-        'predicted_unvoted_shares': safe_int(row.get('predicted_unvoted_shares')),
-        'total_for_shares': safe_int(row.get('total_for_shares')),
-        'total_against_shares': safe_int(row.get('total_against_shares')),
-        'total_abstain_shares': safe_int(row.get('total_abstain_shares')),
-        'total_unvoted_shares': safe_int(row.get('total_unvoted_shares')),
-        'for_ratio_among_voted': safe_float(row.get('ForRatioAmongVoted')),
-        'for_ratio_among_elig': safe_float(row.get('ForRatioAmongElig')),
-        'voting_ratio': safe_float(row.get('VotingRatio')),
-        'for_ratio_among_voted_true': safe_float(row.get('ForRatioAmongVoted_true')),
-        'for_ratio_among_elig_true': safe_float(row.get('ForRatioAmongElig_true')),
-        'voting_ratio_true': safe_float(row.get('VotingRatio_true')),
-        'for_ratio_among_voted_incl_abs': safe_float(row.get('ForRatioAmongVotedInclAbs')),
-        'for_ratio_among_elig_incl_abs': safe_float(row.get('ForRatioAmongEligInclAbs')),
-        'voting_ratio_incl_abs': safe_float(row.get('VotingRatioInclAbs')),
-        'for_ratio_among_voted_incl_abs_true': safe_float(row.get('ForRatioAmongVotedInclAbs_true')),
-        'for_ratio_among_elig_incl_abs_true': safe_float(row.get('ForRatioAmongEligInclAbs_true')),
-        'voting_ratio_incl_abs_true': safe_float(row.get('VotingRatioInclAbs_true')),
-        'for_percentage': safe_float(row.get('For %')),
-        'against_percentage': safe_float(row.get('Against %')),
-        'abstain_percentage': safe_float(row.get('Abstain %')),
-        'for_percentage_true': safe_float(row.get('For % True')),
-        'against_percentage_true': safe_float(row.get('Against % True')),
-        'abstain_percentage_true': safe_float(row.get('Abstain % True')),
-        'prediction_correct': safe_bool(row.get('prediction_correct')),
-        'approved': safe_bool(row.get('approved')),
-        'for_prospectus_2026': safe_float(row.get('For (%) - From Prospectus 2026 File')),
-        'against_prospectus_2026': row.get('Against (%) - From Prospectus 2026 File') or None,
-        'abstain_prospectus_2026': row.get('Abstain/Withhold (%) - From Prospectus 2026 File') or None,
-    }
-    return data
-
 def import_csv_to_database(csv_file, database_name):
     """Import CSV data into the specified database"""
     if not os.path.exists(csv_file):
@@ -216,79 +175,22 @@ def import_csv_to_database(csv_file, database_name):
     
     cursor = connection.cursor()
     
-    # Insert SQL with all columns
-    insert_sql = """
-    INSERT INTO proposals_predictions (
-        proposal_master_skey, director_master_skey, final_key, job_number,
-        issuer_name, service, cusip6, mt_date, ml_date, record_date,
-        mgmt_rec, proposal, proposal_type, director_number, director_name,
-        category, subcategory, predicted_for_shares, predicted_against_shares,
-        predicted_abstain_shares, predicted_unvoted_shares, total_for_shares,
-        total_against_shares, total_abstain_shares, total_unvoted_shares,
-        for_ratio_among_voted, for_ratio_among_elig, voting_ratio,
-        for_ratio_among_voted_true, for_ratio_among_elig_true, voting_ratio_true,
-        for_ratio_among_voted_incl_abs, for_ratio_among_elig_incl_abs,
-        voting_ratio_incl_abs, for_ratio_among_voted_incl_abs_true,
-        for_ratio_among_elig_incl_abs_true, voting_ratio_incl_abs_true,
-        for_percentage, against_percentage, abstain_percentage,
-        for_percentage_true, against_percentage_true, abstain_percentage_true,
-        prediction_correct, approved, for_prospectus_2026,
-        against_prospectus_2026, abstain_prospectus_2026
-    ) VALUES (
-        %(proposal_master_skey)s, %(director_master_skey)s, %(final_key)s, %(job_number)s,
-        %(issuer_name)s, %(service)s, %(cusip6)s, %(mt_date)s, %(ml_date)s, %(record_date)s,
-        %(mgmt_rec)s, %(proposal)s, %(proposal_type)s, %(director_number)s, %(director_name)s,
-        %(category)s, %(subcategory)s, %(predicted_for_shares)s, %(predicted_against_shares)s,
-        %(predicted_abstain_shares)s, %(predicted_unvoted_shares)s, %(total_for_shares)s,
-        %(total_against_shares)s, %(total_abstain_shares)s, %(total_unvoted_shares)s,
-        %(for_ratio_among_voted)s, %(for_ratio_among_elig)s, %(voting_ratio)s,
-        %(for_ratio_among_voted_true)s, %(for_ratio_among_elig_true)s, %(voting_ratio_true)s,
-        %(for_ratio_among_voted_incl_abs)s, %(for_ratio_among_elig_incl_abs)s,
-        %(voting_ratio_incl_abs)s, %(for_ratio_among_voted_incl_abs_true)s,
-        %(for_ratio_among_elig_incl_abs_true)s, %(voting_ratio_incl_abs_true)s,
-        %(for_percentage)s, %(against_percentage)s, %(abstain_percentage)s,
-        %(for_percentage_true)s, %(against_percentage_true)s, %(abstain_percentage_true)s,
-        %(prediction_correct)s, %(approved)s, %(for_prospectus_2026)s,
-        %(against_prospectus_2026)s, %(abstain_prospectus_2026)s
-    )
-    """
-    
     try:
         print(f"📂 Reading CSV file: {csv_file}")
         file_size = os.path.getsize(csv_file) / (1024 * 1024)  # MB
         print(f"📊 File size: {file_size:.2f} MB")
         
-        with open(csv_file, 'r', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
-            
-            count = 0
-            batch_size = 1000
-            batch_data = []
-            
-            for row in reader:
-                data = process_row_data(row)
-                batch_data.append(data)
-                count += 1
-                
-                # Process in batches
-                if count % batch_size == 0:
-                    cursor.executemany(insert_sql, batch_data)
-                    connection.commit()
-                    batch_data = []
-                    print(f"📝 Processed {count} rows...")
-            
-            # Process remaining batch
-            if batch_data:
-                cursor.executemany(insert_sql, batch_data)
-                connection.commit()
-            
-            print(f"✅ Successfully imported {count} rows into {database_name}")
-            
-            # Verify import
-            cursor.execute("SELECT COUNT(*) FROM proposals_predictions")
-            total = cursor.fetchone()[0]
-            print(f"📊 Total rows in {database_name}.proposals_predictions: {total}")
-            return True
+        transform = column_transform(PROPOSALS_PREDICTIONS_SPEC)
+        sink = choose_sink(connection, 'proposals_predictions', PROPOSALS_PREDICTIONS_COLUMNS, batch_size=1000)
+        stats = run_ingest(CsvSource(csv_file), sink, transform, label=f"{database_name}.proposals_predictions")
+        
+        print(f"✅ Successfully imported {stats['rows_written']} rows into {database_name}")
+        
+        # Verify import
+        cursor.execute("SELECT COUNT(*) FROM proposals_predictions")
+        total = cursor.fetchone()[0]
+        print(f"📊 Total rows in {database_name}.proposals_predictions: {total}")
+        return True
             
     except Exception as err:
         print(f"❌ Error importing to {database_name}: {err}")
@@ -304,8 +206,17 @@ def main():
                        default='all', help='Target database (default: all)')
     parser.add_argument('--create-tables', action='store_true', 
                        help='Create tables before importing (default: True)')
+    parser.add_argument('--defer-indexes', action='store_true',
+                       help='Drop secondary indexes before loading and rebuild them afterwards')
+    parser.add_argument('--index-workers', type=int, default=3,
+                       help='Tables whose indexes are rebuilt in parallel (default: 3)')
     
+    add_history_arguments(parser)
+    add_metrics_arguments(parser)
+    add_driver_argument(parser)
     args = parser.parse_args()
+    configure_metrics_from_args(args)
+    configure_driver_from_args(args)
     
     # Database and file mappings
     database_configs = {
@@ -335,6 +246,9 @@ def main():
     
     success_count = 0
     total_count = len(targets)
+    index_jobs = []
+    loaded = []
+    load_seconds = 0.0
     
     for target in targets:
         config = database_configs[target]
@@ -343,18 +257,39 @@ def main():
         
         print(f"\n🔄 Processing {target} ({database_name})...")
         
+        # Checked before --create-tables so an unchanged table is not dropped
+        if import_unchanged_in(database_name, 'proposals_predictions', [csv_file], args.force):
+            success_count += 1
+            print("-" * 40)
+            continue
+        
         # Create table if requested
         if args.create_tables:
             if not create_proposals_predictions_table(database_name):
                 print(f"❌ Failed to create table in {database_name}")
                 continue
         
+        if args.defer_indexes:
+            try:
+                index_jobs.append(defer_table_indexes(database_name, 'proposals_predictions'))
+            except Exception as err:
+                print(f"⚠️ Could not defer indexes in {database_name}, loading with them: {err}")
+        
         # Import data
+        load_start = time.time()
         if import_csv_to_database(csv_file, database_name):
             success_count += 1
+            loaded.append((database_name, csv_file))
+        load_seconds += time.time() - load_start
         
         print("-" * 40)
     
+    # Rebuild even after failed loads so no table is left without its indexes
+    failed_indexes = finish_deferred_indexes(index_jobs, load_seconds, args.index_workers)
+    for database_name, csv_file in loaded:
+        if f"{database_name}.proposals_predictions" not in failed_indexes:
+            record_import_in(database_name, 'proposals_predictions', [csv_file])
+    
     print(f"\n🎯 Import Summary:")
     print(f"✅ Successful: {success_count}/{total_count}")
     print(f"❌ Failed: {total_count - success_count}/{total_count}")
@@ -74,7 +74,7 @@ echo ""
 echo "🚀 Starting bulk import process..."
 echo ""
 
-python3 import_proposals_predictions_bulk.py
+python3 import_proposals_predictions_bulk.py "$@"
 
 # Check exit code
 if [ $? -eq 0 ]; then
@@ -11,19 +11,74 @@ This script drops existing proposals_predictions tables and recreates them with
 Imports ALL CSV fields except the last 'merged_proposal' column.
 """
 
-import mysql.connector
-import csv
 import sys
 import os
-from datetime import datetime, date
-from decimal import Decimal, InvalidOperation
+import argparse
+import time
+from datetime import datetime
+from ingest_engine import (connect_mysql, arrow_bool, arrow_date, arrow_float, arrow_int, arrow_text, CsvSource,
+                           choose_sink, column_transform, run_ingest, run_parallel_imports)
+from table_ops import defer_table_indexes, finish_deferred_indexes
+from db_drivers import DRIVER_ERRORS, add_driver_argument, configure_driver_from_args
+from import_metrics import add_metrics_arguments, configure_metrics_from_args
+from import_history import add_history_arguments, import_unchanged_in, record_import_in
 
-# Database configuration
-DB_CONFIG = {
-    'host': 'localhost',
-    'user': 'webapp',
-    'password': 'webapppass'
-}
+def director_name(array):
+    """director_name column ('-1' means no director)"""
+    return arrow_text(array, missing=('', '-1'))
+
+# (target column, CSV column, converter) in table order (id and created_at are generated)
+PROPOSALS_PREDICTIONS_SPEC = [
+    ('proposal_master_skey', 'proposal_master_skey', arrow_int),
+    ('director_master_skey', 'director_master_skey', arrow_int),
+    ('final_key', 'final_key', arrow_text),
+    ('job_number', 'job_number', arrow_text),
+    ('issuer_name', 'issuer_name', arrow_text),
+    ('service', 'service', arrow_text),
+    ('cusip6', 'cusip6', arrow_text),
+    ('mt_date', 'mt_date', arrow_date),
+    ('ml_date', 'ml_date', arrow_date),
+    ('record_date', 'record_date', arrow_date),
+    ('mgmt_rec', 'mgmt_rec', arrow_text),
+    ('proposal', 'proposal', arrow_text),
+    ('proposal_type', 'proposal_type', arrow_text),
+    ('director_number', 'director_number', arrow_int),
+    ('director_name', 'director_name', director_name),
+    ('category', 'Category', arrow_text),
+    ('subcategory', 'Subcategory', arrow_text),
+    ('predicted_for_shares', 'predicted_for_shares', arrow_int),
+    ('predicted_against_shares', 'predicted_against_shares', arrow_int),
+    ('predicted_abstain_shares', 'predicted_abstain_shares', arrow_int),
+    ('predicted_unvoted_shares', 'predicted_unvoted_shares', arrow_int),
+    ('total_for_shares', 'total_for_shares', arrow_int),
+    ('total_against_shares', 'total_against_shares', arrow_int),
+    ('total_abstain_shares', 'total_abstain_shares', arrow_int),
+    ('total_unvoted_shares', 'total_unvoted_shares', arrow_int),
+    ('for_ratio_among_voted', 'ForRatioAmongVoted', arrow_float),
+    ('for_ratio_among_elig', 'ForRatioAmongElig', arrow_float),
+    ('voting_ratio', 'VotingRatio', arrow_float),
+    ('for_ratio_among_voted_true', 'ForRatioAmongVoted_true', arrow_float),
+    ('for_ratio_among_elig_true', 'ForRatioAmongElig_true', arrow_float),
+    ('voting_ratio_true', 'VotingRatio_true', arrow_float),
+    ('for_ratio_among_voted_incl_abs', 'ForRatioAmongVotedInclAbs', arrow_float),
+    ('for_ratio_among_elig_incl_abs', 'ForRatioAmongEligInclAbs', arrow_float),
+    ('voting_ratio_incl_abs', 'VotingRatioInclAbs', arrow_float),
+    ('for_ratio_among_voted_incl_abs_true', 'ForRatioAmongVotedInclAbs_true', arrow_float),
+    ('for_ratio_among_elig_incl_abs_true', 'ForRatioAmongEligInclAbs_true', arrow_float),
+    ('voting_ratio_incl_abs_true', 'VotingRatioInclAbs_true', arrow_float),
+    ('for_percentage', 'For %', arrow_float),
+    ('against_percentage', 'Against %', arrow_float),
+    ('abstain_percentage', 'Abstain %', arrow_float),
+    ('for_percentage_true', 'For % True', arrow_float),
+    ('against_percentage_true', 'Against % True', arrow_float),
+    ('abstain_percentage_true', 'Abstain % True', arrow_float),
+    ('prediction_correct', 'prediction_correct', arrow_bool),
+    ('approved', 'approved', arrow_bool),
+    ('for_prospectus_2026', 'For (%) - From Prospectus 2026 File', arrow_float),
+    ('against_prospectus_2026', 'Against (%) - From Prospectus 2026 File', arrow_text),
+    ('abstain_prospectus_2026', 'Abstain/Withhold (%) - From Prospectus 2026 File', arrow_text),
+]
+PROPOSALS_PREDICTIONS_COLUMNS = [target for target, _, _ in PROPOSALS_PREDICTIONS_SPEC]
 
 # CSV to Database mapping
 CSV_DATABASE_MAPPING = {
@@ -33,71 +88,12 @@ CSV_DATABASE_MAPPING = {
     'docker/2025_Nov_to_July_Predictions_CalibratedModel_666.csv': 'proxy_sel_calibrated'
 }
 
-def safe_float(value):
-    """Safely convert to float"""
-    if not value or value.strip() == '':
-        return None
-    try:
-        return float(value)
-    except (ValueError, TypeError):
-        return None
-
-def safe_int(value):
-    """Safely convert to int"""
-    if not value or value.strip() == '' or str(value).strip() == '-1':
-        return None
-    try:
-        return int(float(value))  # Handle cases like "123.0"
-    except (ValueError, TypeError):
-        return None
-
-def safe_bool(value):
-    """Safely convert to boolean"""
-    if not value or value.strip() == '':
-        return None
-    value_upper = str(value).upper().strip()
-    if value_upper in ['TRUE', '1', 'YES', 'Y']:
-        return True
-    elif value_upper in ['FALSE', '0', 'NO', 'N']:
-        return False
-    return None
-
-def parse_date(date_str):
-    """Parse date string with multiple format support"""
-    if not date_str or date_str.strip() == '' or date_str.strip().lower() == 'null':
-        return None
-    
-    date_formats = [
-        '%Y-%m-%d',      # 2024-12-31
-        '%m/%d/%Y',      # 12/31/2024
-        '%d/%m/%Y',      # 31/12/2024
-        '%Y/%m/%d',      # 2024/12/31
-        '%m-%d-%Y',      # 12-31-2024
-        '%d-%m-%Y'       # 31-12-2024
-    ]
-    
-    for date_format in date_formats:
-        try:
-            return datetime.strptime(date_str.strip(), date_format).date()
-        except ValueError:
-            continue
-    
-    print(f"⚠️ Warning: Could not parse date '{date_str}', setting to None")
-    return None
-
 def create_database_connection(database_name):
     """Create database connection for specific database"""
-    try:
-        connection = mysql.connector.connect(
-            **DB_CONFIG,
-            database=database_name,
-            charset='utf8mb4',
-            use_unicode=True
-        )
-        return connection
-    except mysql.connector.Error as err:
-        print(f"❌ Error connecting to database {database_name}: {err}")
-        return None
+    connection = connect_mysql(database_name, prompt_root=False)
+    if not connection:
+        print(f"❌ Error connecting to database {database_name}")
+    return connection
 
 def drop_and_create_proposals_predictions_table(database_name):
     """Drop existing proposals_predictions table and recreate with comprehensive structure"""
@@ -179,66 +175,15 @@ def drop_and_create_proposals_predictions_table(database_name):
         connection.close()
         return True
         
-    except mysql.connector.Error as err:
+    except DRIVER_ERRORS as err:
         print(f"❌ Error creating table in {database_name}: {err}")
         if connection:
             connection.close()
         return False
 
-def process_row_data(row):
-    """Process a CSV row into database-ready format"""
-    # Handle different CSV formats (quoted vs unquoted)
-    data = {
-        'proposal_master_skey': safe_int(row.get('proposal_master_skey')),
-        'director_master_skey': safe_int(row.get('director_master_skey')),
-        'final_key': row.get('final_key') or None,
-        'job_number': row.get('job_number') or None,
-        'issuer_name': row.get('issuer_name') or None,
-        'service': row.get('service') or None,
-        'cusip6': row.get('cusip6') or None,
-        'mt_date': parse_date(row.get('mt_date')),
-        'ml_date': parse_date(row.get('ml_date')),
-        'record_date': parse_date(row.get('record_date')),
-        'mgmt_rec': row.get('mgmt_rec') or None,
-        'proposal': row.get('proposal') or None,
-        'proposal_type': row.get('proposal_type') or None,
-        'director_number': safe_int(row.get('director_number')),
-        'director_name': row.get('director_name') if row.get('director_name') not in ['', '-1'] else None,
-        'category': row.get('Category') or None,  # Note: CSV uses 'Category' not 'category'
-        'subcategory': row.get('Subcategory') or None,
-        'predicted_for_shares': safe_int(row.get('predicted_for_shares')),
-        'predicted_against_shares': safe_int(row.get('predicted_against_shares')),
-        'predicted_abstain_shares': safe_int(row.get('predicted_abstain_shares')),
-        'predicted_unvoted_shares': safe_int(row.get('predicted_unvoted_shares')),
-        'total_for_shares': safe_int(row.get('total_for_shares')),
-        'total_against_shares': safe_int(row.get('total_against_shares')),
-        'total_abstain_shares': safe_int(row.get('total_abstain_shares')),
-        'total_unvoted_shares': safe_int(row.get('total_unvoted_shares')),
-        'for_ratio_among_voted': safe_float(row.get('ForRatioAmongVoted')),
-        'for_ratio_among_elig': safe_float(row.get('ForRatioAmongElig')),
-        'voting_ratio': safe_float(row.get('VotingRatio')),
-        'for_ratio_among_voted_true': safe_float(row.get('ForRatioAmongVoted_true')),
-        'for_ratio_among_elig_true': safe_float(row.get('ForRatioAmongElig_true')),
-        'voting_ratio_true': safe_float(row.get('VotingRatio_true')),
-        'for_ratio_among_voted_incl_abs': safe_float(row.get('ForRatioAmongVotedInclAbs')),
-        'for_ratio_among_elig_incl_abs': safe_float(row.get('ForRatioAmongEligInclAbs')),
-        'voting_ratio_incl_abs': safe_float(row.get('VotingRatioInclAbs')),
-        'for_ratio_among_voted_incl_abs_true': safe_float(row.get('ForRatioAmongVotedInclAbs_true')),
-        'for_ratio_among_elig_incl_abs_true': safe_float(row.get('ForRatioAmongEligInclAbs_true')),
-        'voting_ratio_incl_abs_true': safe_float(row.get('VotingRatioInclAbs_true')),
-        'for_percentage': safe_float(row.get('For %')),
-        'against_percentage': safe_float(row.get('Against %')),
-        'abstain_percentage': safe_float(row.get('Abstain %')),
-        'for_percentage_true': safe_float(row.get('For % True')),
-        'against_percentage_true': safe_float(row.get('Against % True')),
-        'abstain_percentage_true': safe_float(row.get('Abstain % True')),
-        'prediction_correct': safe_bool(row.get('prediction_correct')),
-        'approved': safe_bool(row.get('approved')),
-        'for_prospectus_2026': safe_float(row.get('For (%) - From Prospectus 2026 File')),
-        'against_prospectus_2026': row.get('Against (%) - From Prospectus 2026 File') or None,
-        'abstain_prospectus_2026': row.get('Abstain/Withhold (%) - From Prospectus 2026 File') or None,
-    }
-    return data
+def is_merge_column(column_name):
+    """CSV columns named merge_* are not imported"""
+    return column_name.lower().startswith('merge_')
 
 def import_csv_to_database(csv_file_path, database_name):
     """Import CSV data into proposals_predictions table"""
@@ -251,101 +196,30 @@ def import_csv_to_database(csv_file_path, database_name):
         return False
     
     try:
+        print(f"📂 Reading CSV file: {csv_file_path}")
+        source = CsvSource(csv_file_path, exclude=is_merge_column)
+        original_columns = source.header()
+        print(f"📋 Original CSV columns: {original_columns}")
+        print(f"📋 Filtered columns (excluding merge_* columns): "
+              f"{[col for col in original_columns if not is_merge_column(col)]}")
+        
+        transform = column_transform(PROPOSALS_PREDICTIONS_SPEC)
+        sink = choose_sink(connection, 'proposals_predictions', PROPOSALS_PREDICTIONS_COLUMNS, batch_size=1000)
+        stats = run_ingest(source, sink, transform, label=f"{database_name}.proposals_predictions")
+        
+        # Verify final count
         cursor = connection.cursor()
+        cursor.execute("SELECT COUNT(*) FROM proposals_predictions")
+        total_count = cursor.fetchone()[0]
         
-        print(f"📂 Reading CSV file: {csv_file_path}")
-        with open(csv_file_path, 'r', encoding='utf-8') as file:
-            reader = csv.DictReader(file)
-            
-            # Get columns and filter out merge columns
-            original_columns = reader.fieldnames
-            print(f"📋 Original CSV columns: {original_columns}")
-            
-            # Filter out merge columns (last column that starts with 'merge_')
-            filtered_columns = [col for col in original_columns if not col.lower().startswith('merge_')]
-            print(f"📋 Filtered columns (excluding merge_* columns): {filtered_columns}")
-            
-            # Insert SQL with all columns
-            insert_sql = """
-            INSERT INTO proposals_predictions (
-                proposal_master_skey, director_master_skey, final_key, job_number,
-                issuer_name, service, cusip6, mt_date, ml_date, record_date,
-                mgmt_rec, proposal, proposal_type, director_number, director_name,
-                category, subcategory, predicted_for_shares, predicted_against_shares,
-                predicted_abstain_shares, predicted_unvoted_shares, total_for_shares,
-                total_against_shares, total_abstain_shares, total_unvoted_shares,
-                for_ratio_among_voted, for_ratio_among_elig, voting_ratio,
-                for_ratio_among_voted_true, for_ratio_among_elig_true, voting_ratio_true,
-                for_ratio_among_voted_incl_abs, for_ratio_among_elig_incl_abs,
-                voting_ratio_incl_abs, for_ratio_among_voted_incl_abs_true,
-                for_ratio_among_elig_incl_abs_true, voting_ratio_incl_abs_true,
-                for_percentage, against_percentage, abstain_percentage,
-                for_percentage_true, against_percentage_true, abstain_percentage_true,
-                prediction_correct, approved, for_prospectus_2026,
-                against_prospectus_2026, abstain_prospectus_2026
-            ) VALUES (
-                %(proposal_master_skey)s, %(director_master_skey)s, %(final_key)s, %(job_number)s,
-                %(issuer_name)s, %(service)s, %(cusip6)s, %(mt_date)s, %(ml_date)s, %(record_date)s,
-                %(mgmt_rec)s, %(proposal)s, %(proposal_type)s, %(director_number)s, %(director_name)s,
-                %(category)s, %(subcategory)s, %(predicted_for_shares)s, %(predicted_against_shares)s,
-                %(predicted_abstain_shares)s, %(predicted_unvoted_shares)s, %(total_for_shares)s,
-                %(total_against_shares)s, %(total_abstain_shares)s, %(total_unvoted_shares)s,
-                %(for_ratio_among_voted)s, %(for_ratio_among_elig)s, %(voting_ratio)s,
-                %(for_ratio_among_voted_true)s, %(for_ratio_among_elig_true)s, %(voting_ratio_true)s,
-                %(for_ratio_among_voted_incl_abs)s, %(for_ratio_among_elig_incl_abs)s,
-                %(voting_ratio_incl_abs)s, %(for_ratio_among_voted_incl_abs_true)s,
-                %(for_ratio_among_elig_incl_abs_true)s, %(voting_ratio_incl_abs_true)s,
-                %(for_percentage)s, %(against_percentage)s, %(abstain_percentage)s,
-                %(for_percentage_true)s, %(against_percentage_true)s, %(abstain_percentage_true)s,
-                %(prediction_correct)s, %(approved)s, %(for_prospectus_2026)s,
-                %(against_prospectus_2026)s, %(abstain_prospectus_2026)s
-            )
-            """
-            
-            success_count = 0
-            error_count = 0
-            batch_size = 1000
-            batch_data = []
-            
-            for row_num, row in enumerate(reader, start=2):  # Start at 2 because header is row 1
-                try:
-                    data = process_row_data(row)
-                    batch_data.append(data)
-                    
-                    # Execute batch insert
-                    if len(batch_data) >= batch_size:
-                        cursor.executemany(insert_sql, batch_data)
-                        connection.commit()
-                        success_count += len(batch_data)
-                        print(f"✅ Inserted batch of {len(batch_data)} rows (Total: {success_count})")
-                        batch_data = []
-                    
-                except Exception as e:
-                    error_count += 1
-                    print(f"❌ Error processing row {row_num}: {e}")
-                    if error_count > 100:  # Stop if too many errors
-                        print(f"💥 Too many errors ({error_count}), stopping import")
-                        break
-            
-            # Insert remaining batch
-            if batch_data:
-                cursor.executemany(insert_sql, batch_data)
-                connection.commit()
-                success_count += len(batch_data)
-                print(f"✅ Inserted final batch of {len(batch_data)} rows")
-            
-            # Verify final count
-            cursor.execute("SELECT COUNT(*) FROM proposals_predictions")
-            total_count = cursor.fetchone()[0]
-            
-            print(f"\n📊 Import Summary for {database_name}:")
-            print(f"   ✅ Successfully imported: {success_count} rows")
-            print(f"   ❌ Errors encountered: {error_count} rows")
-            print(f"   📊 Total rows in database: {total_count}")
-            
-            cursor.close()
-            connection.close()
-            return True
+        print(f"\n📊 Import Summary for {database_name}:")
+        print(f"   ✅ Successfully imported: {stats['rows_written']} rows")
+        print(f"   ❌ Errors encountered: {transform.state['errors']} rows")
+        print(f"   📊 Total rows in database: {total_count}")
+        
+        cursor.close()
+        connection.close()
+        return True
             
     except Exception as e:
         print(f"❌ Error importing CSV {csv_file_path} to {database_name}: {e}")
@@ -353,8 +227,74 @@ def import_csv_to_database(csv_file_path, database_name):
             connection.close()
         return False
 
+def import_mapping(csv_filename, database_name, defer_indexes=False, rebuild_indexes=False, force=False):
+    """Drop/recreate, load and verify one CSV -> database mapping
+
+    Returns (imported, index_job, load_seconds). With rebuild_indexes the deferred
+    indexes are rebuilt here and index_job is None (used by the parallel workers).
+    The import is recorded here unless index_job is returned; the caller records it
+    after rebuilding the indexes. An unchanged source and table count as imported.
+    """
+    print(f"\n📂 Processing: {csv_filename} → {database_name}.proposals_predictions")
+    print("-" * 60)
+    
+    # Check if CSV file exists
+    if not os.path.exists(csv_filename):
+        print(f"⚠️ CSV file not found: {csv_filename}")
+        print(f"   Please ensure the file exists in the current directory")
+        return False, None, 0.0
+    
+    if import_unchanged_in(database_name, 'proposals_predictions', [csv_filename], force):
+        return True, None, 0.0
+    
+    # Drop and recreate table
+    if not drop_and_create_proposals_predictions_table(database_name):
+        print(f"❌ Failed to create table in {database_name}")
+        return False, None, 0.0
+    
+    index_job = None
+    if defer_indexes:
+        try:
+            index_job = defer_table_indexes(database_name, 'proposals_predictions')
+        except Exception as e:
+            print(f"⚠️ Could not defer indexes in {database_name}, loading with them: {e}")
+    
+    # Import CSV data
+    load_start = time.time()
+    imported = import_csv_to_database(csv_filename, database_name)
+    load_seconds = time.time() - load_start
+    if imported:
+        print(f"✅ Successfully completed {csv_filename} → {database_name}")
+    else:
+        print(f"❌ Failed to import {csv_filename} → {database_name}")
+    
+    if index_job and rebuild_indexes:
+        # Rebuild even after a failed load so the table is not left without its indexes
+        if finish_deferred_indexes([index_job], load_seconds, 1):
+            imported = False
+        index_job = None
+    if imported and index_job is None:
+        record_import_in(database_name, 'proposals_predictions', [csv_filename])
+    return imported, index_job, load_seconds
+
 def main():
     """Main function to process all CSV files"""
+    parser = argparse.ArgumentParser(description='Bulk import proposals_predictions CSV files')
+    parser.add_argument('--defer-indexes', action='store_true',
+                       help='Build secondary indexes after loading instead of during it')
+    parser.add_argument('--index-workers', type=int, default=4,
+                       help='Tables whose indexes are rebuilt in parallel (default: 4)')
+    parser.add_argument('--workers', type=int, default=1,
+                       help='Import the CSV -> database mappings in this many processes at once (default: 1)')
+    parser.add_argument('--log-dir', default='import_logs',
+                       help='Per-database logs of the --workers mode (default: import_logs)')
+    add_history_arguments(parser)
+    add_metrics_arguments(parser)
+    add_driver_argument(parser)
+    args = parser.parse_args()
+    configure_metrics_from_args(args)
+    configure_driver_from_args(args)
+    
     print("🚀 Starting comprehensive bulk proposals_predictions import...")
     print(f"⏰ Start time: {datetime.now()}")
     print("=" * 80)
@@ -362,27 +302,32 @@ def main():
     success_count = 0
     total_files = len(CSV_DATABASE_MAPPING)
     
-    for csv_filename, database_name in CSV_DATABASE_MAPPING.items():
-        print(f"\n📂 Processing: {csv_filename} → {database_name}.proposals_predictions")
-        print("-" * 60)
-        
-        # Check if CSV file exists
-        if not os.path.exists(csv_filename):
-            print(f"⚠️ CSV file not found: {csv_filename}")
-            print(f"   Please ensure the file exists in the current directory")
-            continue
-        
-        # Drop and recreate table
-        if not drop_and_create_proposals_predictions_table(database_name):
-            print(f"❌ Failed to create table in {database_name}")
-            continue
+    if args.workers > 1:
+        # All mappings at once: wall time follows the slowest file instead of the sum
+        jobs = [(database_name, import_mapping, (csv_filename, database_name, args.defer_indexes, True, args.force))
+                for csv_filename, database_name in CSV_DATABASE_MAPPING.items()]
+        results = run_parallel_imports(jobs, args.workers, args.log_dir)
+        success_count = sum(1 for result, _ in results.values() if result and result[0])
+    else:
+        index_jobs = []
+        deferred = []
+        load_seconds = 0.0
+        for csv_filename, database_name in CSV_DATABASE_MAPPING.items():
+            imported, index_job, seconds = import_mapping(csv_filename, database_name, args.defer_indexes,
+                                                          force=args.force)
+            load_seconds += seconds
+            if index_job:
+                index_jobs.append(index_job)
+                if imported:
+                    deferred.append((csv_filename, database_name))
+            if imported:
+                success_count += 1
         
-        # Import CSV data
-        if import_csv_to_database(csv_filename, database_name):
-            success_count += 1
-            print(f"✅ Successfully completed {csv_filename} → {database_name}")
-        else:
-            print(f"❌ Failed to import {csv_filename} → {database_name}")
+        # Rebuild even after failed loads so no table is left without its indexes
+        failed_indexes = finish_deferred_indexes(index_jobs, load_seconds, args.index_workers)
+        for csv_filename, database_name in deferred:
+            if f"{database_name}.proposals_predictions" not in failed_indexes:
+                record_import_in(database_name, 'proposals_predictions', [csv_filename])
     
     print("\n" + "=" * 80)
     print(f"🎯 Comprehensive Bulk Import Complete!")
@@ -6,59 +6,32 @@ Imports calibrated account_voted and account_unvoted parquet files into the prox
 
 import os
 import sys
+import argparse
 import pandas as pd
-import mysql.connector
 from datetime import datetime
 import math
+import itertools
+import pyarrow.parquet as pq
+from db_drivers import add_driver_argument, configure_driver_from_args
+from ingest_engine import (ADAPTIVE_MAX_ROWS, AdaptiveBatchSizer, connect_mysql, executemany_adaptive,
+                           max_allowed_packet)
+from parquet_ingest import (CONVERTERS, STREAM_MEMORY_BUDGET, get_table_config, convert_arrow_table, count_blank_keys,
+                            iter_row_batches, iter_account_batches, loaded_columns)
+from table_ops import create_staging_table, swap_staging_table, restore_previous_table
+from import_metrics import add_metrics_arguments, configure_metrics_from_args, stage_timer, timed_batches
+from import_history import add_history_arguments, import_unchanged, record_import
 
-def get_db_connection():
-    """Create database connection to proxy_sel_calibrated with fallback options"""
-    try:
-        print("🔍 Connecting to MySQL proxy_sel_calibrated database...")
-        
-        # Try different connection methods
-        connection_configs = [
-            {
-                'host': 'localhost',
-                'user': 'webapp',
-                'password': 'webapppass',
-                'database': 'proxy_sel_calibrated'
-            },
-            {
-                'host': 'localhost',
-                'user': 'root',
-                'password': '',
-                'database': 'proxy_sel_calibrated'
-            }
-        ]
-        
-        for config in connection_configs:
-            try:
-                if config['user'] == 'root' and config['password'] == '':
-                    # Ask for root password
-                    import getpass
-                    password = getpass.getpass("Enter MySQL root password (or press Enter if no password): ")
-                    config['password'] = password
-                
-                connection = mysql.connector.connect(**config)
-                print(f"✅ Connected as {config['user']}")
-                return connection
-                
-            except mysql.connector.Error as e:
-                print(f"❌ Failed to connect as {config['user']}: {e}")
-                continue
-        
-        print("❌ All connection attempts failed")
-        return None
-        
-    except Exception as e:
-        print(f"❌ Error connecting to MySQL: {e}")
-        return None
+# Column layout of proxy_sel_calibrated (see parquet_ingest.TABLE_VARIANTS)
+TABLE_VARIANT = "sel_calibrated"
 
-def validate_and_clean_data(df, table_name):
-    """Validate and clean the dataframe before import"""
-    print(f"📊 Original data shape: {df.shape}")
-    print(f"📝 Columns: {list(df.columns)}")
+# Database every connection of this importer opens
+DATABASE = "proxy_sel_calibrated"
+
+def validate_and_clean_data(df, table_name, verbose=True):
+    """Validate and clean a dataframe (or one streamed batch) before import"""
+    log = print if verbose else (lambda *args: None)
+    log(f"📊 Original data shape: {df.shape}")
+    log(f"📝 Columns: {list(df.columns)}")
     
     # Define expected columns for proxy_sel_calibrated tables
     expected_columns = [
@@ -75,8 +48,8 @@ def validate_and_clean_data(df, table_name):
     # Check if all expected columns exist and try to map variations
     missing_columns = [col for col in expected_columns if col not in df.columns]
     if missing_columns:
-        print(f"⚠️ Missing columns: {missing_columns}")
-        print(f"Available columns: {list(df.columns)}")
+        log(f"⚠️ Missing columns: {missing_columns}")
+        log(f"Available columns: {list(df.columns)}")
         
         # Try to map columns with different names
         column_mapping = {}
@@ -93,7 +66,7 @@ def validate_and_clean_data(df, table_name):
                 for variant in column_variations[expected_col]:
                     if variant in df.columns:
                         column_mapping[variant] = expected_col
-                        print(f"🔄 Mapping {variant} -> {expected_col}")
+                        log(f"🔄 Mapping {variant} -> {expected_col}")
                         break
         
         if column_mapping:
@@ -105,7 +78,7 @@ def validate_and_clean_data(df, table_name):
     available_columns = [col for col in expected_columns if col in df.columns]
     df = df[available_columns]
     
-    print(f"📋 Using columns: {available_columns}")
+    log(f"📋 Using columns: {available_columns}")
     
     # Handle missing values and data type conversions
     for col in df.columns:
@@ -132,11 +105,72 @@ def validate_and_clean_data(df, table_name):
     # Remove rows where account_hash_key is empty
     df = df[df['account_hash_key'].str.strip() != '']
     
-    print(f"📊 Cleaned data shape: {df.shape}")
+    log(f"📊 Cleaned data shape: {df.shape}")
     return df
 
-def import_parquet_to_table(connection, parquet_file, table_name):
+def load_with_pandas(parquet_file, table_name, batch_size, memory_budget=STREAM_MEMORY_BUDGET):
+    """Legacy conversion: each streamed batch cleaned as a DataFrame and walked with iterrows"""
+    config = get_table_config(table_name, TABLE_VARIANT)
+    # Projected, compacted batches; blank keys are already gone before pandas sees the data
+    total_records, tables = iter_account_batches(parquet_file, config, memory_budget)
+    
+    # Define columns for insertion (excluding auto-increment id and created_at)
+    columns = loaded_columns(pq.read_schema(parquet_file).names, config)
+    
+    def batches():
+        for batch_number, table in enumerate(timed_batches(tables, "read", table_name)):
+            # Validate and clean data, one bounded batch at a time
+            with stage_timer("convert", table_name, batch_number) as timer:
+                df = validate_and_clean_data(table.to_pandas(), table_name, verbose=batch_number == 0)
+                timer.rows = len(df)
+            del table
+            
+            for i in range(0, len(df), batch_size):
+                batch_df = df.iloc[i:i+batch_size]
+                
+                # Convert to list of tuples, handling None values properly
+                with stage_timer("serialize", table_name, batch_number) as timer:
+                    batch_data = []
+                    for _, row in batch_df.iterrows():
+                        row_data = []
+                        for col in columns:
+                            value = row[col]
+                            if pd.isna(value) or (isinstance(value, float) and math.isnan(value)):
+                                row_data.append(None)
+                            else:
+                                # Convert to appropriate Python type
+                                if col in ['proposal_master_skey', 'director_master_skey', 'rank_of_shareholding', 'shares_summable', 'Target_encoded']:
+                                    row_data.append(int(value) if not pd.isna(value) else None)
+                                else:
+                                    row_data.append(value)
+                        batch_data.append(tuple(row_data))
+                    timer.rows = len(batch_data)
+                yield batch_data
+    
+    return columns, total_records, batches()
+
+def load_with_arrow(parquet_file, table_name, batch_size, memory_budget=STREAM_MEMORY_BUDGET):
+    """Columnar conversion: Arrow casts and null masks per streamed batch, tuples built per insert batch"""
+    config = get_table_config(table_name, TABLE_VARIANT)
+    total_records, tables = iter_account_batches(parquet_file, config, memory_budget)
+    # Columns missing from the file are left to the table default, as in the pandas path
+    columns = loaded_columns(pq.read_schema(parquet_file).names, config)
+    print(f"📋 Using columns: {columns}")
+    
+    def batches():
+        for batch_number, table in enumerate(timed_batches(tables, "read", table_name)):
+            with stage_timer("convert", table_name, batch_number) as timer:
+                converted = convert_arrow_table(table, config)
+                timer.rows = converted.num_rows
+            del table
+            yield from timed_batches(iter_row_batches(converted, batch_size), "serialize", table_name)
+    
+    return columns, total_records, batches()
+
+def import_parquet_to_table(connection, parquet_file, table_name, converter="arrow", shadow=False,
+                            memory_budget=STREAM_MEMORY_BUDGET):
     """Import parquet data to specified table (account_voted or account_unvoted)"""
+    cursor = None
     try:
         cursor = connection.cursor()
         
@@ -148,65 +182,59 @@ def import_parquet_to_table(connection, parquet_file, table_name):
         print(f"📥 Loading calibrated parquet file: {parquet_file}")
         print(f"🎯 Target table: {table_name}")
         
-        # Load parquet file
-        df = pd.read_parquet(parquet_file)
-        
-        # Validate and clean data
-        df = validate_and_clean_data(df, table_name)
+        # Load and convert parquet file in chunks of up to ADAPTIVE_MAX_ROWS rows, each sent as
+        # INSERTs sized by the adaptive batch sizer and committed as one transaction
+        batch_size = ADAPTIVE_MAX_ROWS
+        if converter == "arrow":
+            columns, total_records, batches = load_with_arrow(parquet_file, table_name, batch_size, memory_budget)
+        else:
+            columns, total_records, batches = load_with_pandas(parquet_file, table_name, batch_size, memory_budget)
         
-        if df.empty:
+        # Pull the first batch before touching the table, so an empty file never clears it
+        first_batch = next(batches, None)
+        if total_records == 0 or first_batch is None:
             print("❌ No valid data to import after cleaning")
             return 0
+        batches = itertools.chain([first_batch], batches)
         
-        # Clear existing data (optional - comment out if you want to append)
-        print(f"🗑️ Clearing existing data in {table_name} table...")
-        cursor.execute(f"DELETE FROM {table_name}")
-        connection.commit()
-        
-        # Define columns for insertion (excluding auto-increment id and created_at)
-        columns = [col for col in df.columns if col in [
-            'account_hash_key', 'proposal_master_skey', 'director_master_skey',
-            'account_type', 'shares_summable', 'rank_of_shareholding', 
-            'score_model2', 'prediction_model2', 'Target_encoded'
-        ]]
+        if shadow:
+            # Load a staging copy; the live table is replaced only by the final RENAME
+            load_table, deferred_indexes = create_staging_table(connection, table_name)
+        else:
+            # Clear existing data (optional - comment out if you want to append)
+            print(f"🗑️ Clearing existing data in {table_name} table...")
+            cursor.execute(f"DELETE FROM {table_name}")
+            connection.commit()
+            load_table = table_name
         
         # Prepare the INSERT statement
         placeholders = ', '.join(['%s'] * len(columns))
-        insert_query = f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({placeholders})"
+        insert_query = f"INSERT INTO {load_table} ({', '.join(columns)}) VALUES ({placeholders})"
         
         print(f"📝 Insert query: {insert_query}")
-        print(f"📊 Importing {len(df)} calibrated records...")
+        print(f"📊 Importing up to {total_records} calibrated records ({converter} converter)...")
         
-        # Convert DataFrame to list of tuples for batch insert
-        batch_size = 1000
         imported_count = 0
+        sizer = AdaptiveBatchSizer(max_allowed_packet(cursor))
         
-        for i in range(0, len(df), batch_size):
-            batch_df = df.iloc[i:i+batch_size]
-            
-            # Convert to list of tuples, handling None values properly
-            batch_data = []
-            for _, row in batch_df.iterrows():
-                row_data = []
-                for col in columns:
-                    value = row[col]
-                    if pd.isna(value) or (isinstance(value, float) and math.isnan(value)):
-                        row_data.append(None)
-                    else:
-                        # Convert to appropriate Python type
-                        if col in ['proposal_master_skey', 'director_master_skey', 'rank_of_shareholding', 'shares_summable', 'Target_encoded']:
-                            row_data.append(int(value) if not pd.isna(value) else None)
-                        else:
-                            row_data.append(value)
-                batch_data.append(tuple(row_data))
-            
+        for batch_data in batches:
             # Execute batch insert
-            cursor.executemany(insert_query, batch_data)
-            connection.commit()
+            with stage_timer("load", table_name) as timer:
+                executemany_adaptive(cursor, insert_query, batch_data, sizer)
+                timer.rows = len(batch_data)
+            with stage_timer("commit", table_name):
+                connection.commit()
             
             imported_count += len(batch_data)
-            progress_pct = (imported_count/len(df)*100)
-            print(f"📈 Progress: {imported_count}/{len(df)} records ({progress_pct:.1f}%)")
+            progress_pct = (imported_count/total_records*100)
+            print(f"📈 Progress: {imported_count}/{total_records} records ({progress_pct:.1f}%)")
+        
+        sizer.report(table_name)
+        if shadow:
+            # The staging table must hold every row of the file (parquet metadata) but the blank keys
+            expected_rows = total_records - count_blank_keys(parquet_file, get_table_config(table_name, TABLE_VARIANT))
+            if not swap_staging_table(connection, table_name, deferred_indexes, expected_rows):
+                return 0
         
         print(f"✅ Successfully imported {imported_count} calibrated records to {table_name} table")
         return imported_count
@@ -234,9 +262,37 @@ def main():
     }
     
     # Allow command line arguments to override file paths
-    if len(sys.argv) >= 3:
-        unvoted_file = sys.argv[1]
-        voted_file = sys.argv[2]
+    parser = argparse.ArgumentParser(description='Import calibrated account parquet files into proxy_sel_calibrated')
+    parser.add_argument('unvoted_file', nargs='?', help='Path to account_unvoted parquet file')
+    parser.add_argument('voted_file', nargs='?', help='Path to account_voted parquet file')
+    parser.add_argument('--converter', choices=CONVERTERS, default='arrow',
+                       help='Row conversion: arrow (columnar) or pandas (legacy iterrows)')
+    parser.add_argument('--shadow', action='store_true',
+                       help='Load into <table>__staging and swap it in with RENAME TABLE instead of DELETE FROM')
+    parser.add_argument('--memory-budget-mb', type=int, default=STREAM_MEMORY_BUDGET // (1024 * 1024),
+                       help='Memory budget of one streamed parquet batch in MB (default: %(default)s)')
+    parser.add_argument('--rollback', action='store_true',
+                       help='Swap <table>__previous from the last --shadow import back in and exit')
+    add_driver_argument(parser)
+    add_history_arguments(parser)
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    configure_driver_from_args(args)
+    configure_metrics_from_args(args)
+    
+    if args.rollback:
+        connection = connect_mysql(DATABASE)
+        if not connection:
+            sys.exit(1)
+        try:
+            restored = [restore_previous_table(connection, table_name) for table_name in ('account_unvoted', 'account_voted')]
+        finally:
+            connection.close()
+        sys.exit(0 if all(restored) else 1)
+    
+    if args.unvoted_file and args.voted_file:
+        unvoted_file = args.unvoted_file
+        voted_file = args.voted_file
         print(f"📁 Using command line arguments:")
         print(f"   Unvoted: {unvoted_file}")
         print(f"   Voted: {voted_file}")
@@ -277,12 +333,13 @@ def main():
     print("")
     
     # Connect to database
-    connection = get_db_connection()
+    connection = connect_mysql(DATABASE)
     if not connection:
         sys.exit(1)
     
     try:
         total_imported = 0
+        skipped = 0
         
         # Process each file
         for file_path, table_name in files_to_process:
@@ -291,8 +348,16 @@ def main():
             print(f"🧪 Calibrated data import for proxy_sel_calibrated database")
             print(f"{'='*70}")
             
-            imported_count = import_parquet_to_table(connection, file_path, table_name)
+            if import_unchanged(connection, table_name, [file_path], args.force):
+                skipped += 1
+                print("")
+                continue
+            
+            imported_count = import_parquet_to_table(connection, file_path, table_name, args.converter, args.shadow,
+                                                     args.memory_budget_mb * 1024 * 1024)
             total_imported += imported_count
+            if imported_count > 0:
+                record_import(connection, table_name, [file_path])
             
             print("")
         
@@ -316,7 +381,7 @@ def main():
         print(f"   Total calibrated records: {unvoted_count + voted_count:,}")
         print("")
         
-        if total_imported > 0:
+        if total_imported > 0 or skipped:
             print("🎉 Calibrated data import completed successfully!")
             print(f"   Total records imported: {total_imported:,}")
             
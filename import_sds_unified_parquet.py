@@ -11,129 +11,35 @@ Unified SDS Account Data Parquet Import Tool
 """
 
 import pandas as pd
-import pyarrow.parquet as pq
-import mysql.connector
+import pyarrow as pa
 import os
 import sys
 import time
 import tempfile
 import numpy as np
 import argparse
-from mysql.connector import Error
+from functools import partial
+from db_drivers import DRIVER_ERRORS as Error, add_driver_argument, configure_driver_from_args
+from parquet_ingest import (CONVERTERS, LOADERS, get_table_config, convert_arrow_table, arrow_to_rows,
+                            iter_tsv_chunks, load_data_from_stream, open_account_parquet,
+                            read_account_row_group, proposal_range_bounds)
+from ingest_pipeline import RowGroupPipeline, account_pipeline_stages, load_account_partitions, partition_index
+from import_manifest import (ensure_manifest_table, parquet_source_key, row_group_checksum,
+                             parquet_row_group_checksums, get_manifest, record_row_group,
+                             table_has_manifest, adopt_row_groups, table_has_rows, plan_row_groups,
+                             clear_manifest, reconcile_manifest)
+from table_ops import PARTITION_COLUMN, prepare_clustered_import, get_partition_scheme, partition_table
+from ingest_engine import (AdaptiveBatchSizer, connect_mysql, executemany_adaptive, local_infile_enabled,
+                           max_allowed_packet, open_worker_connection, optimize_mysql_settings,
+                           restore_mysql_settings)
+from import_metrics import add_metrics_arguments, configure_metrics_from_args, stage_timer, timed_chunks
+from import_history import add_history_arguments, import_unchanged, record_import
 
-def connect_to_mysql():
-    """Connect to MySQL database with optimized settings"""
-    try:
-        print("🔍 Connecting to MySQL proxy_sds database...")
-        
-        # Try webapp user first (most likely to work)
-        try:
-            connection = mysql.connector.connect(
-                host='localhost',
-                database='proxy_sds',
-                user='webapp',
-                password='webapppass',
-                # Performance optimizations
-                autocommit=False,
-                use_unicode=True,
-                charset='utf8mb4',
-                sql_mode='',
-                # Increase timeouts for large operations
-                connect_timeout=60,
-                # Optimize for bulk operations
-                raise_on_warnings=False
-            )
-            print("✅ Connected as webapp user")
-            return connection
-        except Error as e:
-            print(f"❌ webapp connection failed: {e}")
-        
-        # Fallback to root with password
-        try:
-            import getpass
-            password = getpass.getpass("Enter MySQL root password: ")
-            connection = mysql.connector.connect(
-                host='localhost',
-                database='proxy_sds',
-                user='root',
-                password=password,
-                autocommit=False,
-                use_unicode=True,
-                charset='utf8mb4',
-                sql_mode='',
-                connect_timeout=60,
-                raise_on_warnings=False
-            )
-            print("✅ Connected as root user")
-            return connection
-        except Error as e:
-            print(f"❌ root connection failed: {e}")
-        
-    except Error as e:
-        print(f"❌ Error connecting to MySQL: {e}")
-        return None
+# Column layout of proxy_sds (see parquet_ingest.TABLE_VARIANTS)
+TABLE_VARIANT = "sds"
 
-def optimize_mysql_settings(connection):
-    """Optimize MySQL settings for bulk import"""
-    try:
-        cursor = connection.cursor()
-        
-        print("⚙️ Optimizing MySQL settings for bulk import...")
-        
-        # Optimization queries
-        optimizations = [
-            "SET SESSION innodb_buffer_pool_size = @@innodb_buffer_pool_size",
-            "SET SESSION bulk_insert_buffer_size = 256*1024*1024",  # 256MB
-            "SET SESSION myisam_sort_buffer_size = 512*1024*1024",   # 512MB
-            "SET SESSION key_buffer_size = 512*1024*1024",           # 512MB
-            "SET SESSION sort_buffer_size = 64*1024*1024",           # 64MB
-            "SET SESSION read_buffer_size = 32*1024*1024",           # 32MB
-            "SET SESSION read_rnd_buffer_size = 32*1024*1024",       # 32MB
-            "SET SESSION max_heap_table_size = 1024*1024*1024",      # 1GB
-            "SET SESSION tmp_table_size = 1024*1024*1024",           # 1GB
-            "SET foreign_key_checks = 0",
-            "SET unique_checks = 0",
-            "SET sql_log_bin = 0",
-            "SET autocommit = 0"
-        ]
-        
-        for query in optimizations:
-            try:
-                cursor.execute(query)
-                print(f"  ✅ {query}")
-            except Error as e:
-                print(f"  ⚠️ Skipped: {query} ({e})")
-        
-        print("✅ MySQL optimization completed")
-        return True
-        
-    except Exception as e:
-        print(f"⚠️ Warning: Could not optimize all settings: {e}")
-        return False
-
-def restore_mysql_settings(connection):
-    """Restore MySQL settings after import"""
-    try:
-        cursor = connection.cursor()
-        print("🔄 Restoring MySQL settings...")
-        
-        restore_queries = [
-            "SET foreign_key_checks = 1",
-            "SET unique_checks = 1",
-            "SET sql_log_bin = 1",
-            "SET autocommit = 1"
-        ]
-        
-        for query in restore_queries:
-            try:
-                cursor.execute(query)
-            except Error:
-                pass
-        
-        print("✅ MySQL settings restored")
-        
-    except Exception as e:
-        print(f"⚠️ Warning restoring settings: {e}")
+# Database every connection of this importer opens
+DATABASE = "proxy_sds"
 
 def get_current_record_count(connection, table_name):
     """Get current record count in the specified table"""
@@ -149,7 +55,7 @@ def get_current_record_count(connection, table_name):
 def get_parquet_info(parquet_file):
     """Get parquet file information"""
     try:
-        pf = pq.ParquetFile(parquet_file)
+        pf = open_account_parquet(parquet_file)
         total_rows = pf.metadata.num_rows
         num_row_groups = pf.num_row_groups
         
@@ -163,49 +69,10 @@ def get_parquet_info(parquet_file):
         print(f"❌ Error reading parquet file: {e}")
         return 0, 0, None
 
-def get_table_config(table_name):
-    """Get table-specific configuration"""
-    if table_name == "account_voted":
-        return {
-            "insert_query": """
-                INSERT INTO account_voted 
-                (account_hash_key, proposal_master_skey, director_master_skey,
-                 account_type, shares_summable, rank_of_shareholding,
-                 score_model2, prediction_model2, Target_encoded)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """,
-            "load_data_columns": """
-                (account_hash_key, proposal_master_skey, director_master_skey,
-                 account_type, shares_summable, rank_of_shareholding,
-                 score_model2, prediction_model2, Target_encoded)
-            """,
-            "score_field": "score_model2",
-            "prediction_field": "prediction_model2"
-        }
-    elif table_name == "account_unvoted":
-        return {
-            "insert_query": """
-                INSERT INTO account_unvoted 
-                (account_hash_key, proposal_master_skey, director_master_skey,
-                 account_type, shares_summable, rank_of_shareholding,
-                 score_model1, prediction_model1, Target_encoded)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """,
-            "load_data_columns": """
-                (account_hash_key, proposal_master_skey, director_master_skey,
-                 account_type, shares_summable, rank_of_shareholding,
-                 score_model1, prediction_model1, Target_encoded)
-            """,
-            "score_field": "score_model1",
-            "prediction_field": "prediction_model1"
-        }
-    else:
-        raise ValueError(f"Unknown table name: {table_name}")
-
 def process_dataframe_chunk(df, table_name):
     """Process and clean a dataframe chunk for MySQL insertion"""
     try:
-        config = get_table_config(table_name)
+        config = get_table_config(table_name, TABLE_VARIANT)
         
         # Handle NaN and infinite values
         df = df.replace([np.inf, -np.inf], None)
@@ -232,80 +99,109 @@ def process_dataframe_chunk(df, table_name):
         print(f"❌ Error processing dataframe chunk: {e}")
         return []
 
-def import_parquet_with_load_data(connection, parquet_file, table_name, skip_row_groups=0):
+def load_row_group_via_csv(cursor, df, table_name, config):
+    """Legacy LOAD DATA path: QUOTE_ALL temp CSV written with pandas"""
+    temp_file_path = None
+    try:
+        # Create temporary CSV file for this chunk
+        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.csv') as temp_file:
+            temp_file_path = temp_file.name
+            
+            # Convert dataframe to CSV format
+            df_processed = df.copy()
+            # Dictionary-read string columns arrive as Categorical, which cannot take '' as a new value
+            for column in df_processed.select_dtypes('category').columns:
+                df_processed[column] = df_processed[column].astype(object)
+            # Handle NaN values
+            df_processed = df_processed.where(pd.notnull(df_processed), '')
+            
+            # Write to CSV without header
+            df_processed.to_csv(temp_file_path, index=False, header=False, 
+                              na_rep='', quoting=1)  # quoting=1 means QUOTE_ALL
+        
+        # Execute LOAD DATA INFILE
+        load_query = f"""
+        LOAD DATA LOCAL INFILE '{temp_file_path}'
+        INTO TABLE {table_name}
+        FIELDS TERMINATED BY ','
+        ENCLOSED BY '"'
+        LINES TERMINATED BY '\\n'
+        {config['load_data_columns']}
+        """
+        
+        cursor.execute(load_query)
+        return len(df)
+    finally:
+        if temp_file_path and os.path.exists(temp_file_path):
+            os.unlink(temp_file_path)
+
+def import_parquet_with_load_data(connection, parquet_file, table_name, row_groups=None, converter="arrow", loader="stream"):
     """Use LOAD DATA INFILE for maximum performance with parquet chunks"""
     try:
         cursor = connection.cursor()
-        config = get_table_config(table_name)
+        config = get_table_config(table_name, TABLE_VARIANT)
         
         # Check if LOAD DATA INFILE is enabled
         cursor.execute("SHOW VARIABLES LIKE 'local_infile'")
         result = cursor.fetchone()
         if not result or result[1] != 'ON':
             print("⚠️ local_infile is disabled, using batch insert method...")
-            return import_parquet_with_batch_insert(connection, parquet_file, table_name, skip_row_groups)
+            return import_parquet_with_batch_insert(connection, parquet_file, table_name, row_groups, converter)
         
-        print(f"🚀 Using LOAD DATA INFILE with chunked parquet reading...")
+        print(f"🚀 Using LOAD DATA INFILE with chunked parquet reading ({loader} loader)...")
         
         total_rows, num_row_groups, pf = get_parquet_info(parquet_file)
         if not pf:
             return 0
         
-        if skip_row_groups >= num_row_groups:
+        if row_groups is None:
+            row_groups = range(num_row_groups)
+        row_groups = list(row_groups)
+        if not row_groups:
             print("ℹ️ All row groups already processed")
             return 0
         
+        source_key = parquet_source_key(parquet_file)
         total_imported = 0
         start_time = time.time()
         
         # Process row groups in chunks
-        for row_group_idx in range(skip_row_groups, num_row_groups):
+        for position, row_group_idx in enumerate(row_groups, 1):
             try:
                 print(f"📦 Processing row group {row_group_idx + 1}/{num_row_groups}...")
                 
-                # Read row group
-                table = pf.read_row_group(row_group_idx)
-                df = table.to_pandas()
-                
-                if df.empty:
-                    continue
-                
-                # Create temporary CSV file for this chunk
-                with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.csv') as temp_file:
-                    temp_file_path = temp_file.name
-                    
-                    # Convert dataframe to CSV format
-                    df_processed = df.copy()
-                    # Handle NaN values
-                    df_processed = df_processed.where(pd.notnull(df_processed), '')
-                    
-                    # Write to CSV without header
-                    df_processed.to_csv(temp_file_path, index=False, header=False, 
-                                      na_rep='', quoting=1)  # quoting=1 means QUOTE_ALL
+                # Read row group (projected columns, dictionary strings, compact ints)
+                with stage_timer("read", table_name, row_group_idx) as timer:
+                    table = read_account_row_group(pf, row_group_idx, config)
+                    timer.rows = table.num_rows
                 
-                # Execute LOAD DATA INFILE
-                load_query = f"""
-                LOAD DATA LOCAL INFILE '{temp_file_path}'
-                INTO TABLE {table_name}
-                FIELDS TERMINATED BY ','
-                ENCLOSED BY '"'
-                LINES TERMINATED BY '\\n'
-                {config['load_data_columns']}
-                """
+                if table.num_rows == 0:
+                    chunk_size = 0
+                elif loader == "stream":
+                    # Serialize Arrow batches straight into the LOAD DATA stream
+                    with stage_timer("convert", table_name, row_group_idx) as timer:
+                        converted = convert_arrow_table(table, config)
+                        timer.rows = converted.num_rows
+                    with stage_timer("load", table_name, row_group_idx) as timer:
+                        load_data_from_stream(cursor, table_name, config['load_data_columns'],
+                                              timed_chunks(iter_tsv_chunks(converted), table_name, row_group_idx))
+                        timer.rows = chunk_size = converted.num_rows
+                else:
+                    with stage_timer("load", table_name, row_group_idx) as timer:
+                        timer.rows = chunk_size = load_row_group_via_csv(cursor, table.to_pandas(), table_name, config)
                 
-                cursor.execute(load_query)
-                connection.commit()
+                # Manifest row commits atomically with the row group's data
+                record_row_group(cursor, table_name, source_key, row_group_idx, chunk_size,
+                                 row_group_checksum(pf.metadata.row_group(row_group_idx)))
+                with stage_timer("commit", table_name, row_group_idx):
+                    connection.commit()
                 
-                chunk_size = len(df)
                 total_imported += chunk_size
                 
-                # Clean up temp file
-                os.unlink(temp_file_path)
-                
                 # Progress update
                 elapsed = time.time() - start_time
                 rate = total_imported / elapsed if elapsed > 0 else 0
-                progress = ((row_group_idx + 1) / num_row_groups) * 100
+                progress = (position / len(row_groups)) * 100
                 
                 print(f"  ✅ Imported {chunk_size:,} records ({total_imported:,} total)")
                 print(f"  📈 Progress: {progress:.1f}% - {rate:,.0f} rec/sec")
@@ -313,9 +209,7 @@ def import_parquet_with_load_data(connection, parquet_file, table_name, skip_row
                 
             except Exception as e:
                 print(f"  ❌ Error processing row group {row_group_idx + 1}: {e}")
-                # Clean up temp file if it exists
-                if 'temp_file_path' in locals() and os.path.exists(temp_file_path):
-                    os.unlink(temp_file_path)
+                connection.rollback()
                 continue
         
         elapsed = time.time() - start_time
@@ -330,67 +224,81 @@ def import_parquet_with_load_data(connection, parquet_file, table_name, skip_row
     except Exception as e:
         print(f"❌ LOAD DATA INFILE failed: {e}")
         print("🔄 Falling back to batch insert method...")
-        return import_parquet_with_batch_insert(connection, parquet_file, table_name, skip_row_groups)
+        return import_parquet_with_batch_insert(connection, parquet_file, table_name, row_groups, converter)
 
-def import_parquet_with_batch_insert(connection, parquet_file, table_name, skip_row_groups=0):
+def import_parquet_with_batch_insert(connection, parquet_file, table_name, row_groups=None, converter="arrow"):
     """Optimized batch insert with chunked parquet reading"""
     try:
         cursor = connection.cursor()
-        config = get_table_config(table_name)
+        config = get_table_config(table_name, TABLE_VARIANT)
         
-        print(f"📥 Using optimized batch insert with chunked parquet reading...")
+        print(f"📥 Using optimized batch insert with chunked parquet reading ({converter} converter)...")
         
         total_rows, num_row_groups, pf = get_parquet_info(parquet_file)
         if not pf:
             return 0
         
-        if skip_row_groups >= num_row_groups:
+        if row_groups is None:
+            row_groups = range(num_row_groups)
+        row_groups = list(row_groups)
+        if not row_groups:
             print("ℹ️ All row groups already processed")
             return 0
         
-        batch_size = 5000  # Smaller batches for parquet processing
+        source_key = parquet_source_key(parquet_file)
+        
+        # Statement size follows row width, max_allowed_packet and commit latency
+        sizer = AdaptiveBatchSizer(max_allowed_packet(cursor), initial_rows=5000)
         total_imported = 0
         start_time = time.time()
         
         # Process row groups in chunks
-        for row_group_idx in range(skip_row_groups, num_row_groups):
+        for position, row_group_idx in enumerate(row_groups, 1):
             try:
                 print(f"📦 Processing row group {row_group_idx + 1}/{num_row_groups}...")
                 
-                # Read row group
-                table = pf.read_row_group(row_group_idx)
-                df = table.to_pandas()
+                # Read row group (projected columns, dictionary strings, compact ints)
+                with stage_timer("read", table_name, row_group_idx) as timer:
+                    table = read_account_row_group(pf, row_group_idx, config)
+                    timer.rows = table.num_rows
                 
-                if df.empty:
-                    continue
+                # Convert the row group to insert tuples
+                with stage_timer("convert", table_name, row_group_idx) as timer:
+                    if converter == "arrow":
+                        processed_data = arrow_to_rows(convert_arrow_table(table, config))
+                    else:
+                        processed_data = process_dataframe_chunk(table.to_pandas(), table_name)
+                    timer.rows = len(processed_data)
                 
-                # Process dataframe in smaller batches
-                processed_data = process_dataframe_chunk(df, table_name)
-                
-                # Insert in batches
-                for i in range(0, len(processed_data), batch_size):
-                    batch = processed_data[i:i + batch_size]
-                    cursor.executemany(config['insert_query'], batch)
+                # Insert in batches; the row group commits once, together with its manifest row
+                with stage_timer("load", table_name, row_group_idx) as timer:
+                    executemany_adaptive(cursor, config['insert_query'], processed_data, sizer)
+                    timer.rows = len(processed_data)
+                record_row_group(cursor, table_name, source_key, row_group_idx, len(processed_data),
+                                 row_group_checksum(pf.metadata.row_group(row_group_idx)))
+                with stage_timer("commit", table_name, row_group_idx):
                     connection.commit()
-                    total_imported += len(batch)
+                total_imported += len(processed_data)
                 
                 # Progress update
                 elapsed = time.time() - start_time
                 rate = total_imported / elapsed if elapsed > 0 else 0
-                progress = ((row_group_idx + 1) / num_row_groups) * 100
+                progress = (position / len(row_groups)) * 100
                 
-                print(f"  ✅ Imported {len(df):,} records ({total_imported:,} total)")
+                print(f"  ✅ Imported {len(processed_data):,} records ({total_imported:,} total)")
                 print(f"  📈 Progress: {progress:.1f}% - {rate:,.0f} rec/sec")
                 print()
                 
             except Exception as e:
                 print(f"  ❌ Error processing row group {row_group_idx + 1}: {e}")
+                connection.rollback()
                 continue
         
         elapsed = time.time() - start_time
         rate = total_imported / elapsed if elapsed > 0 else 0
         
         print(f"✅ Batch insert completed!")
+        sizer.report(table_name)
         print(f"⏱️ Time: {elapsed:.1f}s")
         print(f"🏃 Rate: {rate:,.0f} records/second")
         
@@ -403,8 +311,103 @@ def import_parquet_with_batch_insert(connection, parquet_file, table_name, skip_
         print(f"❌ Unexpected error: {e}")
         return 0
 
+def import_parquet_parallel(connection, parquet_file, table_name, row_groups=None, workers=None):
+    """Pipeline row groups through parallel readers, converters and loader connections"""
+    try:
+        cursor = connection.cursor()
+        config = get_table_config(table_name, TABLE_VARIANT)
+        
+        # Loader connections stream LOAD DATA when the server allows it
+        cursor.execute("SHOW VARIABLES LIKE 'local_infile'")
+        result = cursor.fetchone()
+        use_load_data = bool(result and result[1] == 'ON')
+        if not use_load_data:
+            print("⚠️ local_infile is disabled, pipeline loaders will use batch insert...")
+        
+        total_rows, num_row_groups, pf = get_parquet_info(parquet_file)
+        if not pf:
+            return 0
+        
+        if row_groups is None:
+            row_groups = range(num_row_groups)
+        row_groups = list(row_groups)
+        if not row_groups:
+            print("ℹ️ All row groups already processed")
+            return 0
+        
+        source_key = parquet_source_key(parquet_file)
+        checksums = parquet_row_group_checksums(pf)
+        read, convert, load_rows = account_pipeline_stages(table_name, config, use_load_data)
+        
+        def load(cursor, row_group_idx, payload):
+            # Runs inside the loader's transaction, so the manifest row commits with the data
+            rows = load_rows(cursor, row_group_idx, payload)
+            record_row_group(cursor, table_name, source_key, row_group_idx, rows, checksums[row_group_idx])
+            return rows
+        
+        pipeline = RowGroupPipeline(parquet_file, convert, load, partial(open_worker_connection, DATABASE),
+                                    read=read, open_file=open_account_parquet, table_name=table_name,
+                                    **(workers or {}))
+        return pipeline.run(row_groups)
+        
+    except Exception as e:
+        print(f"❌ Parallel import failed: {e}")
+        return 0
+
+def import_partitioned(connection, pf, parquet_file, table_name, partition, clustered=False):
+    """Load partition by partition into standalone tables published with EXCHANGE PARTITION"""
+    config = get_table_config(table_name, TABLE_VARIANT)
+    try:
+        if clustered and not prepare_clustered_import(connection, pf, table_name, config):
+            return False
+        
+        scheme = get_partition_scheme(connection, table_name)
+        if scheme is None:
+            bounds = proposal_range_bounds(pf, partition['partitions']) if partition['method'] == 'range' else None
+            scheme = partition_table(connection, table_name, partition['method'], partition['partitions'], bounds)
+        if scheme['method'] not in ('HASH', 'RANGE') or scheme['expression'] != PARTITION_COLUMN:
+            print(f"❌ {table_name} is partitioned by {scheme['method']}({scheme['expression']}), "
+                  f"expected HASH or RANGE on {PARTITION_COLUMN}")
+            return False
+        
+        positions = None
+        if partition['proposals']:
+            # Reload only the partitions holding these proposals
+            positions = sorted(set(int(p) for p in partition_index(pa.array(partition['proposals']), scheme)))
+            print(f"🎯 Reloading partition(s) {[scheme['names'][p] for p in positions]} "
+                  f"for proposal_master_skey {partition['proposals']}")
+        
+        use_load_data = local_infile_enabled(connection)
+        if not use_load_data:
+            print("⚠️ local_infile is disabled, partition loaders will use batch insert...")
+        
+        results = load_account_partitions(parquet_file, table_name, config, scheme,
+                                          partial(open_worker_connection, DATABASE),
+                                          use_load_data, partition['workers'], positions)
+    except Error as e:
+        print(f"❌ Partitioned import failed: {e}")
+        return False
+    
+    failed = [name for name, rows in results.items() if rows is None]
+    if failed:
+        print(f"⚠️ {len(failed)} partition(s) failed and still hold their previous data: {failed}")
+        return False
+    
+    if positions is None:
+        # A full reload replaces every row group, so the manifest is rewritten in one go
+        source_key = parquet_source_key(parquet_file)
+        try:
+            ensure_manifest_table(connection)
+            clear_manifest(connection, table_name, source_key)
+            adopt_row_groups(connection, table_name, source_key, pf, parquet_row_group_checksums(pf),
+                             range(pf.num_row_groups))
+        except Error as e:
+            print(f"⚠️ Data published but the import manifest could not be updated: {e}")
+    print(f"✅ All partitions of {table_name} published")
+    return True
+
 def calculate_resume_point(connection, parquet_file, table_name):
-    """Calculate which row group to resume from based on current record count"""
+    """Estimate the resume row group from COUNT(*) (legacy tables without a manifest)"""
     try:
         current_count = get_current_record_count(connection, table_name)
         total_rows, num_row_groups, pf = get_parquet_info(parquet_file)
@@ -438,7 +441,7 @@ def calculate_resume_point(connection, parquet_file, table_name):
         print(f"❌ Error calculating resume point: {e}")
         return 0
 
-def process_single_file(connection, parquet_file, table_name):
+def process_single_file(connection, parquet_file, table_name, converter="arrow", loader="stream", workers=None, clustered=False, partition=None):
     """Process a single parquet file import"""
     print(f"\n{'='*60}")
     print(f"📁 Processing: {parquet_file}")
@@ -454,48 +457,85 @@ def process_single_file(connection, parquet_file, table_name):
     file_size = os.path.getsize(parquet_file)
     print(f"📊 File size: {file_size / (1024**3):.2f} GB")
     
-    # Check current record count and calculate resume point
-    current_count = get_current_record_count(connection, table_name)
-    print(f"📊 Current records in {table_name}: {current_count:,}")
-    
     # Get parquet info
     total_rows, num_row_groups, pf = get_parquet_info(parquet_file)
     if not pf:
         return False
     
-    if current_count >= total_rows:
+    if partition:
+        return import_partitioned(connection, pf, parquet_file, table_name, partition, clustered)
+    
+    # Committed row groups come from the manifest (exact, PK lookup) instead of COUNT(*)
+    source_key = parquet_source_key(parquet_file)
+    checksums = parquet_row_group_checksums(pf)
+    try:
+        ensure_manifest_table(connection)
+        if reconcile_manifest(connection, table_name):
+            print(f"⚠️ {table_name} is empty but the manifest listed loaded row groups: cleared them, loading everything")
+        manifest = get_manifest(connection, table_name, source_key)
+        if not manifest and not table_has_manifest(connection, table_name) and table_has_rows(connection, table_name):
+            # Table was loaded before the manifest existed: estimate once, then record it
+            skip_row_groups = calculate_resume_point(connection, parquet_file, table_name)
+            adopt_row_groups(connection, table_name, source_key, pf, checksums, range(skip_row_groups))
+            manifest = get_manifest(connection, table_name, source_key)
+    except Error as e:
+        print(f"❌ Could not read import manifest: {e}")
+        return False
+    
+    pending, mismatched = plan_row_groups(manifest, checksums)
+    if mismatched:
+        print(f"❌ {len(mismatched)} committed row group(s) do not match {parquet_file}: "
+              f"{[idx + 1 for idx in mismatched[:10]]}")
+        print(f"   The file changed since it was loaded - reload {table_name} from scratch")
+        return False
+    
+    committed_rows = sum(row_count for row_count, _ in manifest.values())
+    print(f"📊 Committed row groups in {table_name}: {len(manifest)}/{num_row_groups} ({committed_rows:,} records)")
+    
+    if not pending:
         print(f"✅ All records already imported in {table_name}!")
         return True
     
-    remaining = total_rows - current_count
-    print(f"📊 Remaining to import: {remaining:,}")
-    
-    # Calculate resume point
-    skip_row_groups = calculate_resume_point(connection, parquet_file, table_name)
+    remaining = sum(pf.metadata.row_group(idx).num_rows for idx in pending)
+    print(f"📊 Remaining to import: {remaining:,} records in {len(pending)} row groups")
     
     print("")
     
+    if clustered:
+        # Primary key on the business key: rows must arrive in key order to append sequentially
+        if not prepare_clustered_import(connection, pf, table_name, get_table_config(table_name, TABLE_VARIANT)):
+            return False
+        if workers and max(workers['readers'], workers['converters'], workers['loaders']) > 1:
+            print("ℹ️ Clustered load: importing row groups sequentially so they commit in key order")
+            workers = None
+    
     # Start import
     start_time = time.time()
     
-    # Try LOAD DATA INFILE first, fall back to batch insert
-    imported_count = import_parquet_with_load_data(connection, parquet_file, table_name, skip_row_groups)
+    if workers and max(workers['readers'], workers['converters'], workers['loaders']) > 1 and converter == "arrow" and loader == "stream":
+        # Overlap parquet decode, conversion and MySQL loads across threads/connections
+        imported_count = import_parquet_parallel(connection, parquet_file, table_name, pending, workers)
+    else:
+        # Try LOAD DATA INFILE first, fall back to batch insert
+        imported_count = import_parquet_with_load_data(connection, parquet_file, table_name, pending, converter, loader)
     
-    # Final statistics
+    # Final statistics; end this connection's snapshot so loader commits are visible
     elapsed = time.time() - start_time
-    final_count = get_current_record_count(connection, table_name)
+    connection.commit()
+    manifest = get_manifest(connection, table_name, source_key)
+    pending, _ = plan_row_groups(manifest, checksums)
+    final_count = sum(row_count for row_count, _ in manifest.values())
     
     print("")
     print(f"🎉 Import completed for {table_name}!")
     print(f"📊 Records imported this session: {imported_count:,}")
-    print(f"📊 Total records in {table_name}: {final_count:,}")
+    print(f"📊 Total records from {source_key}: {final_count:,}")
     print(f"⏱️ Total time: {elapsed:.1f}s")
     if imported_count > 0:
         print(f"🏃 Average rate: {imported_count / elapsed:,.0f} records/second")
     
-    if final_count < total_rows:
-        remaining = total_rows - final_count
-        print(f"⚠️ Still {remaining:,} records remaining in {table_name}")
+    if pending:
+        print(f"⚠️ Still {len(pending)} row group(s) remaining in {table_name}: {[idx + 1 for idx in pending[:10]]}")
         return False
     else:
         print(f"✅ All records successfully imported to {table_name}!")
@@ -509,8 +549,53 @@ def main():
                        help='Path to account_voted parquet file')
     parser.add_argument('--unvoted-file', default='df_2025_sds_167_account_unvoted_sorted.parquet',
                        help='Path to account_unvoted parquet file')
+    parser.add_argument('--converter', choices=CONVERTERS, default='arrow',
+                       help='Row conversion for the batch insert path: arrow (columnar) or pandas (legacy iterrows)')
+    parser.add_argument('--loader', choices=LOADERS, default='stream',
+                       help='LOAD DATA input: stream (Arrow -> TSV over a FIFO) or csv (legacy temp CSV)')
+    parser.add_argument('--readers', type=int, default=1,
+                       help='Parallel pipeline: parquet reader threads (default: 1)')
+    parser.add_argument('--converters', type=int, default=1,
+                       help='Parallel pipeline: Arrow conversion threads (default: 1)')
+    parser.add_argument('--loaders', type=int, default=1,
+                       help='Parallel pipeline: MySQL loader connections (default: 1 = sequential import)')
+    parser.add_argument('--queue-depth', type=int, default=4,
+                       help='Parallel pipeline: row groups buffered between stages (default: 4)')
+    parser.add_argument('--clustered', action='store_true',
+                       help='Cluster the table on (proposal_master_skey, director_master_skey, account_hash_key); '
+                            'the file must be sorted by that key')
+    parser.add_argument('--partition', choices=['hash', 'range'],
+                       help='Partition the table on proposal_master_skey and load it partition by partition '
+                            'with EXCHANGE PARTITION (existing partitioning is reused)')
+    parser.add_argument('--partitions', type=int, default=16,
+                       help='Number of partitions when partitioning a table (default: 16)')
+    parser.add_argument('--partition-workers', type=int, default=4,
+                       help='Partition loaders, one connection each; the file is read once (default: 4)')
+    parser.add_argument('--reload-proposals', type=lambda value: [int(v) for v in value.split(',')],
+                       help='Comma-separated proposal_master_skey values: reload only their partitions')
     
+    add_history_arguments(parser)
+    add_metrics_arguments(parser)
+    add_driver_argument(parser)
     args = parser.parse_args()
+    configure_metrics_from_args(args)
+    configure_driver_from_args(args)
+    # A partial --reload-proposals run always loads
+    force = args.force or bool(args.reload_proposals)
+    partition = None
+    if args.partition or args.reload_proposals:
+        partition = {
+            'method': args.partition or 'hash',
+            'partitions': args.partitions,
+            'workers': args.partition_workers,
+            'proposals': args.reload_proposals
+        }
+    workers = {
+        'readers': args.readers,
+        'converters': args.converters,
+        'loaders': args.loaders,
+        'queue_depth': args.queue_depth
+    }
     
     print("=== UNIFIED SDS Account Data Parquet Import Tool ===")
     print("🎯 Target: Parquet files → proxy_sds.account_voted & account_unvoted")
@@ -518,7 +603,7 @@ def main():
     print("")
     
     # Connect to database
-    connection = connect_to_mysql()
+    connection = connect_mysql(DATABASE)
     if not connection:
         print("❌ Could not connect to database")
         sys.exit(1)
@@ -532,12 +617,20 @@ def main():
         # Process files based on user selection
         if args.table in ['voted', 'both']:
             print(f"\n🗳️ Processing VOTED accounts...")
-            if not process_single_file(connection, args.voted_file, 'account_voted'):
+            if import_unchanged(connection, 'account_voted', [args.voted_file], force):
+                pass
+            elif process_single_file(connection, args.voted_file, 'account_voted', args.converter, args.loader, workers, args.clustered, partition):
+                record_import(connection, 'account_voted', [args.voted_file])
+            else:
                 success = False
         
         if args.table in ['unvoted', 'both']:
             print(f"\n🚫 Processing UNVOTED accounts...")
-            if not process_single_file(connection, args.unvoted_file, 'account_unvoted'):
+            if import_unchanged(connection, 'account_unvoted', [args.unvoted_file], force):
+                pass
+            elif process_single_file(connection, args.unvoted_file, 'account_unvoted', args.converter, args.loader, workers, args.clustered, partition):
+                record_import(connection, 'account_unvoted', [args.unvoted_file])
+            else:
                 success = False
         
         # Restore MySQL settings
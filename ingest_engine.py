@@ -0,0 +1,1316 @@
+#!/usr/bin/env python3
+"""
+Unified ingestion engine shared by the import_*.py scripts
+- Connection setup and bulk-load session settings in one place
+- Sources (parquet, CSV, Excel, MySQL query) yield Arrow tables batch by batch
+- Decoded CSV and Excel files are cached as memory-mapped Arrow IPC files (source_cache)
+- Sinks (LOAD DATA stream, executemany, parquet file, null, fan-out to several) consume them
+- run_ingest drives source -> transform -> sink with the same telemetry for every dataset
+
+Scripts only describe their dataset: the source, a row/column transform and the target table.
+"""
+
+import csv
+import getpass
+import math
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import redirect_stdout
+from datetime import date, datetime
+import numpy as np
+import openpyxl
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+from db_drivers import (DRIVER_ERRORS as Error, connect as driver_connect, error_code,
+                        get_driver, select_driver, streaming_cursor, whole_statement_executemany)
+from import_metrics import configure_metrics, get_metrics, stage_timer, timed_batches, timed_chunks
+from parquet_ingest import (STREAM_MEMORY_BUDGET, arrow_to_rows, iter_account_batches, iter_tsv_chunks,
+                            load_data_from_stream)
+from source_cache import cached_batches
+
+# Web application account, tried before prompting for root
+WEBAPP_CREDENTIALS = {'user': 'webapp', 'password': 'webapppass'}
+
+# Connection options for bulk loading (LOAD DATA LOCAL needs allow_local_infile)
+BULK_CONNECTION_OPTIONS = {
+    'host': 'localhost',
+    'autocommit': False,
+    'use_unicode': True,
+    'charset': 'utf8mb4',
+    'sql_mode': '',
+    'allow_local_infile': True,
+    'connect_timeout': 60,
+    'raise_on_warnings': False,
+}
+
+# Credentials that worked per database, reused by worker connections
+SESSION_CREDENTIALS = {}
+
+BULK_SESSION_SETTINGS = [
+    "SET SESSION innodb_buffer_pool_size = @@innodb_buffer_pool_size",
+    "SET SESSION bulk_insert_buffer_size = 256*1024*1024",  # 256MB
+    "SET SESSION myisam_sort_buffer_size = 512*1024*1024",   # 512MB
+    "SET SESSION key_buffer_size = 512*1024*1024",           # 512MB
+    "SET SESSION sort_buffer_size = 64*1024*1024",           # 64MB
+    "SET SESSION read_buffer_size = 32*1024*1024",           # 32MB
+    "SET SESSION read_rnd_buffer_size = 32*1024*1024",       # 32MB
+    "SET SESSION max_heap_table_size = 1024*1024*1024",      # 1GB
+    "SET SESSION tmp_table_size = 1024*1024*1024",           # 1GB
+    "SET foreign_key_checks = 0",
+    "SET unique_checks = 0",
+    "SET sql_log_bin = 0",
+    "SET autocommit = 0"
+]
+
+RESTORE_SESSION_SETTINGS = [
+    "SET foreign_key_checks = 1",
+    "SET unique_checks = 1",
+    "SET sql_log_bin = 1",
+    "SET autocommit = 1"
+]
+
+# Rows per batch read from CSV, Excel and query sources
+SOURCE_BATCH_ROWS = 50000
+
+# CSV bytes parsed per Arrow block
+CSV_BLOCK_SIZE = 16 * 1024 * 1024
+
+# Seconds between combined progress lines of run_parallel_imports and FanOutSink
+PROGRESS_INTERVAL = 10
+
+# Batches a FanOutSink target may fall behind before reading waits for it
+FANOUT_QUEUE_DEPTH = 4
+
+# Per-connection temporary table LoadDataSink upserts are staged in
+UPSERT_SUFFIX = "__upsert"
+
+# Text form of NULL and the column separator hashed by row_hashes
+NULL_TEXT = "\\N"
+HASH_SEPARATOR = "\x1f"
+
+# (shared dict, key) that run_ingest reports rows to inside a run_parallel_imports worker
+_progress = None
+
+# Adaptive executemany sizing: row bounds, target statement latency and the share of
+# max_allowed_packet one multi-row INSERT may fill
+ADAPTIVE_MIN_ROWS = 100
+ADAPTIVE_MAX_ROWS = 100000
+ADAPTIVE_TARGET_SECONDS = 1.0
+ADAPTIVE_PACKET_FILL = 0.5
+
+# Errors after which the batch is retried smaller (lock wait timeout, deadlock)
+RETRYABLE_ERRNOS = (1205, 1213)
+MAX_BATCH_RETRIES = 5
+
+# Errors that mean the statement was too large for the server (packet too large, connection lost)
+PACKET_ERRNOS = (1153, 2006, 2013)
+
+def connect_mysql(database, prompt_root=True, **options):
+    """Connect as webapp, falling back to root with a password prompt"""
+    config = dict(BULK_CONNECTION_OPTIONS, **options)
+    print(f"🔍 Connecting to MySQL {database} database...")
+
+    try:
+        connection = driver_connect(database=database, **WEBAPP_CREDENTIALS, **config)
+        SESSION_CREDENTIALS[database] = dict(WEBAPP_CREDENTIALS)
+        print("✅ Connected as webapp user")
+        return connection
+    except Error as e:
+        print(f"❌ webapp connection failed: {e}")
+
+    if not prompt_root:
+        return None
+
+    try:
+        password = getpass.getpass("Enter MySQL root password: ")
+        connection = driver_connect(database=database, user='root', password=password, **config)
+        SESSION_CREDENTIALS[database] = {'user': 'root', 'password': password}
+        print("✅ Connected as root user")
+        return connection
+    except Error as e:
+        print(f"❌ root connection failed: {e}")
+
+    return None
+
+def open_worker_connection(database, **options):
+    """Extra bulk-load connection with the credentials of the main session (never prompts)"""
+    credentials = SESSION_CREDENTIALS.get(database, WEBAPP_CREDENTIALS)
+    connection = driver_connect(database=database, **credentials,
+                                         **dict(BULK_CONNECTION_OPTIONS, **options))
+    optimize_mysql_settings(connection, verbose=False)
+    return connection
+
+def optimize_mysql_settings(connection, verbose=True):
+    """Optimize MySQL session settings for bulk import"""
+    try:
+        cursor = connection.cursor()
+
+        if verbose:
+            print("⚙️ Optimizing MySQL settings for bulk import...")
+
+        for query in BULK_SESSION_SETTINGS:
+            try:
+                cursor.execute(query)
+                if verbose:
+                    print(f"  ✅ {query}")
+            except Error as e:
+                if verbose:
+                    print(f"  ⚠️ Skipped: {query} ({e})")
+
+        if verbose:
+            print("✅ MySQL optimization completed")
+        return True
+
+    except Exception as e:
+        print(f"⚠️ Warning: Could not optimize all settings: {e}")
+        return False
+
+def restore_mysql_settings(connection):
+    """Restore MySQL session settings after import"""
+    try:
+        cursor = connection.cursor()
+        print("🔄 Restoring MySQL settings...")
+
+        for query in RESTORE_SESSION_SETTINGS:
+            try:
+                cursor.execute(query)
+            except Error:
+                pass
+
+        print("✅ MySQL settings restored")
+
+    except Exception as e:
+        print(f"⚠️ Warning restoring settings: {e}")
+
+def local_infile_enabled(connection):
+    """Whether the server accepts LOAD DATA LOCAL INFILE"""
+    cursor = connection.cursor()
+    cursor.execute("SHOW VARIABLES LIKE 'local_infile'")
+    result = cursor.fetchall()
+    cursor.close()
+    return bool(result) and result[0][1] == 'ON'
+
+def max_allowed_packet(cursor):
+    """Server max_allowed_packet in bytes (the 4MB MySQL default when it cannot be read)"""
+    try:
+        cursor.execute("SELECT @@max_allowed_packet")
+        return int(cursor.fetchone()[0])
+    except Error:
+        return 4 * 1024 * 1024
+
+def _row_bytes(rows, sample=200):
+    """Approximate bytes one row adds to a multi-row INSERT statement"""
+    sample_rows = rows[:sample]
+    if not sample_rows:
+        return 0
+    total = sum(sum(len(str(value)) + 3 for value in row) + 3 for row in sample_rows)
+    return total / len(sample_rows)
+
+class AdaptiveBatchSizer:
+    """executemany batch size driven by row width, max_allowed_packet and commit latency
+
+    Grows by half while statements finish under the target latency, up to the packet
+    limit; halves when a statement is slow, hits a lock wait or deadlock, or is too large.
+    The packet model assumes each batch goes out as one INSERT statement, which
+    executemany_adaptive and ExecuteManySink enforce (whole_statement_executemany).
+    """
+
+    def __init__(self, packet_bytes, initial_rows=1000, min_rows=ADAPTIVE_MIN_ROWS,
+                 max_rows=ADAPTIVE_MAX_ROWS, target_seconds=ADAPTIVE_TARGET_SECONDS):
+        self.packet_bytes = packet_bytes
+        self.min_rows = min_rows
+        self.max_rows = max_rows
+        self.target_seconds = target_seconds
+        self.size = max(min_rows, min(initial_rows, max_rows))
+        self.row_bytes = None
+        self.batches = 0
+        self.backoffs = 0
+
+    def limit(self):
+        """Largest batch that keeps one INSERT within the packet budget"""
+        if not self.row_bytes:
+            return self.max_rows
+        rows = int(self.packet_bytes * ADAPTIVE_PACKET_FILL / self.row_bytes)
+        return max(self.min_rows, min(self.max_rows, rows))
+
+    def next_batch(self, rows, position):
+        """Slice the next batch, measuring the row width on the way"""
+        batch = rows[position:position + self.size]
+        measured = _row_bytes(batch)
+        if measured:
+            # Wider rows take effect at once, narrower ones gradually
+            self.row_bytes = measured if self.row_bytes is None else max(self.row_bytes * 0.8 + measured * 0.2, measured)
+        limit = self.limit()
+        if len(batch) > limit:
+            self.size = limit
+            batch = batch[:limit]
+        return batch
+
+    def record(self, rows, seconds):
+        """Adjust after a successful statement (+ commit) of rows taking seconds"""
+        self.batches += 1
+        if rows < self.size:
+            return
+        if seconds > 2 * self.target_seconds:
+            self.size = max(self.min_rows, self.size // 2)
+        elif seconds < self.target_seconds:
+            self.size = min(self.limit(), max(self.size + self.min_rows, int(self.size * 1.5)))
+
+    def backoff(self, error):
+        """Halve after a failure; returns whether the same batch may be retried"""
+        errno = error_code(error)
+        if errno not in RETRYABLE_ERRNOS + PACKET_ERRNOS:
+            return False
+        self.backoffs += 1
+        self.size = max(self.min_rows, self.size // 2)
+        if errno in PACKET_ERRNOS and self.row_bytes:
+            # The server refused a statement this large: never grow past it again
+            self.packet_bytes = min(self.packet_bytes, int(self.size * self.row_bytes / ADAPTIVE_PACKET_FILL))
+        print(f"  ⚠️ {error} - batch size reduced to {self.size:,} rows")
+        return errno in RETRYABLE_ERRNOS
+
+    def report(self, label):
+        if not self.batches:
+            return
+        statement_kb = self.size * (self.row_bytes or 0) / 1024
+        print(f"🎚️ {label}: batch size settled at {self.size:,} rows (~{statement_kb:,.0f} KB per INSERT, "
+              f"limit {self.limit():,} rows at max_allowed_packet {self.packet_bytes / 1024**2:,.0f} MB, "
+              f"{self.backoffs} backoff(s))")
+
+def executemany_adaptive(cursor, insert_query, rows, sizer):
+    """executemany in adaptively sized statements inside the caller's transaction
+
+    Each batch is sent as a single statement. A lock wait timeout rolls back only that
+    statement, so the batch is retried smaller; if the backend cannot send a batch whole,
+    or on any other error, the error propagates and the caller rolls back its transaction.
+    """
+    whole = whole_statement_executemany(cursor)
+    position = 0
+    retries = 0
+    while position < len(rows):
+        batch = sizer.next_batch(rows, position)
+        start_time = time.perf_counter()
+        try:
+            cursor.executemany(insert_query, batch)
+        except Error as err:
+            if not sizer.backoff(err) or error_code(err) != 1205 or not whole or retries >= MAX_BATCH_RETRIES:
+                raise
+            retries += 1
+            continue
+        sizer.record(len(batch), time.perf_counter() - start_time)
+        position += len(batch)
+    return len(rows)
+
+def is_blank(value):
+    """None, NaN/NaT or an empty string"""
+    if value is None:
+        return True
+    if isinstance(value, str):
+        return value.strip() == ''
+    try:
+        return bool(pd.isna(value))
+    except (TypeError, ValueError):
+        return False
+
+def safe_int(value):
+    """Safely convert to int (-1 is treated as missing)"""
+    if is_blank(value) or str(value).strip() == '-1':
+        return None
+    try:
+        return int(float(value))  # Handle cases like "123.0"
+    except (ValueError, TypeError):
+        return None
+
+def safe_float(value):
+    """Safely convert to float"""
+    if is_blank(value):
+        return None
+    try:
+        result = float(value)
+    except (ValueError, TypeError):
+        return None
+    return None if math.isnan(result) else result
+
+def safe_tinyint(value):
+    """Safely convert to tinyint (0-255)"""
+    if is_blank(value):
+        return None
+    try:
+        return max(0, min(255, int(float(value))))  # Clamp to tinyint range
+    except (ValueError, TypeError):
+        return None
+
+def safe_bool(value):
+    """Safely convert to boolean"""
+    if is_blank(value):
+        return None
+    if isinstance(value, bool):
+        return value
+    value_upper = str(value).upper().strip()
+    if value_upper in ['TRUE', '1', 'YES', 'Y']:
+        return True
+    elif value_upper in ['FALSE', '0', 'NO', 'N']:
+        return False
+    return None
+
+# Formats tried by parse_date, most common first
+DATE_FORMATS = [
+    '%Y-%m-%d',      # 2024-12-31
+    '%m/%d/%Y',      # 12/31/2024
+    '%d/%m/%Y',      # 31/12/2024
+    '%Y/%m/%d',      # 2024/12/31
+    '%m-%d-%Y',      # 12-31-2024
+    '%d-%m-%Y'       # 31-12-2024
+]
+
+def parse_date(date_str):
+    """Parse date string with multiple format support"""
+    if is_blank(date_str) or str(date_str).strip().lower() == 'null':
+        return None
+    if isinstance(date_str, datetime):
+        return date_str.date()
+    if isinstance(date_str, date):
+        return date_str
+
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(str(date_str).strip(), date_format).date()
+        except ValueError:
+            continue
+
+    print(f"⚠️ Warning: Could not parse date '{date_str}', setting to None")
+    return None
+
+# Column converters for column_transform: text array -> (values, mask of unparseable values or None).
+# Same rules as the safe_*/parse_* helpers above, applied with Arrow compute kernels.
+
+# Strings float() accepts, without nan/inf
+NUMBER_PATTERN = r'^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$'
+
+# Non-blank values sampled to pick a column's date format
+DATE_SAMPLE_ROWS = 1000
+
+TRUE_VALUES = pa.array(['TRUE', '1', 'YES', 'Y'])
+FALSE_VALUES = pa.array(['FALSE', '0', 'NO', 'N'])
+
+def _present(trimmed, missing=('',)):
+    """Mask of values that are not blank or a missing marker (compared case-insensitively)"""
+    return pc.invert(pc.is_in(pc.utf8_lower(trimmed), value_set=pa.array(list(missing), pa.string())))
+
+def _parse_float(trimmed, present, limit=None):
+    """float64 of the present numeric strings; non-numbers, infinities and |x| >= limit become NULL"""
+    numeric = pc.and_(present, pc.match_substring_regex(trimmed, NUMBER_PATTERN))
+    values = pc.cast(pc.if_else(numeric, trimmed, pa.scalar(None, pa.string())), pa.float64())
+    in_range = pc.is_finite(values) if limit is None else pc.less(pc.abs(values), limit)
+    return pc.if_else(in_range, values, pa.scalar(None, pa.float64()))
+
+def _invalid(present, values):
+    return pc.and_(present, pc.is_null(values))
+
+def arrow_text(array, missing=('',), max_length=None):
+    """Text column; blank values and missing markers become NULL"""
+    values = pc.if_else(_present(pc.utf8_trim_whitespace(array), missing), array, pa.scalar(None, pa.string()))
+    if max_length:
+        values = pc.utf8_slice_codeunits(values, 0, max_length)
+    return values, None
+
+def arrow_int(array, missing=('', '-1')):
+    """safe_int for a column: -1 is missing, "123.0" is truncated to 123"""
+    trimmed = pc.utf8_trim_whitespace(array)
+    present = _present(trimmed, missing)
+    values = pc.cast(pc.trunc(_parse_float(trimmed, present, limit=2.0 ** 63)), pa.int64())
+    return values, _invalid(present, values)
+
+def arrow_float(array):
+    """safe_float for a column"""
+    trimmed = pc.utf8_trim_whitespace(array)
+    present = _present(trimmed)
+    values = _parse_float(trimmed, present)
+    return values, _invalid(present, values)
+
+def arrow_tinyint(array):
+    """safe_tinyint for a column (clamped to 0-255)"""
+    trimmed = pc.utf8_trim_whitespace(array)
+    present = _present(trimmed)
+    values = _parse_float(trimmed, present)
+    values = pc.max_element_wise(pc.min_element_wise(pc.trunc(values), 255, skip_nulls=False), 0, skip_nulls=False)
+    values = pc.cast(values, pa.int64())
+    return values, _invalid(present, values)
+
+def arrow_numeric(array, places=None):
+    """Numeric column with thousands separators and 'null' markers, optionally rounded"""
+    trimmed = pc.utf8_trim_whitespace(pc.replace_substring(array, ',', ''))
+    present = _present(trimmed, ('', 'null'))
+    values = _parse_float(trimmed, present)
+    if places is not None:
+        values = pc.round(values, ndigits=places, round_mode='half_towards_infinity')
+    return values, _invalid(present, values)
+
+def arrow_bool(array, default=None):
+    """safe_bool for a column; blank values become default"""
+    upper = pc.utf8_upper(pc.utf8_trim_whitespace(array))
+    present = pc.not_equal(upper, '')
+    values = pc.if_else(pc.is_in(upper, value_set=TRUE_VALUES), True,
+                        pc.if_else(pc.is_in(upper, value_set=FALSE_VALUES), False, pa.scalar(None, pa.bool_())))
+    invalid = _invalid(present, values)
+    if default is not None:
+        values = pc.if_else(present, values, default)
+    return values, invalid
+
+def detect_date_format(trimmed, formats=DATE_FORMATS):
+    """Format parsing the most sampled values (earlier formats win ties), None without values"""
+    sample = trimmed.slice(0, DATE_SAMPLE_ROWS)
+    if len(sample) == 0:
+        return None
+    best_format, best_parsed = None, 0
+    for date_format in formats:
+        parsed = len(sample) - pc.strptime(sample, format=date_format, unit='s', error_is_null=True).null_count
+        if parsed > best_parsed:
+            best_format, best_parsed = date_format, parsed
+    return best_format
+
+# Datetime text as cells_to_text writes it; group 1 is the date part
+DATETIME_TEXT = r'^(\d{4}-\d{2}-\d{2})[ T]\d{1,2}:\d{2}(:\d{2}(\.\d*)?)?$'
+
+def arrow_date(array, formats=DATE_FORMATS):
+    """parse_date for a column: one detected format, the others only for values it cannot parse"""
+    trimmed = pc.utf8_trim_whitespace(array)
+    present = _present(trimmed, ('', 'null'))
+    detected = detect_date_format(pc.filter(trimmed, present), formats)
+    values = pa.nulls(len(trimmed), pa.timestamp('s'))
+    if detected is not None:
+        for date_format in [detected] + [f for f in formats if f != detected]:
+            parsed = pc.strptime(trimmed, format=date_format, unit='s', error_is_null=True)
+            values = pc.coalesce(values, parsed)
+            if not pc.any(_invalid(present, values)).as_py():
+                break
+    values = pc.cast(pc.if_else(present, values, pa.scalar(None, pa.timestamp('s'))), pa.date32())
+    return values, _invalid(present, values)
+
+def arrow_day(array, formats=DATE_FORMATS):
+    """arrow_date for datetime cells: 'YYYY-MM-DD HH:MM[:SS]' keeps only its date (the baseline's .date())"""
+    dates = pc.replace_substring_regex(pc.utf8_trim_whitespace(array), DATETIME_TEXT, r'\1')
+    return arrow_date(dates, formats)
+
+class ParquetSource:
+    """Parquet file read in record batches (optionally projected)"""
+
+    def __init__(self, path, columns=None, batch_rows=SOURCE_BATCH_ROWS):
+        self.path = path
+        self.columns = columns
+        self.batch_rows = batch_rows
+
+    def describe(self):
+        return f"parquet {self.path}"
+
+    def batches(self):
+        pf = pq.ParquetFile(self.path)
+        for batch in pf.iter_batches(batch_size=self.batch_rows, columns=self.columns):
+            yield pa.Table.from_batches([batch])
+
+class AccountParquetSource:
+    """Account parquet file streamed as compacted tables sized by a memory budget (iter_account_batches)"""
+
+    def __init__(self, path, config, memory_budget=STREAM_MEMORY_BUDGET):
+        self.path = path
+        self.config = config
+        self.memory_budget = memory_budget
+
+    def describe(self):
+        return f"parquet {self.path}"
+
+    def batches(self):
+        _, tables = iter_account_batches(self.path, self.config, self.memory_budget)
+        yield from tables
+
+class CsvSource:
+    """CSV file streamed in Arrow blocks, every column kept as text like csv.DictReader (cached, see source_cache)"""
+
+    def __init__(self, path, exclude=None, batch_rows=SOURCE_BATCH_ROWS, encoding='utf-8'):
+        self.path = path
+        self.exclude = exclude
+        self.batch_rows = batch_rows
+        self.encoding = encoding
+
+    def describe(self):
+        return f"CSV {self.path}"
+
+    def header(self):
+        """Column names from the first CSV record"""
+        with open(self.path, 'r', encoding=self.encoding, newline='') as file:
+            return next(csv.reader(file), [])
+
+    def batches(self):
+        names = self.header()
+        include = [name for name in names if not (self.exclude and self.exclude(name))]
+        return cached_batches(self.path, 'csv', (self.encoding, tuple(include)),
+                              lambda: self._parse(names, include), self.batch_rows)
+
+    def _parse(self, names, include):
+        reader = pacsv.open_csv(
+            self.path,
+            read_options=pacsv.ReadOptions(block_size=CSV_BLOCK_SIZE, encoding=self.encoding),
+            parse_options=pacsv.ParseOptions(newlines_in_values=True),
+            convert_options=pacsv.ConvertOptions(
+                column_types={name: pa.string() for name in names},
+                include_columns=include,
+                strings_can_be_null=False,
+                quoted_strings_can_be_null=False
+            )
+        )
+        for batch in reader:
+            table = pa.Table.from_batches([batch])
+            for start in range(0, table.num_rows, self.batch_rows):
+                yield table.slice(start, self.batch_rows)
+
+def excel_text(value):
+    """Text of one worksheet cell (dates without a time of day as YYYY-MM-DD)"""
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+    if isinstance(value, datetime):
+        return value.date().isoformat() if value.time() == datetime.min.time() else value.isoformat(' ')
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)
+
+def cells_to_text(values):
+    """Worksheet column -> Arrow text array like CsvSource's (blank cells as '')
+
+    Columns of one cell type are inferred and cast by Arrow; only mixed columns
+    are formatted cell by cell.
+    """
+    try:
+        array = pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        array = pa.array([excel_text(value) for value in values], pa.string())
+    if pa.types.is_timestamp(array.type):
+        midnight = pc.equal(pc.floor_temporal(array, unit='day'), array)
+        seconds = pc.cast(pc.floor_temporal(array, unit='second'), pa.timestamp('s'))
+        array = pc.if_else(midnight, pc.strftime(array, '%Y-%m-%d'), pc.strftime(seconds, '%Y-%m-%d %H:%M:%S'))
+    elif pa.types.is_boolean(array.type):
+        array = pc.if_else(array, 'TRUE', 'FALSE')
+    elif not pa.types.is_string(array.type):
+        array = pc.cast(array, pa.string())
+    return pc.fill_null(array, '')
+
+class ExcelSource:
+    """Excel sheet streamed from openpyxl in read-only mode, every cell handed on as text like CsvSource (cached)"""
+
+    def __init__(self, path, sheet_name=0, batch_rows=SOURCE_BATCH_ROWS):
+        self.path = path
+        self.sheet_name = sheet_name
+        self.batch_rows = batch_rows
+
+    def describe(self):
+        return f"Excel {self.path}"
+
+    def _worksheet(self, workbook):
+        if isinstance(self.sheet_name, int):
+            return workbook.worksheets[self.sheet_name]
+        return workbook[self.sheet_name]
+
+    @staticmethod
+    def _names(header):
+        # Unnamed and repeated headers are renamed like pandas.read_excel does
+        names = []
+        for i, name in enumerate(header):
+            name = f"Unnamed: {i}" if name is None else str(name).strip()
+            base, n = name, 0
+            while name in names:
+                n += 1
+                name = f"{base}.{n}"
+            names.append(name)
+        return names
+
+    def header(self):
+        """Column names from the first worksheet row"""
+        workbook = openpyxl.load_workbook(self.path, read_only=True, data_only=True)
+        try:
+            return self._names(next(self._worksheet(workbook).iter_rows(values_only=True), ()))
+        finally:
+            workbook.close()
+
+    @staticmethod
+    def _table(rows, names):
+        width = len(names)
+        rows = [row if len(row) == width else (tuple(row) + (None,) * width)[:width] for row in rows]
+        columns = zip(*rows)
+        return pa.Table.from_arrays([cells_to_text(list(column)) for column in columns], names=names)
+
+    def batches(self):
+        return cached_batches(self.path, 'excel', (self.sheet_name,), self._parse, self.batch_rows)
+
+    def _parse(self):
+        # Read-only mode parses the sheet XML as it is iterated: memory holds one batch of rows
+        workbook = openpyxl.load_workbook(self.path, read_only=True, data_only=True)
+        try:
+            rows = self._worksheet(workbook).iter_rows(values_only=True)
+            names = self._names(next(rows, ()))
+            batch = []
+            for row in rows:
+                if not any(value is not None for value in row):
+                    continue
+                batch.append(row)
+                if len(batch) == self.batch_rows:
+                    yield self._table(batch, names)
+                    batch = []
+            if batch:
+                yield self._table(batch, names)
+        finally:
+            workbook.close()
+
+class QuerySource:
+    """Result set of a MySQL query fetched in batches on an unbuffered cursor"""
+
+    def __init__(self, connection, query, params=None, batch_rows=SOURCE_BATCH_ROWS):
+        self.connection = connection
+        self.query = query
+        self.params = params
+        self.batch_rows = batch_rows
+
+    def describe(self):
+        return "MySQL query"
+
+    def batches(self):
+        cursor = streaming_cursor(self.connection)
+        try:
+            cursor.execute(self.query, self.params)
+            names = [column[0] for column in cursor.description]
+            while True:
+                rows = cursor.fetchmany(self.batch_rows)
+                if not rows:
+                    break
+                columns = list(zip(*rows))
+                yield pa.Table.from_arrays([pa.array(column) for column in columns], names=names)
+        finally:
+            cursor.close()
+
+def rows_to_table(rows, columns):
+    """Arrow table from row tuples or dicts in target column order"""
+    if rows and isinstance(rows[0], dict):
+        data = {column: [row[column] for row in rows] for column in columns}
+    else:
+        values = list(zip(*rows)) if rows else [[] for _ in columns]
+        data = dict(zip(columns, values))
+    return pa.table({column: pa.array(list(data[column])) for column in columns})
+
+def row_transform(process_row, columns, max_errors=None):
+    """Transform applying a per-row converter (dict -> tuple/dict, None skips the row)"""
+    state = {'row_num': 1, 'errors': 0}
+
+    def transform(table):
+        rows = []
+        for row in table.to_pylist():
+            state['row_num'] += 1
+            try:
+                data = process_row(row)
+            except Exception as e:
+                state['errors'] += 1
+                print(f"❌ Error processing row {state['row_num']}: {e}")
+                if max_errors is not None and state['errors'] > max_errors:
+                    raise RuntimeError(f"Too many errors ({state['errors']}), stopping import")
+                continue
+            if data is not None:
+                rows.append(data)
+        return rows_to_table(rows, columns)
+
+    transform.state = state
+    return transform
+
+def column_transform(spec, required=(), max_errors=None):
+    """Transform converting whole text columns with Arrow kernels (no per-row Python)
+
+    spec lists (target, source, converter) in target column order; converter maps the
+    source text array to (values, invalid mask) like the arrow_* helpers, and missing
+    source columns read as blank. Rows with an unparseable value count as errors (the
+    value becomes NULL); rows whose required targets are NULL are skipped.
+    """
+    state = {'row_num': 1, 'errors': 0, 'invalid': {}}
+
+    def transform(table):
+        blank = None
+        arrays = []
+        bad_rows = None
+        for target, source, converter in spec:
+            if source in table.column_names:
+                column = table.column(source).combine_chunks()
+            else:
+                if blank is None:
+                    blank = pc.fill_null(pa.nulls(table.num_rows, pa.string()), '')
+                column = blank
+            values, invalid = converter(column)
+            arrays.append(values)
+            if invalid is None:
+                continue
+            count = pc.sum(invalid).as_py() or 0
+            if count:
+                state['invalid'][target] = state['invalid'].get(target, 0) + count
+                example = pc.filter(column, invalid)[0].as_py()
+                print(f"⚠️ Warning: {count} unparseable {target} value(s) set to NULL (e.g. '{example}')")
+                bad_rows = invalid if bad_rows is None else pc.or_(bad_rows, invalid)
+        state['row_num'] += table.num_rows
+        if bad_rows is not None:
+            state['errors'] += pc.sum(bad_rows).as_py() or 0
+            if max_errors is not None and state['errors'] > max_errors:
+                raise RuntimeError(f"Too many errors ({state['errors']}), stopping import")
+
+        result = pa.Table.from_arrays(arrays, names=[target for target, _, _ in spec])
+        for target in required:
+            result = result.filter(pc.is_valid(result.column(target)))
+        return result
+
+    transform.state = state
+    return transform
+
+def _row_text(table, columns, scales=None):
+    """Text form of columns, so Arrow types do not matter (NULLs stay null)
+
+    scales maps DECIMAL columns to their scale: floats and decimals are both formatted with
+    that many places first, so CSV values and values read back from MySQL compare alike.
+    """
+    parts = []
+    for column in columns:
+        values = table.column(column)
+        scale = (scales or {}).get(column)
+        if scale is not None:
+            if pa.types.is_floating(values.type):
+                values = pc.round(values, ndigits=scale, round_mode='half_towards_infinity')
+            values = pc.cast(values, pa.decimal128(38, scale), safe=False)
+        parts.append(pc.cast(values, pa.string()))
+    return parts
+
+def row_hashes(table, columns, scales=None):
+    """64-bit hash per row of columns, taken over their text form (see _row_text)"""
+    parts = [pc.fill_null(part, NULL_TEXT) for part in _row_text(table, columns, scales)]
+    text = pc.binary_join_element_wise(*parts, HASH_SEPARATOR) if len(parts) > 1 else parts[0]
+    return pd.util.hash_pandas_object(text.to_pandas(), index=False).to_numpy()
+
+def row_keys(table, columns):
+    """Exact key of each row: a tuple of its columns' text form, None for NULL"""
+    return list(zip(*(part.to_pylist() for part in _row_text(table, columns))))
+
+def dedupe_transform(transform, key_columns):
+    """Wrap a transform so rows repeating the key of an earlier row in this import are dropped
+
+    Keys containing NULL are never dropped, as with a UNIQUE index. Keys are remembered
+    exactly; the dropped count is in state['duplicates'] next to the wrapped transform's state.
+    """
+    seen = set()
+    state = dict(getattr(transform, 'state', {}), duplicates=0)
+
+    def dedupe(table):
+        if transform is not None:
+            table = transform(table)
+            state.update(getattr(transform, 'state', {}))
+        if table.num_rows == 0:
+            return table
+        keep = np.ones(table.num_rows, dtype=bool)
+        for i, key in enumerate(row_keys(table, key_columns)):
+            if None in key:
+                continue  # like a UNIQUE index, keys containing NULL never count as duplicates
+            if key in seen:
+                keep[i] = False
+            else:
+                seen.add(key)
+        dropped = table.num_rows - int(keep.sum())
+        if dropped:
+            state['duplicates'] += dropped
+            table = table.filter(pa.array(keep))
+        return table
+
+    dedupe.state = state
+    return dedupe
+
+class KeySnapshot:
+    """Existing rows of a table as their exact keys, each with a hash of its other columns
+
+    Built once per run and used to split an import into new rows, rows identical to the
+    stored ones and rows whose key exists with different values.
+    """
+
+    def __init__(self, key_columns, value_columns=(), scales=None):
+        self.key_columns = list(key_columns)
+        self.value_columns = list(value_columns)
+        self.scales = scales or {}
+        self.rows = {}
+
+    def load(self, source):
+        """Read every row of source (which must yield the key and value columns)"""
+        start_time = time.time()
+        for table in source.batches():
+            keys = row_keys(table, self.key_columns)
+            if self.value_columns:
+                self.rows.update(zip(keys, row_hashes(table, self.value_columns, self.scales).tolist()))
+            else:
+                self.rows.update(dict.fromkeys(keys, 0))
+        print(f"🗂️ Snapshot of {len(self.rows):,} existing keys built in {time.time() - start_time:.1f}s")
+        return self
+
+    def classify(self, table):
+        """(new, unchanged, conflicting) row masks of a batch against the snapshot"""
+        # Like a UNIQUE index, keys containing NULL never match a stored row
+        stored = [None if None in key else self.rows.get(key) for key in row_keys(table, self.key_columns)]
+        found = np.fromiter((value is not None for value in stored), dtype=bool, count=len(stored))
+        if self.value_columns and found.any():
+            values = row_hashes(table, self.value_columns, self.scales).tolist()
+            same = np.fromiter((stored[i] == values[i] for i in range(len(stored))), dtype=bool, count=len(stored))
+        else:
+            same = found
+        return ~found, same, found & ~same
+
+def delta_transform(transform, snapshot):
+    """Wrap a transform so only rows whose key is not in the snapshot are passed on
+
+    Counts are kept in state['new'], state['unchanged'] and state['conflicting'].
+    """
+    state = dict(getattr(transform, 'state', {}), new=0, unchanged=0, conflicting=0)
+
+    def delta(table):
+        if transform is not None:
+            table = transform(table)
+            state.update(getattr(transform, 'state', {}))
+        if table.num_rows == 0:
+            return table
+        new, unchanged, conflicting = snapshot.classify(table)
+        state['new'] += int(new.sum())
+        state['unchanged'] += int(unchanged.sum())
+        state['conflicting'] += int(conflicting.sum())
+        return table.filter(pa.array(new))
+
+    delta.state = state
+    return delta
+
+def upsert_clause(update_columns):
+    """ON DUPLICATE KEY UPDATE taking the new values of update_columns"""
+    return "ON DUPLICATE KEY UPDATE " + ", ".join(f"{column} = VALUES({column})" for column in update_columns)
+
+class LoadDataSink:
+    """LOAD DATA LOCAL INFILE streamed from Arrow, one transaction per batch
+
+    LOCAL loads skip rows that repeat a unique key (counted in skipped from the affected rows).
+    With on_duplicate='update' each batch is loaded into a temporary table and merged with
+    INSERT ... SELECT ... ON DUPLICATE KEY UPDATE of update_columns instead; the merges'
+    affected rows are summed in affected.
+    """
+
+    def __init__(self, connection, table_name, columns, on_duplicate=None, update_columns=None):
+        self.connection = connection
+        self.table_name = table_name
+        self.columns = columns
+        self.cursor = connection.cursor()
+        self.skipped = 0
+        self.affected = 0
+        self.load_table = table_name
+        self.merge_query = None
+        if on_duplicate == 'update':
+            self.load_table = f"{table_name}{UPSERT_SUFFIX}"
+            self.cursor.execute(f"CREATE TEMPORARY TABLE IF NOT EXISTS {self.load_table} LIKE {table_name}")
+            column_list = ', '.join(columns)
+            self.merge_query = (f"INSERT INTO {table_name} ({column_list}) SELECT {column_list} FROM {self.load_table} "
+                                + upsert_clause(update_columns or columns))
+
+    def describe(self):
+        return f"LOAD DATA → {self.table_name}" + (" (upsert)" if self.merge_query else "")
+
+    def write(self, table):
+        if table.num_rows == 0:
+            return 0
+        with stage_timer("load", self.table_name) as timer:
+            loaded = load_data_from_stream(self.cursor, self.load_table, f"({', '.join(self.columns)})",
+                                           timed_chunks(iter_tsv_chunks(table), self.table_name))
+            timer.rows = table.num_rows
+        if loaded is None or loaded < 0:
+            loaded = table.num_rows
+        self.skipped += table.num_rows - loaded
+        if self.merge_query is not None:
+            with stage_timer("merge", self.table_name) as timer:
+                self.cursor.execute(self.merge_query)
+                if self.cursor.rowcount is not None and self.cursor.rowcount > 0:
+                    self.affected += self.cursor.rowcount
+                self.cursor.execute(f"DELETE FROM {self.load_table}")
+                timer.rows = loaded
+        with stage_timer("commit", self.table_name):
+            self.connection.commit()
+        return loaded
+
+    def abort(self):
+        self.connection.rollback()
+
+    def close(self):
+        if self.merge_query is not None:
+            self.cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS {self.load_table}")
+        self.cursor.close()
+
+class ExecuteManySink:
+    """executemany in adaptively sized batches
+
+    on_duplicate: None fails on a duplicate key, 'ignore' uses INSERT IGNORE and 'update'
+    ON DUPLICATE KEY UPDATE of update_columns; skipped comes from the affected rows, and
+    upserts sum theirs in affected.
+    """
+
+    def __init__(self, connection, table_name, columns, batch_size=1000, on_duplicate=None, update_columns=None):
+        self.connection = connection
+        self.table_name = table_name
+        self.columns = columns
+        self.on_duplicate = on_duplicate
+        self.cursor = connection.cursor()
+        whole_statement_executemany(self.cursor)
+        self.sizer = AdaptiveBatchSizer(max_allowed_packet(self.cursor), initial_rows=batch_size)
+        self.skipped = 0
+        self.affected = 0
+        placeholders = ", ".join(["%s"] * len(columns))
+        verb = "INSERT IGNORE" if on_duplicate == 'ignore' else "INSERT"
+        self.insert_query = f"{verb} INTO {table_name} ({', '.join(columns)}) VALUES ({placeholders})"
+        if on_duplicate == 'update':
+            self.insert_query += " " + upsert_clause(update_columns or columns)
+
+    def describe(self):
+        return f"executemany → {self.table_name}" + (f" ({self.on_duplicate} duplicates)" if self.on_duplicate else "")
+
+    def _count_duplicates(self, batch_rows, affected):
+        """Record skipped/affected rows of one statement; returns the rows it skipped"""
+        if affected is None or affected < 0:
+            return 0
+        if self.on_duplicate == 'ignore':
+            self.skipped += batch_rows - affected
+            return batch_rows - affected
+        if self.on_duplicate == 'update':
+            self.affected += affected
+        return 0
+
+    def write(self, table):
+        with stage_timer("serialize", self.table_name) as timer:
+            rows = arrow_to_rows(table)
+            timer.rows = len(rows)
+        written = 0
+        position = 0
+        retries = 0
+        while position < len(rows):
+            # Every batch is its own transaction, so a lock wait or deadlock retries it smaller
+            batch = self.sizer.next_batch(rows, position)
+            start_time = time.perf_counter()
+            try:
+                with stage_timer("load", self.table_name) as timer:
+                    self.cursor.executemany(self.insert_query, batch)
+                    timer.rows = len(batch)
+                with stage_timer("commit", self.table_name):
+                    self.connection.commit()
+                written += len(batch) - self._count_duplicates(len(batch), self.cursor.rowcount)
+                self.sizer.record(len(batch), time.perf_counter() - start_time)
+            except Error as err:
+                try:
+                    self.connection.rollback()
+                except Error:
+                    pass
+                if not self.sizer.backoff(err) or retries >= MAX_BATCH_RETRIES:
+                    raise
+                retries += 1
+                continue
+            position += len(batch)
+        return written
+
+    def abort(self):
+        self.connection.rollback()
+
+    def close(self):
+        self.sizer.report(self.table_name)
+        self.cursor.close()
+
+class ParquetSink:
+    """Parquet file (exports and offline benchmarks)"""
+
+    def __init__(self, path, compression='zstd'):
+        self.path = path
+        self.compression = compression
+        self.writer = None
+        self.schema = None
+        self.skipped = 0
+
+    def describe(self):
+        return f"parquet {self.path}"
+
+    def write(self, table):
+        if self.writer is None:
+            self.schema = table.schema
+            self.writer = pq.ParquetWriter(self.path, self.schema, compression=self.compression)
+        elif table.schema != self.schema:
+            table = table.cast(self.schema)
+        with stage_timer("load", self.path) as timer:
+            self.writer.write_table(table)
+            timer.rows = table.num_rows
+        return table.num_rows
+
+    def abort(self):
+        pass
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+class NullSink:
+    """Discards everything; measures source + transform throughput"""
+
+    def __init__(self):
+        self.skipped = 0
+
+    def describe(self):
+        return "null sink"
+
+    def write(self, table):
+        return table.num_rows
+
+    def abort(self):
+        pass
+
+    def close(self):
+        pass
+
+class FanOutSink:
+    """Writes every batch to several sinks at once, one writer thread and connection per target
+
+    Each target has a bounded queue, so reading stalls while the slowest target is
+    FANOUT_QUEUE_DEPTH batches behind. A failing target is aborted and dropped; the
+    others carry on. Per-target rows and errors are in results after close().
+    """
+
+    def __init__(self, sinks, queue_depth=FANOUT_QUEUE_DEPTH):
+        self.sinks = dict(sinks)
+        self.queues = {label: queue.Queue(maxsize=queue_depth) for label in self.sinks}
+        self.results = {label: {'rows': 0, 'error': None, 'seconds': 0.0} for label in self.sinks}
+        self.skipped = 0
+        self.affected = 0
+        self.start_time = time.time()
+        self.last_report = self.start_time
+        self.threads = [threading.Thread(target=self._writer, args=(label,), name=f"fanout-{label}", daemon=True)
+                        for label in self.sinks]
+        for thread in self.threads:
+            thread.start()
+
+    def describe(self):
+        return f"fan-out to {', '.join(self.sinks)}"
+
+    def _writer(self, label):
+        sink = self.sinks[label]
+        result = self.results[label]
+        batches = self.queues[label]
+        while True:
+            table = batches.get()
+            if table is None:
+                break
+            if result['error'] is not None:
+                continue  # keep draining so the reader never blocks on a failed target
+            try:
+                result['rows'] += sink.write(table)
+                result['seconds'] = time.time() - self.start_time
+            except Exception as e:
+                result['error'] = e
+                print(f"❌ {label}: {e} - dropping this target")
+                try:
+                    sink.abort()
+                except Exception:
+                    pass
+
+    def write(self, table):
+        if table.num_rows == 0:
+            return 0
+        live = [label for label, result in self.results.items() if result['error'] is None]
+        if not live:
+            raise RuntimeError("All fan-out targets failed")
+        for label in live:
+            self.queues[label].put(table)  # blocks while this target is queue_depth batches behind
+        if time.time() - self.last_report >= PROGRESS_INTERVAL:
+            self.last_report = time.time()
+            self.report_progress()
+        return table.num_rows
+
+    def report_progress(self):
+        elapsed = time.time() - self.start_time
+        for label, result in self.results.items():
+            state = "failed" if result['error'] is not None else f"{self.queues[label].qsize()} batch(es) queued"
+            rate = result['rows'] / elapsed if elapsed > 0 else 0
+            print(f"  📤 {label}: {result['rows']:,} rows ({rate:,.0f} rows/sec), {state}")
+
+    def _stop(self):
+        for batches in self.queues.values():
+            batches.put(None)
+        for thread in self.threads:
+            thread.join()
+
+    def abort(self):
+        for batches in self.queues.values():
+            while not batches.empty():
+                batches.get_nowait()
+        self._stop()
+        for label, sink in self.sinks.items():
+            if self.results[label]['error'] is None:
+                sink.abort()
+
+    def close(self):
+        if any(thread.is_alive() for thread in self.threads):
+            self._stop()
+        for label, sink in self.sinks.items():
+            try:
+                sink.close()
+            except Exception as e:
+                print(f"⚠️ {label}: close failed: {e}")
+            self.skipped += getattr(sink, 'skipped', 0)
+            self.affected += getattr(sink, 'affected', 0)
+        for label, result in self.results.items():
+            if result['error'] is None:
+                rate = result['rows'] / result['seconds'] if result['seconds'] > 0 else 0
+                print(f"  ✅ {label}: {result['rows']:,} rows in {result['seconds']:.1f}s ({rate:,.0f} rows/sec)")
+            else:
+                print(f"  ❌ {label}: failed after {result['rows']:,} rows: {result['error']}")
+
+def choose_sink(connection, table_name, columns, batch_size=1000, skip_duplicates=False, on_duplicate=None,
+                update_columns=None):
+    """Fastest MySQL sink the server allows: LOAD DATA stream, else executemany
+
+    Duplicate unique keys fail the load unless on_duplicate is 'ignore' (or skip_duplicates)
+    or 'update' (upsert update_columns, default all columns).
+    """
+    if on_duplicate is None and skip_duplicates:
+        on_duplicate = 'ignore'
+    try:
+        if local_infile_enabled(connection):
+            return LoadDataSink(connection, table_name, columns, on_duplicate, update_columns)
+    except Error as e:
+        print(f"⚠️ Could not check local_infile: {e}")
+    print("⚠️ local_infile is disabled, using batch insert method...")
+    return ExecuteManySink(connection, table_name, columns, batch_size, on_duplicate, update_columns)
+
+def run_ingest(source, sink, transform=None, label=None, prepare=None):
+    """Stream source -> transform -> sink and return the run statistics
+
+    prepare() runs once, right before the first non-empty batch is written (e.g. clearing
+    the target), so an import without valid rows leaves the table untouched.
+    """
+    label = label or sink.describe()
+    print(f"🚀 {source.describe()} → {sink.describe()}")
+
+    stats = {'rows_read': 0, 'rows_written': 0, 'batches': 0, 'skipped': 0, 'affected': 0, 'seconds': 0.0, 'rate': 0.0}
+    metrics_table = getattr(sink, 'table_name', None) or label
+    start_time = time.time()
+    try:
+        # Source decode time is what the generator spends producing each batch
+        for table in timed_batches(source.batches(), "read", metrics_table):
+            stats['rows_read'] += table.num_rows
+            if transform is not None:
+                with stage_timer("convert", metrics_table) as timer:
+                    table = transform(table)
+                    timer.rows = table.num_rows
+            if prepare is not None and table.num_rows:
+                prepare()
+                prepare = None
+            stats['rows_written'] += sink.write(table)
+            stats['batches'] += 1
+            if _progress is not None:
+                shared, key = _progress
+                shared[key] = stats['rows_written']
+
+            elapsed = time.time() - start_time
+            rate = stats['rows_written'] / elapsed if elapsed > 0 else 0
+            print(f"📝 {label}: {stats['rows_written']:,} rows written ({rate:,.0f} rows/sec)")
+    except Exception:
+        sink.abort()
+        raise
+    finally:
+        sink.close()
+
+    stats['skipped'] = sink.skipped
+    stats['affected'] = getattr(sink, 'affected', 0)
+    stats['seconds'] = time.time() - start_time
+    stats['rate'] = stats['rows_written'] / stats['seconds'] if stats['seconds'] > 0 else 0
+    print(f"✅ {label}: {stats['rows_written']:,}/{stats['rows_read']:,} rows in "
+          f"{stats['seconds']:.1f}s ({stats['rate']:,.0f} rows/sec)")
+    if stats['skipped']:
+        print(f"⚠️ Skipped {stats['skipped']:,} duplicate entries")
+    if stats['affected']:
+        # Upserts: MySQL counts 1 per inserted, 2 per changed and 0 per unchanged row, so
+        # inserts and updates cannot be told apart from the total
+        print(f"🔄 Upsert affected {stats['affected']:,} rows")
+    return stats
+
+def _metrics_path(path, key):
+    """Per-worker variant of a metrics file path (proxy.prom -> proxy_<key>.prom)"""
+    if not path:
+        return path
+    stem, ext = os.path.splitext(path)
+    return f"{stem}_{key}{ext}"
+
+def _parallel_import_worker(key, target, args, progress, log_dir, driver, metrics_paths):
+    """Runs in a fresh process: one import, its output captured in <log_dir>/<key>.log"""
+    global _progress
+    _progress = (progress, key)
+    select_driver(driver)
+    jsonl_path, prometheus_path = metrics_paths
+    log_path = os.path.join(log_dir, f"{key}.log")
+    start_time = time.time()
+    with open(log_path, 'w', buffering=1) as log, redirect_stdout(log):
+        configure_metrics(jsonl_path=jsonl_path, prometheus_path=_metrics_path(prometheus_path, key))
+        try:
+            result = target(*args)
+        except Exception as e:
+            print(f"❌ {key} failed: {e}")
+            result = False
+        get_metrics().close()
+    return result, time.time() - start_time, log_path
+
+def run_parallel_imports(jobs, workers, log_dir="."):
+    """Run independent imports in a process pool with one combined progress report
+
+    jobs is a list of (key, target, args); target must be a module-level function.
+    Each worker writes its output to <log_dir>/<key>.log. Returns {key: (result, seconds)}.
+    """
+    os.makedirs(log_dir, exist_ok=True)
+    workers = max(1, min(workers, len(jobs)))
+    metrics = get_metrics()
+    metrics_paths = (metrics.jsonl_path, metrics.prometheus_path)
+    context = multiprocessing.get_context('spawn')
+    results = {}
+    start_time = time.time()
+    print(f"🧵 Importing {len(jobs)} dataset(s) with {workers} worker process(es), logs in {os.path.abspath(log_dir)}")
+
+    with context.Manager() as manager:
+        progress = manager.dict()
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            futures = {pool.submit(_parallel_import_worker, key, target, args, progress, log_dir,
+                                   get_driver().name, metrics_paths): key
+                       for key, target, args in jobs}
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=PROGRESS_INTERVAL, return_when=FIRST_COMPLETED)
+                for future in done:
+                    key = futures[future]
+                    try:
+                        result, seconds, log_path = future.result()
+                    except Exception as e:
+                        result, seconds, log_path = False, time.time() - start_time, None
+                        print(f"❌ {key}: worker crashed: {e}")
+                    results[key] = (result, seconds)
+                    status = "✅" if result else "❌"
+                    print(f"{status} {key}: {progress.get(key, 0):,} rows in {seconds:.1f}s"
+                          + (f" (log: {log_path})" if log_path else ""))
+                if pending:
+                    rows = dict(progress)
+                    total = sum(rows.values())
+                    elapsed = time.time() - start_time
+                    rate = total / elapsed if elapsed > 0 else 0
+                    running = " | ".join(f"{futures[future]} {rows.get(futures[future], 0):,}" for future in pending)
+                    print(f"📊 {total:,} rows total ({rate:,.0f} rows/sec) - running: {running}")
+
+    elapsed = time.time() - start_time
+    slowest = max((seconds for _, seconds in results.values()), default=0.0)
+    print(f"⏱️ Wall time {elapsed:.1f}s, slowest dataset {slowest:.1f}s, "
+          f"sum of datasets {sum(seconds for _, seconds in results.values()):.1f}s")
+    return results
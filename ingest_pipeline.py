@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+"""
+Parallel row-group ingestion pipeline for the account parquet importers
+- Reader threads decode parquet row groups
+- Converter threads turn them into LOAD DATA / executemany payloads
+- Loader threads each own a MySQL connection and commit row groups
+- Stages are joined by bounded queues so memory stays flat regardless of file size
+- Partitioned tables load one standalone table per partition and publish it
+  with ALTER TABLE ... EXCHANGE PARTITION
+
+pyarrow decode, the compute kernels and the MySQL socket I/O all release the
+GIL, so plain threads keep every stage busy at the same time.
+"""
+
+import queue
+import threading
+import time
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from import_metrics import stage_timer, timed_chunks
+from ingest_engine import AdaptiveBatchSizer, executemany_adaptive, max_allowed_packet
+from parquet_ingest import (convert_arrow_table, arrow_to_rows, iter_tsv_chunks, load_data_from_stream,
+                            open_account_parquet, read_account_row_group)
+from table_ops import PARTITION_COLUMN, defer_secondary_indexes, rebuild_secondary_indexes
+
+# Marks the end of a stage's input
+_DONE = object()
+
+# Initial executemany chunk size when local_infile is unavailable (adapted per connection)
+INSERT_BATCH_SIZE = 5000
+
+class RowGroupPipeline:
+    """Reader -> converter pool -> loader pool, joined by bounded queues"""
+
+    def __init__(self, parquet_file, convert, load, connection_factory,
+                 readers=1, converters=2, loaders=2, queue_depth=4,
+                 prepare_connection=None, read=None, open_file=None, table_name=None):
+        self.parquet_file = parquet_file
+        self.table_name = table_name
+        self.convert = convert
+        self.load = load
+        self.connection_factory = connection_factory
+        self.prepare_connection = prepare_connection
+        self.read = read or (lambda pf, row_group_idx: pf.read_row_group(row_group_idx))
+        self.open_file = open_file or pq.ParquetFile
+        self.readers = max(1, readers)
+        self.converters = max(1, converters)
+        self.loaders = max(1, loaders)
+        self.queue_depth = max(1, queue_depth)
+
+        self._lock = threading.Lock()
+        self._abort = threading.Event()
+        self.imported = 0
+        self.loaded_row_groups = []
+        self.failed_row_groups = []
+        self.errors = []
+
+    def _put(self, target, item):
+        """Blocking put that gives up when the pipeline is aborted"""
+        while not self._abort.is_set():
+            try:
+                target.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _fail(self, row_group_idx, error):
+        with self._lock:
+            self.failed_row_groups.append(row_group_idx)
+            self.errors.append(error)
+        print(f"  ❌ Error processing row group {row_group_idx + 1}: {error}")
+
+    def _reader(self, pending, read_queue):
+        try:
+            pf = self.open_file(self.parquet_file)
+        except Exception as e:
+            print(f"❌ Reader could not open {self.parquet_file}: {e}")
+            self._abort.set()
+            return
+        while not self._abort.is_set():
+            try:
+                row_group_idx = pending.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                table = self.read(pf, row_group_idx)
+            except Exception as e:
+                self._fail(row_group_idx, e)
+                continue
+            if not self._put(read_queue, (row_group_idx, table)):
+                return
+
+    def _converter(self, read_queue, load_queue):
+        while True:
+            item = read_queue.get()
+            if item is _DONE:
+                return
+            row_group_idx, table = item
+            try:
+                payload = self.convert(table)
+            except Exception as e:
+                self._fail(row_group_idx, e)
+                continue
+            if not self._put(load_queue, (row_group_idx, payload)):
+                return
+
+    def _loader(self, load_queue, total_row_groups, start_time):
+        connection = None
+        try:
+            connection = self.connection_factory()
+            if connection is None:
+                raise RuntimeError("could not open loader connection")
+            if self.prepare_connection:
+                self.prepare_connection(connection)
+            cursor = connection.cursor()
+        except Exception as e:
+            print(f"❌ Loader connection failed: {e}")
+            self._abort.set()
+            return
+
+        try:
+            while True:
+                item = load_queue.get()
+                if item is _DONE:
+                    return
+                row_group_idx, payload = item
+                try:
+                    rows = self.load(cursor, row_group_idx, payload)
+                    with stage_timer("commit", self.table_name, row_group_idx):
+                        connection.commit()
+                except Exception as e:
+                    try:
+                        connection.rollback()
+                    except Exception:
+                        pass
+                    self._fail(row_group_idx, e)
+                    continue
+
+                with self._lock:
+                    self.imported += rows
+                    self.loaded_row_groups.append(row_group_idx)
+                    done = len(self.loaded_row_groups) + len(self.failed_row_groups)
+                    imported = self.imported
+                elapsed = time.time() - start_time
+                rate = imported / elapsed if elapsed > 0 else 0
+                print(f"  ✅ Row group {row_group_idx + 1}: {rows:,} records ({imported:,} total) "
+                      f"- {done}/{total_row_groups} done - {rate:,.0f} rec/sec")
+        finally:
+            if connection is not None:
+                connection.close()
+
+    def run(self, row_groups):
+        """Load the given row group indexes; returns the number of imported records"""
+        row_groups = list(row_groups)
+        pending = queue.Queue()
+        for row_group_idx in row_groups:
+            pending.put(row_group_idx)
+
+        read_queue = queue.Queue(maxsize=self.queue_depth)
+        load_queue = queue.Queue(maxsize=self.queue_depth)
+        start_time = time.time()
+
+        print(f"🧵 Pipeline: {self.readers} reader(s), {self.converters} converter(s), "
+              f"{self.loaders} loader(s), queue depth {self.queue_depth}")
+
+        readers = [threading.Thread(target=self._reader, args=(pending, read_queue), daemon=True)
+                   for _ in range(self.readers)]
+        converters = [threading.Thread(target=self._converter, args=(read_queue, load_queue), daemon=True)
+                      for _ in range(self.converters)]
+        loaders = [threading.Thread(target=self._loader, args=(load_queue, len(row_groups), start_time), daemon=True)
+                   for _ in range(self.loaders)]
+
+        for thread in readers + converters + loaders:
+            thread.start()
+
+        # Shut stages down in order: readers -> converters -> loaders
+        for thread in readers:
+            thread.join()
+        for _ in converters:
+            self._put_done(read_queue)
+        for thread in converters:
+            thread.join()
+        for _ in loaders:
+            self._put_done(load_queue)
+        for thread in loaders:
+            thread.join()
+
+        elapsed = time.time() - start_time
+        rate = self.imported / elapsed if elapsed > 0 else 0
+        print(f"✅ Pipeline completed: {self.imported:,} records in {elapsed:.1f}s ({rate:,.0f} rec/sec)")
+        if self.failed_row_groups:
+            print(f"⚠️ {len(self.failed_row_groups)} row group(s) failed: "
+                  f"{sorted(idx + 1 for idx in self.failed_row_groups)}")
+        return self.imported
+
+    def _put_done(self, target):
+        """Deliver a shutdown marker, draining the queue if the pipeline was aborted"""
+        while True:
+            try:
+                target.put(_DONE, timeout=0.5)
+                return
+            except queue.Full:
+                if self._abort.is_set():
+                    try:
+                        target.get_nowait()
+                    except queue.Empty:
+                        pass
+
+def account_pipeline_stages(table_name, config, use_load_data):
+    """Read/convert/load callables for an account table (LOAD DATA stream or executemany)"""
+    # One batch sizer per loader thread, since each owns its connection
+    sizers = threading.local()
+
+    def read(pf, row_group_idx):
+        with stage_timer("read", table_name, row_group_idx) as timer:
+            table = read_account_row_group(pf, row_group_idx, config)
+            timer.rows = table.num_rows
+        return table
+
+    def convert(table):
+        with stage_timer("convert", table_name) as timer:
+            converted = convert_arrow_table(table, config)
+            timer.rows = converted.num_rows
+        with stage_timer("serialize", table_name) as timer:
+            timer.rows = converted.num_rows
+            if use_load_data:
+                data = list(iter_tsv_chunks(converted))
+                timer.bytes = sum(len(chunk) for chunk in data)
+            else:
+                data = arrow_to_rows(converted)
+        return converted.num_rows, data
+
+    def load(cursor, row_group_idx, payload):
+        rows, data = payload
+        if rows == 0:
+            return 0
+        with stage_timer("load", table_name, row_group_idx) as timer:
+            if use_load_data:
+                load_data_from_stream(cursor, table_name, config['load_data_columns'], iter(data))
+            else:
+                if not hasattr(sizers, 'sizer'):
+                    sizers.sizer = AdaptiveBatchSizer(max_allowed_packet(cursor), initial_rows=INSERT_BATCH_SIZE)
+                executemany_adaptive(cursor, config['insert_query'], data, sizers.sizer)
+            timer.rows = rows
+        return rows
+
+    return read, convert, load
+
+def partition_index(values, scheme):
+    """Partition position of each proposal_master_skey, computed the way MySQL places rows"""
+    values = pc.fill_null(values, 0).to_numpy(zero_copy_only=False).astype(np.int64)
+    if scheme['method'] == 'HASH':
+        # MySQL HASH: |value MOD partitions| with C (truncating) remainder
+        return np.abs(np.fmod(values, len(scheme['names'])))
+    bounds = np.array([bound for bound in scheme['bounds'] if bound is not None], dtype=np.int64)
+    return np.searchsorted(bounds, values, side='right')
+
+def _row_group_overlaps(pf, row_group_idx, scheme, position):
+    """Whether a row group's proposal_master_skey statistics can reach a RANGE partition"""
+    if scheme['method'] != 'RANGE':
+        return True
+    metadata = pf.metadata.row_group(row_group_idx)
+    for i in range(metadata.num_columns):
+        column = metadata.column(i)
+        if column.path_in_schema != PARTITION_COLUMN:
+            continue
+        stats = column.statistics
+        if stats is None or not stats.has_min_max or stats.null_count:
+            return True
+        low = scheme['bounds'][position - 1] if position > 0 else None
+        high = scheme['bounds'][position]
+        return (high is None or stats.min < high) and (low is None or stats.max >= low)
+    return True
+
+def split_by_partition(table, scheme, positions):
+    """{position: rows of table in that partition} for the wanted positions, one take per partition"""
+    index = partition_index(table.column(PARTITION_COLUMN), scheme)
+    order = np.argsort(index, kind='stable')
+    grouped = index[order]
+    pieces = {}
+    for position in positions:
+        low, high = np.searchsorted(grouped, [position, position + 1])
+        if high > low:
+            pieces[position] = pc.take(table, pa.array(order[low:high]))
+    return pieces
+
+def load_account_partitions(parquet_file, table_name, config, scheme, connection_factory,
+                            use_load_data=True, workers=2, partitions=None, queue_depth=4):
+    """Load each partition into <table>__p_<name> and EXCHANGE it in
+
+    The file is read once: every row group is decoded, converted and split by
+    partition, and each piece goes to the loader that owns the partition's staging
+    table. Loaders own partitions round-robin, each on its own connection.
+    RANGE row groups whose statistics miss every wanted partition are not read.
+
+    ids are the row positions in the file, so they stay unique across partitions and
+    a partition reloaded on its own gets the same ids as a full load.
+    Returns {partition_name: rows}; a failed partition maps to None.
+    """
+    positions = list(range(len(scheme['names']))) if partitions is None else sorted(partitions)
+    loader_count = max(1, min(workers, len(positions)))
+    owned = [positions[i::loader_count] for i in range(loader_count)]
+    owner = {position: i for i, mine in enumerate(owned) for position in mine}
+    queues = [queue.Queue(maxsize=max(1, queue_depth)) for _ in range(loader_count)]
+
+    pf = open_account_parquet(parquet_file)
+    offsets = np.cumsum([0] + [pf.metadata.row_group(i).num_rows for i in range(pf.num_row_groups)])
+    column_list = ", ".join(['id'] + config['columns'])
+    placeholders = ", ".join(["%s"] * (len(config['columns']) + 1))
+    results = {}
+    lock = threading.Lock()
+
+    def staging_name(position):
+        return f"{table_name}__p_{scheme['names'][position]}"
+
+    def prepare_partition(connection, position):
+        staging_table = staging_name(position)
+        cursor = connection.cursor()
+        cursor.execute(f"DROP TABLE IF EXISTS {staging_table}")
+        cursor.execute(f"CREATE TABLE {staging_table} LIKE {table_name}")
+        cursor.execute(f"ALTER TABLE {staging_table} REMOVE PARTITIONING")
+        cursor.close()
+        return defer_secondary_indexes(connection, staging_table)
+
+    def load_piece(connection, cursor, sizer, position, row_group_idx, piece):
+        staging_table = staging_name(position)
+        with stage_timer("load", table_name, row_group_idx) as timer:
+            if use_load_data:
+                load_data_from_stream(cursor, staging_table, f"({column_list})",
+                                      timed_chunks(iter_tsv_chunks(piece), table_name, row_group_idx))
+            else:
+                executemany_adaptive(cursor, f"INSERT INTO {staging_table} ({column_list}) VALUES ({placeholders})",
+                                     arrow_to_rows(piece), sizer)
+            timer.rows = piece.num_rows
+        with stage_timer("commit", table_name, row_group_idx):
+            connection.commit()
+
+    def publish_partition(connection, position, deferred_indexes):
+        name = scheme['names'][position]
+        staging_table = staging_name(position)
+        rebuild_secondary_indexes(connection, staging_table, deferred_indexes)
+        cursor = connection.cursor()
+        # WITH VALIDATION (the default) rejects any row that belongs to another partition
+        cursor.execute(f"ALTER TABLE {table_name} EXCHANGE PARTITION {name} WITH TABLE {staging_table}")
+        cursor.execute(f"DROP TABLE {staging_table}")
+        cursor.close()
+
+    def fail(connection, position, error):
+        if connection is not None:
+            try:
+                connection.rollback()
+            except Exception:
+                pass
+        print(f"  ❌ Partition {scheme['names'][position]} failed: {error}")
+
+    def loader(i):
+        """Load the pieces of the partitions owned by loader i, then publish them"""
+        connection = None
+        rows = {}
+        deferred = {}
+        published = set()
+        try:
+            connection = connection_factory()
+            cursor = connection.cursor()
+            sizer = None if use_load_data else AdaptiveBatchSizer(max_allowed_packet(cursor), initial_rows=INSERT_BATCH_SIZE)
+        except Exception as e:
+            print(f"❌ Partition loader connection failed: {e}")
+            connection = None
+        if connection is not None:
+            for position in owned[i]:
+                try:
+                    deferred[position] = prepare_partition(connection, position)
+                    rows[position] = 0
+                except Exception as e:
+                    fail(connection, position, e)
+
+        # Always drain the queue, so the reader never blocks on a failed loader
+        while True:
+            item = queues[i].get()
+            if item is _DONE:
+                break
+            position, row_group_idx, piece = item
+            if position not in rows:
+                continue
+            try:
+                load_piece(connection, cursor, sizer, position, row_group_idx, piece)
+                rows[position] += piece.num_rows
+            except Exception as e:
+                fail(connection, position, e)
+                del rows[position]
+
+        if connection is None:
+            return
+        try:
+            if sizer is not None:
+                sizer.report(f"{table_name} partitions {[scheme['names'][p] for p in owned[i]]}")
+            for position in owned[i]:
+                if position not in rows or read_failed.is_set():
+                    continue
+                try:
+                    publish_partition(connection, position, deferred[position])
+                except Exception as e:
+                    fail(connection, position, e)
+                    continue
+                print(f"  ✅ Partition {scheme['names'][position]}: {rows[position]:,} records published")
+                with lock:
+                    results[scheme['names'][position]] = rows[position]
+                published.add(position)
+        finally:
+            # A staging table that was not exchanged holds a partial or unpublished load
+            for position in owned[i]:
+                if position in published:
+                    continue
+                try:
+                    cursor = connection.cursor()
+                    cursor.execute(f"DROP TABLE IF EXISTS {staging_name(position)}")
+                    cursor.close()
+                except Exception as e:
+                    print(f"  ⚠️ Could not drop {staging_name(position)}: {e}")
+            connection.close()
+
+    read_failed = threading.Event()
+    start_time = time.time()
+    print(f"🧩 Loading {len(positions)} {scheme['method']} partition(s) of {table_name} "
+          f"with {loader_count} loader(s), reading {parquet_file} once")
+    threads = [threading.Thread(target=loader, args=(i,), daemon=True) for i in range(loader_count)]
+    for thread in threads:
+        thread.start()
+
+    try:
+        for row_group_idx in range(pf.num_row_groups):
+            wanted = [position for position in positions if _row_group_overlaps(pf, row_group_idx, scheme, position)]
+            if not wanted:
+                continue
+            with stage_timer("read", table_name, row_group_idx) as timer:
+                table = read_account_row_group(pf, row_group_idx, config)
+                timer.rows = table.num_rows
+            with stage_timer("convert", table_name, row_group_idx) as timer:
+                converted = convert_arrow_table(table, config)
+                timer.rows = converted.num_rows
+            ids = pa.array(np.arange(converted.num_rows, dtype=np.int64) + offsets[row_group_idx] + 1)
+            converted = converted.add_column(0, 'id', ids)
+            for position, piece in split_by_partition(converted, scheme, wanted).items():
+                queues[owner[position]].put((position, row_group_idx, piece))
+    except Exception as e:
+        # A row group missing from every partition: publish none of them
+        print(f"  ❌ Reading {parquet_file} failed, no partition is published: {e}")
+        read_failed.set()
+    finally:
+        for target in queues:
+            target.put(_DONE)
+        for thread in threads:
+            thread.join()
+
+    loaded = sum(rows for rows in results.values() if rows)
+    elapsed = time.time() - start_time
+    rate = loaded / elapsed if elapsed > 0 else 0
+    print(f"✅ Partitions completed: {loaded:,} records in {elapsed:.1f}s ({rate:,.0f} rec/sec)")
+    for position in positions:
+        results.setdefault(scheme['names'][position], None)
+    return results
@@ -0,0 +1,585 @@
+#!/usr/bin/env python3
+"""
+Shared helpers for the account_voted / account_unvoted parquet importers
+- One table configuration (get_table_config) for the SDS, SDS calibrated,
+  SEL and SEL calibrated importers
+- Projected parquet reads with dictionary-encoded strings and compact integers
+- Columnar Arrow conversion that builds the insert payload straight from a
+  record batch with pyarrow.compute casts and null masks
+- Tab-separated serializer and a FIFO-fed LOAD DATA LOCAL INFILE loader, so
+  row groups never touch a temp CSV on disk
+"""
+
+import errno
+import os
+import tempfile
+import threading
+import time
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+ACCOUNT_TABLES = ("account_voted", "account_unvoted")
+
+# Converter implementations selectable from the importers' --converter flag
+CONVERTERS = ("arrow", "pandas")
+
+# LOAD DATA implementations selectable from the importers' --loader flag
+LOADERS = ("stream", "csv")
+
+# Rows serialized per chunk written into the LOAD DATA stream
+TSV_CHUNK_ROWS = 65536
+
+# LOAD DATA escape sequences (default ESCAPED BY '\\')
+TSV_ESCAPES = (("\\", "\\\\"), ("\t", "\\t"), ("\n", "\\n"), ("\r", "\\r"))
+
+# String columns read dictionary-encoded (hash keys repeat per proposal, few account types)
+DICTIONARY_COLUMNS = ("account_hash_key", "account_type")
+
+# Default memory budget of the streaming (iter_batches) importers
+STREAM_MEMORY_BUDGET = 512 * 1024 * 1024
+
+# In-memory size of a streamed row relative to its uncompressed parquet size
+# (Arrow batch, converted or pandas copy, and the Python tuples of one insert batch)
+STREAM_EXPANSION = 8
+
+# Business key of the clustered account tables (primary key order)
+CLUSTER_KEY = ('proposal_master_skey', 'director_master_skey', 'account_hash_key')
+
+# Narrowest Arrow types the INT columns of the account tables allow
+COMPACT_INT_TYPES = {
+    'proposal_master_skey': pa.int32(),
+    'director_master_skey': pa.int32(),
+    'rank_of_shareholding': pa.int32(),
+    'Target_encoded': pa.int32(),
+}
+
+# Per-database differences between the account table schemas
+TABLE_VARIANTS = {
+    # proxy_sds: unvoted uses model1 columns, TINYINT predictions
+    "sds": {
+        "shares_type": "float",
+        "prediction_type": "int",
+        "score_aliases": [],
+        "prediction_aliases": [],
+        "target_aliases": [],
+        "null_fill": {},
+        "round_integers": False,
+        "drop_empty_keys": False,
+        "omit_missing": False,
+    },
+    # proxy_sds_calibrated: model2 everywhere, BIGINT shares, DECIMAL predictions
+    "sds_calibrated": {
+        "shares_type": "int",
+        "prediction_type": "float",
+        "score_aliases": ["score_model1"],
+        "prediction_aliases": ["prediction_model1"],
+        "target_aliases": [],
+        "null_fill": {},
+        "round_integers": False,
+        "drop_empty_keys": False,
+        "omit_missing": False,
+    },
+    # proxy_sel: integers are rounded and NULLs become 0, empty keys dropped, and columns
+    # missing from the source are not written (left to the column default)
+    "sel": {
+        "shares_type": "int",
+        "prediction_type": "float",
+        "score_aliases": ["score_model1", "score", "score_model"],
+        "prediction_aliases": ["prediction_model1", "prediction", "prediction_model"],
+        "target_aliases": ["true_outcome", "target", "outcome", "Target"],
+        "null_fill": {"int": 0, "account_type": ""},
+        "round_integers": True,
+        "drop_empty_keys": True,
+        "omit_missing": True,
+    },
+    "sel_calibrated": {
+        "shares_type": "int",
+        "prediction_type": "float",
+        "score_aliases": ["score_model1", "score", "score_model", "calibrated_score"],
+        "prediction_aliases": ["prediction_model1", "prediction", "prediction_model", "calibrated_prediction"],
+        "target_aliases": ["true_outcome", "target", "outcome", "Target"],
+        "null_fill": {"int": 0, "account_type": ""},
+        "round_integers": True,
+        "drop_empty_keys": True,
+        "omit_missing": True,
+    },
+}
+
+def get_table_config(table_name, variant="sds"):
+    """Get table-specific configuration for an account table"""
+    if table_name not in ACCOUNT_TABLES:
+        raise ValueError(f"Unknown table name: {table_name}")
+    if variant not in TABLE_VARIANTS:
+        raise ValueError(f"Unknown import variant: {variant}")
+
+    spec = TABLE_VARIANTS[variant]
+    model = "1" if variant == "sds" and table_name == "account_unvoted" else "2"
+    score_field = f"score_model{model}"
+    prediction_field = f"prediction_model{model}"
+
+    columns = [
+        'account_hash_key', 'proposal_master_skey', 'director_master_skey',
+        'account_type', 'shares_summable', 'rank_of_shareholding',
+        score_field, prediction_field, 'Target_encoded'
+    ]
+    column_types = {
+        'account_hash_key': 'string',
+        'proposal_master_skey': 'int',
+        'director_master_skey': 'int',
+        'account_type': 'string',
+        'shares_summable': spec['shares_type'],
+        'rank_of_shareholding': 'int',
+        score_field: 'float',
+        prediction_field: spec['prediction_type'],
+        'Target_encoded': 'int',
+    }
+    column_aliases = {
+        score_field: spec['score_aliases'],
+        prediction_field: spec['prediction_aliases'],
+        'Target_encoded': spec['target_aliases'],
+    }
+
+    # TINYINT predictions (proxy_sds) fit in int8; DECIMAL scores stay float64
+    compact_types = dict(COMPACT_INT_TYPES)
+    if spec['prediction_type'] == 'int':
+        compact_types[prediction_field] = pa.int8()
+
+    column_list = ", ".join(columns)
+    placeholders = ", ".join(["%s"] * len(columns))
+
+    return {
+        "insert_query": f"INSERT INTO {table_name} ({column_list}) VALUES ({placeholders})",
+        "load_data_columns": f"({column_list})",
+        "score_field": score_field,
+        "prediction_field": prediction_field,
+        "columns": columns,
+        "column_types": column_types,
+        "column_aliases": column_aliases,
+        "compact_types": compact_types,
+        "null_fill": spec['null_fill'],
+        "round_integers": spec['round_integers'],
+        "drop_empty_keys": spec['drop_empty_keys'],
+        "omit_missing": spec['omit_missing'],
+    }
+
+def resolve_source_columns(source_names, config):
+    """Map every target column to the source column that feeds it (or None)"""
+    source_names = list(source_names)
+    mapping = {}
+    for column in config['columns']:
+        if column in source_names:
+            mapping[column] = column
+            continue
+        mapping[column] = None
+        for alias in config['column_aliases'].get(column, []):
+            if alias in source_names:
+                mapping[column] = alias
+                break
+    return mapping
+
+def with_fuzzy_aliases(config, source_names):
+    """Config whose unmatched columns also take the first source name containing them (or contained in them)"""
+    source_names = list(source_names)
+    mapping = resolve_source_columns(source_names, config)
+    used = set(source for source in mapping.values() if source)
+    column_aliases = {column: list(aliases) for column, aliases in config['column_aliases'].items()}
+    fuzzy = {}
+    for column, source in mapping.items():
+        if source is not None:
+            continue
+        for name in source_names:
+            if name not in used and (column.lower() in name.lower() or name.lower() in column.lower()):
+                column_aliases.setdefault(column, []).append(name)
+                fuzzy[name] = column
+                used.add(name)
+                break
+    if fuzzy:
+        print(f"🔄 Column mapping: {fuzzy}")
+    return dict(config, column_aliases=column_aliases)
+
+def loaded_columns(source_names, config):
+    """Target columns written for a source: all of them, or only those it feeds with omit_missing"""
+    if not config['omit_missing']:
+        return list(config['columns'])
+    return [column for column, source in resolve_source_columns(source_names, config).items() if source is not None]
+
+def projected_columns(source_names, config):
+    """Source columns needed for the target columns, in file order"""
+    source_names = list(source_names)
+    needed = set(source for source in resolve_source_columns(source_names, config).values() if source)
+    return [name for name in source_names if name in needed]
+
+def open_account_parquet(parquet_file):
+    """Open a parquet file with the account string columns read as dictionaries"""
+    schema = pq.read_schema(parquet_file)
+    read_dictionary = [name for name in DICTIONARY_COLUMNS
+                       if name in schema.names and pa.types.is_string(schema.field(name).type)]
+    return pq.ParquetFile(parquet_file, read_dictionary=read_dictionary)
+
+def _non_empty_keys(arr):
+    """Mask of non-blank keys; dictionary chunks are tested once per distinct value"""
+    chunks = arr.chunks if isinstance(arr, pa.ChunkedArray) else [arr]
+    masks = []
+    for chunk in chunks:
+        if pa.types.is_dictionary(chunk.type):
+            valid = pc.not_equal(pc.utf8_trim_whitespace(_to_string(chunk.dictionary)), "")
+            mask = pc.take(valid, chunk.indices)
+        else:
+            mask = pc.not_equal(pc.utf8_trim_whitespace(_to_string(chunk)), "")
+        masks.append(pc.fill_null(mask, False))
+    return pa.chunked_array(masks, type=pa.bool_())
+
+def count_blank_keys(parquet_file, config):
+    """Rows of a file that compact_account_table drops for a blank key, reading only the key column"""
+    pf = open_account_parquet(parquet_file)
+    key_source = resolve_source_columns(pf.schema_arrow.names, config).get('account_hash_key')
+    if not config['drop_empty_keys'] or key_source is None:
+        return 0
+    blank = 0
+    for i in range(pf.num_row_groups):
+        keys = pf.read_row_group(i, columns=[key_source]).column(0)
+        blank += len(keys) - (pc.sum(_non_empty_keys(keys)).as_py() or 0)
+    return blank
+
+def compact_account_table(table, config):
+    """Drop blank keys and downcast integer sources before any pandas materialization"""
+    mapping = resolve_source_columns(table.column_names, config)
+    key_source = mapping.get('account_hash_key')
+    if config['drop_empty_keys'] and key_source is not None:
+        table = table.filter(_non_empty_keys(table.column(key_source)))
+
+    for column, source in mapping.items():
+        target_type = config['compact_types'].get(column)
+        if source is None or target_type is None:
+            continue
+        arr = table.column(source)
+        if pa.types.is_integer(arr.type) and arr.type.bit_width > target_type.bit_width:
+            index = table.column_names.index(source)
+            table = table.set_column(index, source, pc.cast(arr, target_type))
+    return table
+
+def read_account_row_group(pf, row_group_idx, config):
+    """Read one row group with only the needed columns, compacted"""
+    columns = projected_columns(pf.schema_arrow.names, config)
+    return compact_account_table(pf.read_row_group(row_group_idx, columns=columns), config)
+
+def read_account_table(parquet_file, config):
+    """Read a whole file row group by row group, so only one uncompacted group is in memory"""
+    pf = open_account_parquet(parquet_file)
+    tables = [read_account_row_group(pf, i, config) for i in range(pf.num_row_groups)]
+    if not tables:
+        return pf.schema_arrow.empty_table().select(projected_columns(pf.schema_arrow.names, config))
+    return pa.concat_tables(tables)
+
+def stream_batch_rows(pf, columns, memory_budget=STREAM_MEMORY_BUDGET):
+    """Rows per streamed batch so that one batch and its copies fit in memory_budget bytes"""
+    num_rows = pf.metadata.num_rows
+    if num_rows == 0:
+        return 1000
+    uncompressed = 0
+    for i in range(pf.num_row_groups):
+        row_group = pf.metadata.row_group(i)
+        for j in range(row_group.num_columns):
+            column = row_group.column(j)
+            if column.path_in_schema in columns:
+                uncompressed += column.total_uncompressed_size
+    bytes_per_row = max(1.0, uncompressed / num_rows)
+    return max(1000, int(memory_budget / (bytes_per_row * STREAM_EXPANSION)))
+
+def iter_account_batches(parquet_file, config, memory_budget=STREAM_MEMORY_BUDGET):
+    """Stream a file as compacted Arrow tables sized by a memory budget instead of the file size
+
+    Returns (estimated_rows, iterator); the estimate counts rows before blank keys are dropped.
+    """
+    pf = open_account_parquet(parquet_file)
+    columns = projected_columns(pf.schema_arrow.names, config)
+    batch_rows = stream_batch_rows(pf, columns, memory_budget)
+    print(f"🌊 Streaming {pf.metadata.num_rows:,} rows in batches of {batch_rows:,} "
+          f"(memory budget {memory_budget / 1024**2:,.0f} MB)")
+
+    def batches():
+        for batch in pf.iter_batches(batch_size=batch_rows, columns=columns):
+            yield compact_account_table(pa.Table.from_batches([batch]), config)
+
+    return pf.metadata.num_rows, batches()
+
+def _finite_or_null(arr):
+    """Replace NaN and +/-inf with NULL"""
+    return pc.if_else(pc.is_finite(arr), arr, pa.scalar(None, arr.type))
+
+def _to_float(arr):
+    """Cast a column to float64 with non-finite values masked to NULL"""
+    if pa.types.is_dictionary(arr.type):
+        arr = pc.cast(arr, arr.type.value_type)
+    return _finite_or_null(pc.cast(arr, pa.float64()))
+
+def _to_int(arr, round_values, target_type=pa.int64()):
+    """Cast a column to an integer type, truncating (or rounding) float sources"""
+    if pa.types.is_dictionary(arr.type):
+        arr = pc.cast(arr, arr.type.value_type)
+    if pa.types.is_integer(arr.type) or pa.types.is_boolean(arr.type):
+        return pc.cast(arr, target_type)
+    arr = _to_float(arr)
+    arr = pc.round(arr) if round_values else pc.trunc(arr)
+    return pc.cast(arr, target_type)
+
+def _to_string(arr):
+    """Cast a column to utf8"""
+    if pa.types.is_dictionary(arr.type):
+        arr = pc.cast(arr, arr.type.value_type)
+    if not pa.types.is_string(arr.type):
+        arr = pc.cast(arr, pa.string())
+    return arr
+
+def convert_arrow_table(table, config):
+    """Convert an Arrow table or record batch to the target columns and types (see loaded_columns)"""
+    if isinstance(table, pa.RecordBatch):
+        table = pa.Table.from_batches([table])
+
+    mapping = resolve_source_columns(table.column_names, config)
+    columns = loaded_columns(table.column_names, config)
+    null_fill = config['null_fill']
+    arrays = []
+
+    for column in columns:
+        kind = config['column_types'][column]
+        source = mapping[column]
+
+        if source is None:
+            target_type = {'string': pa.string(), 'int': pa.int64(), 'float': pa.float64()}[kind]
+            arr = pa.nulls(table.num_rows, type=config['compact_types'].get(column, target_type))
+        else:
+            arr = table.column(source)
+            if kind == 'string':
+                arr = _to_string(arr)
+            elif kind == 'int':
+                arr = _to_int(arr, config['round_integers'], config['compact_types'].get(column, pa.int64()))
+            else:
+                arr = _to_float(arr)
+
+        fill = null_fill.get(column, null_fill.get(kind))
+        if fill is not None:
+            arr = pc.fill_null(arr, fill)
+        arrays.append(arr)
+
+    converted = pa.Table.from_arrays(arrays, names=columns)
+
+    if config['drop_empty_keys']:
+        converted = converted.filter(_non_empty_keys(converted.column('account_hash_key')))
+
+    return converted
+
+def _cluster_key_table(table, config):
+    """Key columns exactly as they will be loaded (casts, NULL fill, dropped empty keys)"""
+    null_fill = config['null_fill']
+    arrays = []
+    for column in CLUSTER_KEY:
+        kind = config['column_types'][column]
+        arr = table.column(column)
+        if kind == 'string':
+            arr = _to_string(arr)
+        else:
+            arr = _to_int(arr, config['round_integers'], config['compact_types'].get(column, pa.int64()))
+        fill = null_fill.get(column, null_fill.get(kind))
+        if fill is not None:
+            arr = pc.fill_null(arr, fill)
+        arrays.append(arr)
+    keys = pa.Table.from_arrays(arrays, names=list(CLUSTER_KEY))
+    if config['drop_empty_keys']:
+        keys = keys.filter(_non_empty_keys(keys.column('account_hash_key')))
+    return keys
+
+def _key_steps(keys):
+    """(ascending, duplicate) masks comparing each key row with the one before it"""
+    previous = keys.slice(0, keys.num_rows - 1)
+    current = keys.slice(1)
+    ascending = None
+    equal = None
+    for column in reversed(CLUSTER_KEY):
+        lt = pc.less(previous.column(column), current.column(column))
+        eq = pc.equal(previous.column(column), current.column(column))
+        ascending = lt if ascending is None else pc.or_(lt, pc.and_(eq, ascending))
+        equal = eq if equal is None else pc.and_(eq, equal)
+    return pc.fill_null(ascending, False), pc.fill_null(equal, False)
+
+def check_cluster_order(pf, config):
+    """Scan a file's key columns and report whether rows arrive in CLUSTER_KEY order
+
+    Strings compare bytewise, which matches the table collation for the hex hash keys.
+    """
+    missing = [column for column in CLUSTER_KEY if column not in pf.schema_arrow.names]
+    if missing:
+        return {'rows': 0, 'nulls': 0, 'duplicates': 0, 'out_of_order': 0,
+                'first_break': None, 'missing': missing}
+
+    report = {'rows': 0, 'nulls': 0, 'duplicates': 0, 'out_of_order': 0, 'first_break': None, 'missing': []}
+    last_key = None
+    for row_group_idx in range(pf.num_row_groups):
+        keys = _cluster_key_table(pf.read_row_group(row_group_idx, columns=list(CLUSTER_KEY)), config)
+        report['rows'] += keys.num_rows
+        report['nulls'] += sum(keys.column(column).null_count for column in CLUSTER_KEY)
+        if keys.num_rows == 0:
+            continue
+        # Carry the previous group's last key so group boundaries are checked too
+        steps = keys if last_key is None else pa.concat_tables([last_key, keys])
+        if steps.num_rows > 1:
+            ascending, duplicate = _key_steps(steps)
+            broken = pc.invert(pc.or_(ascending, duplicate))
+            report['duplicates'] += pc.sum(duplicate).as_py() or 0
+            breaks = pc.sum(broken).as_py() or 0
+            if breaks and report['first_break'] is None:
+                report['first_break'] = row_group_idx
+            report['out_of_order'] += breaks
+        last_key = keys.slice(keys.num_rows - 1)
+    return report
+
+def proposal_range_bounds(pf, partitions):
+    """RANGE upper bounds on proposal_master_skey that split a file's rows into even partitions"""
+    values = pa.chunked_array([pf.read_row_group(i, columns=['proposal_master_skey']).column(0)
+                               for i in range(pf.num_row_groups)])
+    values = np.sort(pc.fill_null(values, 0).to_numpy())
+    bounds = []
+    for i in range(1, partitions):
+        bound = int(values[len(values) * i // partitions]) if len(values) else i
+        if not bounds or bound > bounds[-1]:
+            bounds.append(bound)
+    return bounds
+
+def arrow_to_rows(table):
+    """Build the executemany payload column-wise from a converted Arrow table"""
+    if table.num_rows == 0:
+        return []
+    return list(zip(*(column.to_pylist() for column in table.columns)))
+
+def iter_row_batches(table, batch_size):
+    """Yield executemany payloads of at most batch_size rows"""
+    for batch in table.to_batches(max_chunksize=batch_size):
+        yield list(zip(*(column.to_pylist() for column in batch.columns)))
+
+def _escape_text(arr):
+    """Escape backslash, tab and line breaks for LOAD DATA"""
+    if not pc.any(pc.match_substring_regex(arr, r"[\\\t\n\r]")).as_py():
+        return arr
+    for old, new in TSV_ESCAPES:
+        arr = pc.replace_substring(arr, old, new)
+    return arr
+
+def _tsv_field(arr):
+    """Render one column as LOAD DATA text with \\N for NULL"""
+    if pa.types.is_dictionary(arr.type):
+        arr = pc.cast(arr, arr.type.value_type)
+    if pa.types.is_string(arr.type) or pa.types.is_large_string(arr.type):
+        arr = _escape_text(arr)
+    elif pa.types.is_boolean(arr.type):
+        # MySQL reads 'true'/'false' as 0 - booleans go in as 1/0
+        arr = pc.cast(pc.cast(arr, pa.int8()), pa.string())
+    else:
+        arr = pc.cast(arr, pa.string())
+    return pc.fill_null(arr, "\\N")
+
+def _string_array_bytes(arr):
+    """Return the contiguous value bytes of a string array without copying"""
+    offset_type = np.int64 if pa.types.is_large_string(arr.type) else np.int32
+    width = np.dtype(offset_type).itemsize
+    offsets = np.frombuffer(arr.buffers()[1], dtype=offset_type,
+                            count=len(arr) + 1, offset=arr.offset * width)
+    return memoryview(arr.buffers()[2])[offsets[0]:offsets[-1]]
+
+def arrow_to_tsv(batch):
+    """Serialize a converted record batch as tab-separated LOAD DATA lines"""
+    if batch.num_rows == 0:
+        return b""
+    fields = [_tsv_field(column) for column in batch.columns]
+    lines = pc.binary_join_element_wise(*fields, "\t")
+    lines = pc.binary_join_element_wise(lines, "", "\n")
+    return _string_array_bytes(lines)
+
+def iter_tsv_chunks(table, chunk_rows=TSV_CHUNK_ROWS):
+    """Yield LOAD DATA payload chunks for a converted Arrow table"""
+    for batch in table.to_batches(max_chunksize=chunk_rows):
+        yield arrow_to_tsv(batch)
+
+def build_load_data_query(path, table_name, load_data_columns):
+    """LOAD DATA statement for the tab-separated stream format"""
+    return f"""
+    LOAD DATA LOCAL INFILE '{path}'
+    INTO TABLE {table_name}
+    CHARACTER SET utf8mb4
+    FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\'
+    LINES TERMINATED BY '\\n'
+    {load_data_columns}
+    """
+
+def _write_fifo(path, chunks, stop, errors):
+    """Feed payload chunks into the FIFO once the client opens it for reading"""
+    try:
+        fd = None
+        while fd is None:
+            if stop.is_set():
+                return
+            try:
+                fd = os.open(path, os.O_WRONLY | os.O_NONBLOCK)
+            except OSError as e:
+                if e.errno != errno.ENXIO:
+                    raise
+                time.sleep(0.005)
+        os.set_blocking(fd, True)
+        with os.fdopen(fd, 'wb') as fifo:
+            for chunk in chunks:
+                fifo.write(chunk)
+    except BrokenPipeError as e:
+        if not stop.is_set():
+            errors.append(e)
+    except Exception as e:
+        errors.append(e)
+
+def _release_fifo(path, writer):
+    """Unblock and join a writer whose reader went away early"""
+    if writer.is_alive():
+        try:
+            fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+            os.close(fd)
+        except OSError:
+            pass
+    writer.join()
+
+def load_data_from_stream(cursor, table_name, load_data_columns, chunks):
+    """LOAD DATA LOCAL INFILE fed through a FIFO instead of a temp file"""
+    if not hasattr(os, "mkfifo"):
+        return _load_data_from_temp_file(cursor, table_name, load_data_columns, chunks)
+
+    fifo_dir = tempfile.mkdtemp(prefix="load_data_")
+    fifo_path = os.path.join(fifo_dir, "stream.tsv")
+    os.mkfifo(fifo_path, 0o600)
+
+    stop = threading.Event()
+    errors = []
+    writer = threading.Thread(target=_write_fifo, args=(fifo_path, chunks, stop, errors), daemon=True)
+    writer.start()
+    try:
+        cursor.execute(build_load_data_query(fifo_path, table_name, load_data_columns))
+        writer.join()
+    finally:
+        stop.set()
+        _release_fifo(fifo_path, writer)
+        os.unlink(fifo_path)
+        os.rmdir(fifo_dir)
+
+    # A serializer failure closes the stream early - never commit a partial load
+    if errors:
+        raise errors[0]
+    return cursor.rowcount
+
+def _load_data_from_temp_file(cursor, table_name, load_data_columns, chunks):
+    """Fallback for platforms without FIFOs: same TSV format via a temp file"""
+    with tempfile.NamedTemporaryFile(mode='wb', delete=False, suffix='.tsv') as temp_file:
+        temp_file_path = temp_file.name
+        for chunk in chunks:
+            temp_file.write(chunk)
+    try:
+        cursor.execute(build_load_data_query(temp_file_path, table_name, load_data_columns))
+        return cursor.rowcount
+    finally:
+        os.unlink(temp_file_path)
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Columnar cache of decoded CSV and Excel sources
+- Each source is parsed once into an Arrow IPC (Feather v2) file and read back memory-mapped
+- Entries are keyed on the source path, size and mtime plus the parse options, so an edited
+  or replaced file is parsed again
+- Least recently used entries are evicted once the cache exceeds its disk budget
+  (IMPORT_SOURCE_CACHE_MB, 0 disables the cache)
+- Partial entries left by a killed importer are removed by the next eviction or --clear
+
+CsvSource and ExcelSource read through the cache, so every importer uses it without changes.
+"""
+
+import argparse
+import hashlib
+import os
+import time
+import pyarrow as pa
+
+CACHE_DIR = os.environ.get("IMPORT_SOURCE_CACHE_DIR") or os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "proxy_import_sources")
+
+CACHE_BUDGET_MB = int(os.environ.get("IMPORT_SOURCE_CACHE_MB", "8192"))
+
+CACHE_SUFFIX = ".arrow"
+
+TEMP_SUFFIX = ".tmp"
+
+# A partial entry untouched this long is abandoned even if its pid was reused
+STALE_TEMP_SECONDS = 3600
+
+def cache_enabled():
+    return CACHE_BUDGET_MB > 0
+
+def cache_key(path, kind, options):
+    """Entry name of a source file parsed with the given options"""
+    stat = os.stat(path)
+    key = f"{kind}|{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}|{options!r}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+def cache_entries():
+    """[(path, size, last used)] of the cached files, least recently used first"""
+    if not os.path.isdir(CACHE_DIR):
+        return []
+    entries = []
+    for name in os.listdir(CACHE_DIR):
+        if not name.endswith(CACHE_SUFFIX):
+            continue
+        path = os.path.join(CACHE_DIR, name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue  # evicted by another importer
+        entries.append((path, stat.st_size, stat.st_mtime))
+    return sorted(entries, key=lambda entry: entry[2])
+
+def _writer_alive(name):
+    """Whether the process named in a partial entry (<key>.arrow.<pid>.tmp) still runs"""
+    try:
+        pid = int(name[:-len(TEMP_SUFFIX)].rsplit('.', 1)[1])
+    except (IndexError, ValueError):
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # runs as another user
+    return True
+
+def stale_temp_files():
+    """[(path, size)] of partial entries whose writer died or that are older than STALE_TEMP_SECONDS"""
+    if not os.path.isdir(CACHE_DIR):
+        return []
+    stale = []
+    now = time.time()
+    for name in os.listdir(CACHE_DIR):
+        if not name.endswith(TEMP_SUFFIX):
+            continue
+        path = os.path.join(CACHE_DIR, name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue  # published or discarded meanwhile
+        if now - stat.st_mtime > STALE_TEMP_SECONDS or not _writer_alive(name):
+            stale.append((path, stat.st_size))
+    return stale
+
+def evict(budget_bytes, keep=None):
+    """Remove stale partial entries, then least recently used entries until the cache fits its budget"""
+    for path, _ in stale_temp_files():
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    entries = cache_entries()
+    total = sum(size for _, size, _ in entries)
+    for path, size, _ in entries:
+        if total <= budget_bytes:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+def _open_entry(cache_path):
+    """Memory-mapped reader of a cache entry, None when it is missing or unreadable"""
+    try:
+        reader = pa.ipc.open_file(pa.memory_map(cache_path, 'r'))
+    except FileNotFoundError:
+        return None
+    except (OSError, pa.ArrowInvalid) as e:
+        print(f"⚠️ Dropping unreadable source cache entry {cache_path}: {e}")
+        try:
+            os.remove(cache_path)
+        except OSError:
+            pass
+        return None
+    try:
+        os.utime(cache_path)  # last used, for LRU eviction
+    except OSError:
+        pass
+    return reader
+
+def _read_entry(reader, batch_rows):
+    for i in range(reader.num_record_batches):
+        table = pa.Table.from_batches([reader.get_batch(i)])
+        for start in range(0, table.num_rows, batch_rows):
+            yield table.slice(start, batch_rows)
+
+def _discard(writer, temp_path):
+    try:
+        writer.close()
+    except (OSError, pa.ArrowException):
+        pass
+    try:
+        os.remove(temp_path)
+    except OSError:
+        pass
+
+def _write_entry(cache_path, source_path, tables):
+    """Pass tables through while writing them to a temporary file, published when complete
+
+    A failed cache write (disk full, ...) only drops the entry; the import goes on.
+    """
+    temp_path = f"{cache_path}.{os.getpid()}.tmp"
+    writer = None
+    caching = True
+    completed = False
+    try:
+        for table in tables:
+            if caching:
+                try:
+                    if writer is None:
+                        metadata = {b'source_path': os.path.abspath(source_path).encode("utf-8")}
+                        writer = pa.ipc.new_file(temp_path, table.schema.with_metadata(metadata))
+                    writer.write_table(table.replace_schema_metadata(metadata))
+                except (OSError, pa.ArrowException) as e:
+                    print(f"⚠️ Could not cache {source_path}: {e}")
+                    caching = False
+            yield table
+        completed = True
+    finally:
+        if writer is not None:
+            if not (completed and caching):
+                _discard(writer, temp_path)
+            else:
+                try:
+                    writer.close()
+                    if os.path.getsize(temp_path) > CACHE_BUDGET_MB * 1024 * 1024:
+                        os.remove(temp_path)
+                    else:
+                        os.replace(temp_path, cache_path)
+                        evict(CACHE_BUDGET_MB * 1024 * 1024, keep=cache_path)
+                except (OSError, pa.ArrowException) as e:
+                    print(f"⚠️ Could not cache {source_path}: {e}")
+                    _discard(writer, temp_path)
+
+def cached_batches(path, kind, options, parse, batch_rows):
+    """Batches of a source from the cache; on a miss parse() runs and its batches are cached"""
+    if not cache_enabled():
+        yield from parse()
+        return
+    cache_path = os.path.join(CACHE_DIR, cache_key(path, kind, options) + CACHE_SUFFIX)
+    reader = _open_entry(cache_path)
+    if reader is not None:
+        yield from _read_entry(reader, batch_rows)
+        return
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+    except OSError as e:
+        print(f"⚠️ Source cache unavailable ({e}), parsing {path}")
+        yield from parse()
+        return
+    yield from _write_entry(cache_path, path, parse())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='List or clear the decoded source cache')
+    parser.add_argument('--clear', action='store_true',
+                        help='Remove every cached source and abandoned partial entry')
+    args = parser.parse_args()
+
+    if args.clear:
+        evict(0)
+        print(f"🗑️ Cleared {CACHE_DIR}")
+    else:
+        entries = cache_entries()
+        for path, size, last_used in reversed(entries):
+            source = pa.ipc.open_file(pa.memory_map(path, 'r')).schema.metadata.get(b'source_path', b'?')
+            print(f"  {source.decode('utf-8')}: {size / 1024**2:,.1f} MB, "
+                  f"last used {time.strftime('%Y-%m-%d %H:%M', time.localtime(last_used))}")
+        total = sum(size for _, size, _ in entries)
+        print(f"📊 {len(entries)} cached source(s), {total / 1024**2:,.1f} MB of {CACHE_BUDGET_MB:,} MB in {CACHE_DIR}")
+        stale = stale_temp_files()
+        if stale:
+            print(f"⚠️ {len(stale)} abandoned partial entr{'y' if len(stale) == 1 else 'ies'} "
+                  f"({sum(size for _, size in stale) / 1024**2:,.1f} MB), removed by the next import or --clear")
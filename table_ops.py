@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""
+Table maintenance helpers for the bulk importers
+- Deferred secondary indexes: capture definitions, drop, load, rebuild in one ALTER TABLE
+- Rebuilds of several tables run in parallel, one connection per table
+- Clustered account tables: primary key on the business key, loaded in key order
+- Shadow loads: fill <table>__staging, then swap it in with one atomic RENAME TABLE
+- Partitioned account tables: HASH or RANGE on proposal_master_skey
+- Same-server copies: INSERT IGNORE ... SELECT across schemas in primary key ranges
+"""
+
+import threading
+import time
+from ingest_engine import PROGRESS_INTERVAL, open_worker_connection
+from import_metrics import stage_timer
+from parquet_ingest import CLUSTER_KEY, check_cluster_order
+
+# Column the account tables are partitioned on
+PARTITION_COLUMN = "proposal_master_skey"
+
+# Suffixes of the shadow-load tables next to a live table
+STAGING_SUFFIX = "__staging"
+PREVIOUS_SUFFIX = "__previous"
+
+# Primary key values covered by one INSERT ... SELECT of copy_table_by_id_range
+COPY_CHUNK_ROWS = 50000
+
+def get_secondary_indexes(connection, table_name):
+    """Secondary index definitions of a table, ordered by index name (they are rebuilt in one ALTER, so order is irrelevant)"""
+    cursor = connection.cursor()
+    cursor.execute(
+        "SELECT INDEX_NAME, NON_UNIQUE, INDEX_TYPE, COLUMN_NAME, SUB_PART, COLLATION "
+        "FROM information_schema.STATISTICS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME <> 'PRIMARY' "
+        "ORDER BY INDEX_NAME, SEQ_IN_INDEX",
+        (table_name,)
+    )
+    indexes = {}
+    for name, non_unique, index_type, column, sub_part, collation in cursor.fetchall():
+        index = indexes.setdefault(name, {
+            'name': name,
+            'unique': not int(non_unique),
+            'type': index_type,
+            'columns': []
+        })
+        # Functional index parts have no column name; such indexes are left in place
+        index['columns'].append((column, sub_part, collation == 'D'))
+    cursor.close()
+    return [index for index in indexes.values() if all(column for column, _, _ in index['columns'])]
+
+def index_definition(index):
+    """ADD INDEX clause recreating a captured index"""
+    parts = []
+    for column, sub_part, descending in index['columns']:
+        part = f"`{column}`"
+        if sub_part:
+            part += f"({sub_part})"
+        if descending:
+            part += " DESC"
+        parts.append(part)
+    if index['type'] in ('FULLTEXT', 'SPATIAL'):
+        kind = f"{index['type']} INDEX"
+    elif index['unique']:
+        kind = "UNIQUE INDEX"
+    else:
+        kind = "INDEX"
+    return f"ADD {kind} `{index['name']}` ({', '.join(parts)})"
+
+def defer_secondary_indexes(connection, table_name, defer_unique=False):
+    """Drop a table's secondary indexes before a bulk load; returns what to rebuild
+
+    UNIQUE indexes are kept unless defer_unique is set, since importers that skip
+    duplicate keys rely on them during the load.
+    """
+    indexes = [index for index in get_secondary_indexes(connection, table_name)
+               if defer_unique or not index['unique']]
+    if not indexes:
+        return []
+    cursor = connection.cursor()
+    cursor.execute(f"ALTER TABLE {table_name} " +
+                   ", ".join(f"DROP INDEX `{index['name']}`" for index in indexes))
+    cursor.close()
+    print(f"⏸️ Deferred {len(indexes)} index(es) on {table_name}: "
+          f"{', '.join(index['name'] for index in indexes)}")
+    return indexes
+
+def defer_table_indexes(database, table_name, defer_unique=False):
+    """defer_secondary_indexes on its own connection; returns a rebuild job for rebuild_indexes_parallel"""
+    connection = open_worker_connection(database)
+    try:
+        return (database, table_name, defer_secondary_indexes(connection, table_name, defer_unique))
+    finally:
+        connection.close()
+
+def rebuild_secondary_indexes(connection, table_name, indexes):
+    """Recreate deferred indexes in a single ALTER TABLE pass; returns the seconds spent"""
+    if not indexes:
+        return 0.0
+    print(f"🔨 Building {len(indexes)} index(es) on {table_name}...")
+    start_time = time.time()
+    cursor = connection.cursor()
+    cursor.execute(f"ALTER TABLE {table_name} " + ", ".join(index_definition(index) for index in indexes))
+    cursor.close()
+    elapsed = time.time() - start_time
+    print(f"✅ Indexes on {table_name} built in {elapsed:.1f}s")
+    return elapsed
+
+def rebuild_indexes_parallel(jobs, workers=3):
+    """Rebuild deferred indexes for [(database, table_name, indexes)] concurrently
+
+    Returns {(database, table_name): seconds}; a failed rebuild maps to None.
+    """
+    jobs = [job for job in jobs if job[2]]
+    results = {}
+    if not jobs:
+        return results
+
+    lock = threading.Lock()
+    pending = list(jobs)
+
+    def worker():
+        while True:
+            with lock:
+                if not pending:
+                    return
+                database, table_name, indexes = pending.pop(0)
+            connection = None
+            try:
+                connection = open_worker_connection(database)
+                seconds = rebuild_secondary_indexes(connection, f"{database}.{table_name}", indexes)
+            except Exception as e:
+                print(f"❌ Index rebuild failed on {database}.{table_name}: {e}")
+                print(f"   Missing: {'; '.join(index_definition(index) for index in indexes)}")
+                seconds = None
+            finally:
+                if connection is not None:
+                    connection.close()
+            with lock:
+                results[(database, table_name)] = seconds
+
+    start_time = time.time()
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(max(1, min(workers, len(jobs))))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(f"🏁 Index build for {len(jobs)} table(s) finished in {time.time() - start_time:.1f}s")
+    return results
+
+def finish_deferred_indexes(index_jobs, load_seconds, workers=3):
+    """Rebuild deferred indexes and report load vs index build time; returns the failed tables"""
+    if not index_jobs:
+        return []
+    index_results = rebuild_indexes_parallel(index_jobs, workers)
+    index_seconds = sum(seconds for seconds in index_results.values() if seconds)
+    print(f"⏱️ Load time: {load_seconds:.1f}s, index build time: {index_seconds:.1f}s")
+    failed = [f"{database}.{table_name}" for (database, table_name), seconds in index_results.items()
+              if seconds is None]
+    if failed:
+        print(f"❌ Index rebuild failed for: {', '.join(failed)}")
+    return failed
+
+def get_primary_key(connection, table_name):
+    """Primary key columns of a table, in key order"""
+    cursor = connection.cursor()
+    cursor.execute(
+        "SELECT COLUMN_NAME FROM information_schema.STATISTICS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = 'PRIMARY' "
+        "ORDER BY SEQ_IN_INDEX",
+        (table_name,)
+    )
+    columns = [row[0] for row in cursor.fetchall()]
+    cursor.close()
+    return columns
+
+def cluster_table(connection, table_name, key_columns, surrogate='id'):
+    """Make key_columns the clustered primary key; the surrogate id keeps a UNIQUE key
+
+    Key columns become NOT NULL, and secondary indexes that are a leftmost prefix of
+    the new key are dropped since the primary key now serves those lookups.
+    """
+    key_columns = list(key_columns)
+    if get_primary_key(connection, table_name) == key_columns:
+        return False
+
+    cursor = connection.cursor()
+    cursor.execute(
+        "SELECT COLUMN_NAME, COLUMN_TYPE, IS_NULLABLE, COLLATION_NAME FROM information_schema.COLUMNS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+        (table_name,)
+    )
+    columns = {name: (column_type, nullable, collation) for name, column_type, nullable, collation in cursor.fetchall()}
+
+    clauses = []
+    for column in key_columns:
+        column_type, nullable, collation = columns[column]
+        if nullable == 'YES':
+            collate = f" COLLATE {collation}" if collation else ""
+            clauses.append(f"MODIFY `{column}` {column_type}{collate} NOT NULL")
+    for index in get_secondary_indexes(connection, table_name):
+        names = [column for column, _, _ in index['columns']]
+        if not index['unique'] and names == key_columns[:len(names)]:
+            clauses.append(f"DROP INDEX `{index['name']}`")
+    clauses.append("DROP PRIMARY KEY")
+    clauses.append(f"ADD PRIMARY KEY ({', '.join(f'`{column}`' for column in key_columns)})")
+    # Partitioned tables cannot carry a unique key without the partition column
+    if get_partition_scheme(connection, table_name):
+        clauses.append(f"ADD KEY `idx_{surrogate}` (`{surrogate}`)")
+    else:
+        clauses.append(f"ADD UNIQUE KEY `uniq_{surrogate}` (`{surrogate}`)")
+
+    print(f"🔧 Clustering {table_name} on ({', '.join(key_columns)})...")
+    start_time = time.time()
+    cursor.execute(f"ALTER TABLE {table_name} " + ", ".join(clauses))
+    cursor.close()
+    print(f"✅ {table_name} clustered in {time.time() - start_time:.1f}s")
+    return True
+
+def prepare_clustered_import(connection, pf, table_name, config):
+    """Check the parquet key order and cluster the table; False when the file cannot be loaded in order"""
+    print(f"🔍 Checking {', '.join(CLUSTER_KEY)} order of the source file...")
+    start_time = time.time()
+    report = check_cluster_order(pf, config)
+    if report['missing']:
+        print(f"❌ Source file has no {', '.join(report['missing'])} column(s) to cluster on")
+        return False
+    print(f"📊 Scanned {report['rows']:,} keys in {time.time() - start_time:.1f}s: "
+          f"{report['out_of_order']:,} out of order, {report['duplicates']:,} duplicate(s), {report['nulls']:,} NULL(s)")
+    if report['nulls']:
+        print("❌ NULL key values cannot be part of the clustered primary key")
+        return False
+    if report['out_of_order']:
+        print(f"❌ Source is not sorted by the clustered key (first break in row group {report['first_break'] + 1})")
+        print("   Sort the file by proposal_master_skey, director_master_skey, account_hash_key or import without --clustered")
+        return False
+    if report['duplicates']:
+        print(f"⚠️ {report['duplicates']:,} duplicate key row(s): LOAD DATA skips them, batch inserts will fail")
+    cluster_table(connection, table_name, CLUSTER_KEY)
+    return True
+
+def table_exists(connection, table_name):
+    """Whether a table exists in the current database"""
+    cursor = connection.cursor()
+    cursor.execute(
+        "SELECT 1 FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+        (table_name,)
+    )
+    exists = len(cursor.fetchall()) > 0
+    cursor.close()
+    return exists
+
+def decimal_scales(connection, table_name):
+    """{column: scale} of the DECIMAL columns of a table in the current database"""
+    cursor = connection.cursor()
+    cursor.execute(
+        "SELECT COLUMN_NAME, NUMERIC_SCALE FROM information_schema.COLUMNS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND DATA_TYPE = 'decimal'",
+        (table_name,)
+    )
+    scales = {column: int(scale) for column, scale in cursor.fetchall()}
+    cursor.close()
+    return scales
+
+def create_staging_table(connection, table_name):
+    """Empty <table>__staging shaped like the live table, secondary indexes deferred
+
+    Returns (staging_table, deferred_indexes) for swap_staging_table.
+    """
+    staging_table = table_name + STAGING_SUFFIX
+    cursor = connection.cursor()
+    cursor.execute(f"DROP TABLE IF EXISTS {staging_table}")
+    cursor.execute(f"CREATE TABLE {staging_table} LIKE {table_name}")
+    cursor.close()
+    print(f"🏗️ Loading into {staging_table}; {table_name} stays online until the swap")
+    return staging_table, defer_secondary_indexes(connection, staging_table)
+
+def swap_staging_table(connection, table_name, deferred_indexes, expected_rows):
+    """Build indexes on the staging table, validate its row count and swap it in atomically
+
+    The replaced table is kept as <table>__previous for restore_previous_table.
+    """
+    staging_table = table_name + STAGING_SUFFIX
+    previous_table = table_name + PREVIOUS_SUFFIX
+    rebuild_secondary_indexes(connection, staging_table, deferred_indexes)
+
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"SELECT COUNT(*) FROM {staging_table}")
+        staged_rows = cursor.fetchone()[0]
+        if staged_rows != expected_rows or staged_rows == 0:
+            print(f"❌ {staging_table} has {staged_rows:,} rows, expected {expected_rows:,} - "
+                  f"{table_name} left unchanged")
+            return False
+
+        cursor.execute(f"DROP TABLE IF EXISTS {previous_table}")
+        # Both renames happen in one statement: readers see the old or the new table, never neither
+        cursor.execute(f"RENAME TABLE {table_name} TO {previous_table}, {staging_table} TO {table_name}")
+        print(f"🔁 Swapped {staging_table} → {table_name} ({staged_rows:,} rows); "
+              f"previous data kept in {previous_table}")
+        return True
+    finally:
+        cursor.close()
+
+def restore_previous_table(connection, table_name):
+    """Swap <table>__previous back in; the rolled-back data becomes the staging table"""
+    staging_table = table_name + STAGING_SUFFIX
+    previous_table = table_name + PREVIOUS_SUFFIX
+    if not table_exists(connection, previous_table):
+        print(f"❌ No {previous_table} to restore")
+        return False
+    cursor = connection.cursor()
+    cursor.execute(f"DROP TABLE IF EXISTS {staging_table}")
+    cursor.execute(f"RENAME TABLE {table_name} TO {staging_table}, {previous_table} TO {table_name}")
+    cursor.close()
+    print(f"⏪ Restored {table_name} from {previous_table}")
+    return True
+
+def copy_table_by_id_range(connection, source_database, table_name, columns, chunk_rows=COPY_CHUNK_ROWS, key='id'):
+    """Copy source_database.table_name into the connection's table of the same name on the server
+
+    One INSERT IGNORE ... SELECT per primary key range, committed separately, so rows never
+    pass through the client and duplicates of unique keys are skipped. Returns the rows inserted.
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"SELECT MIN(`{key}`), MAX(`{key}`) FROM `{source_database}`.`{table_name}`")
+        low, high = cursor.fetchone()
+        if low is None:
+            return 0
+        column_list = ", ".join(f"`{column}`" for column in columns)
+        query = (f"INSERT IGNORE INTO `{table_name}` ({column_list}) "
+                 f"SELECT {column_list} FROM `{source_database}`.`{table_name}` "
+                 f"WHERE `{key}` >= %s AND `{key}` < %s")
+        print(f"📋 Copying {source_database}.{table_name} on the server, {key} {low:,}-{high:,} "
+              f"in ranges of {chunk_rows:,}")
+        copied = 0
+        start_time = time.time()
+        last_report = start_time
+        for start in range(low, high + 1, chunk_rows):
+            with stage_timer("load", table_name) as timer:
+                cursor.execute(query, (start, start + chunk_rows))
+                timer.rows = max(cursor.rowcount, 0)
+            with stage_timer("commit", table_name):
+                connection.commit()
+            copied += timer.rows
+            if time.time() - last_report >= PROGRESS_INTERVAL:
+                last_report = time.time()
+                print(f"  📦 {key} < {start + chunk_rows:,}: {copied:,} rows copied "
+                      f"({copied / (last_report - start_time):,.0f} rows/sec)")
+        elapsed = time.time() - start_time
+        rate = copied / elapsed if elapsed > 0 else 0
+        print(f"✅ Copied {copied:,} rows in {elapsed:.1f}s ({rate:,.0f} rows/sec)")
+        return copied
+    finally:
+        cursor.close()
+
+def get_partition_scheme(connection, table_name):
+    """{'method', 'expression', 'names', 'bounds'} of a partitioned table, or None"""
+    cursor = connection.cursor()
+    cursor.execute(
+        "SELECT PARTITION_NAME, PARTITION_METHOD, PARTITION_EXPRESSION, PARTITION_DESCRIPTION "
+        "FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL "
+        "ORDER BY PARTITION_ORDINAL_POSITION",
+        (table_name,)
+    )
+    rows = cursor.fetchall()
+    cursor.close()
+    if not rows:
+        return None
+    return {
+        'method': rows[0][1],
+        'expression': rows[0][2].replace('`', ''),
+        'names': [row[0] for row in rows],
+        # RANGE upper bounds (None = MAXVALUE); unused for HASH
+        'bounds': [None if row[3] in (None, 'MAXVALUE') else int(row[3]) for row in rows],
+    }
+
+def partition_table(connection, table_name, method, partitions, bounds=None):
+    """Partition a table by HASH (partitions count) or RANGE (upper bounds) on proposal_master_skey
+
+    MySQL requires the partition column in every unique key, so the id primary key
+    becomes (id, proposal_master_skey) and other unique keys without it become plain keys.
+    """
+    method = method.upper()
+    if method not in ('HASH', 'RANGE'):
+        raise ValueError(f"Unsupported partition method: {method}")
+
+    cursor = connection.cursor()
+    clauses = []
+    cursor.execute(
+        "SELECT IS_NULLABLE, COLUMN_TYPE FROM information_schema.COLUMNS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s",
+        (table_name, PARTITION_COLUMN)
+    )
+    nullable, column_type = cursor.fetchall()[0]
+    if nullable == 'YES':
+        clauses.append(f"MODIFY `{PARTITION_COLUMN}` {column_type} NOT NULL")
+    primary_key = get_primary_key(connection, table_name)
+    if PARTITION_COLUMN not in primary_key:
+        key = ", ".join(f"`{column}`" for column in primary_key + [PARTITION_COLUMN])
+        clauses.append(f"DROP PRIMARY KEY, ADD PRIMARY KEY ({key})")
+    for index in get_secondary_indexes(connection, table_name):
+        if index['unique'] and PARTITION_COLUMN not in [column for column, _, _ in index['columns']]:
+            clauses.append(f"DROP INDEX `{index['name']}`")
+            clauses.append(index_definition(dict(index, unique=False)))
+
+    if method == 'HASH':
+        layout = f"PARTITION BY HASH ({PARTITION_COLUMN}) PARTITIONS {int(partitions)}"
+    else:
+        ranges = [f"PARTITION p{i} VALUES LESS THAN ({int(bound)})" for i, bound in enumerate(bounds)]
+        ranges.append(f"PARTITION p{len(bounds)} VALUES LESS THAN MAXVALUE")
+        layout = f"PARTITION BY RANGE ({PARTITION_COLUMN}) ({', '.join(ranges)})"
+
+    print(f"🧩 Partitioning {table_name}: {layout}")
+    start_time = time.time()
+    if clauses:
+        cursor.execute(f"ALTER TABLE {table_name} " + ", ".join(clauses))
+    cursor.execute(f"ALTER TABLE {table_name} {layout}")
+    cursor.close()
+    print(f"✅ {table_name} partitioned in {time.time() - start_time:.1f}s")
+    return get_partition_scheme(connection, table_name)
@@ -0,0 +1,53 @@
+import os
+import sys
+from datetime import date
+
+import pyarrow as pa
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ingest_engine import (arrow_bool, arrow_date, arrow_float, arrow_int, arrow_tinyint, parse_date,
+                           safe_bool, safe_float, safe_int, safe_tinyint)
+
+NUMBERS = ['12', ' 7 ', '-1', '-3', '123.0', '4.9', '-4.9', '1e3', '2.5E-1', '.5', '+8', '',
+           '  ', 'abc', 'nan', '1,000', '300', '-20', '0']
+
+
+def converted(converter, values):
+    result, invalid = converter(pa.array(values, pa.string()))
+    return result.to_pylist(), invalid
+
+
+@pytest.mark.parametrize("converter, helper", [
+    (arrow_int, safe_int),
+    (arrow_float, safe_float),
+    (arrow_tinyint, safe_tinyint),
+])
+def test_numeric_converters_match_safe_helpers(converter, helper):
+    result, invalid = converted(converter, NUMBERS)
+    expected = [helper(value) for value in NUMBERS]
+    assert result == expected
+    # Only values the helper could not read (and not blank or missing markers) are errors
+    for value, bad in zip(NUMBERS, invalid.to_pylist()):
+        assert bad == (helper(value) is None and value.strip() not in ('', '-1'))
+
+
+def test_arrow_int_missing_markers():
+    result, _ = converted(lambda array: arrow_int(array, missing=('',)), ['-1', '', '5'])
+    assert result == [-1, None, 5]
+
+
+def test_arrow_bool_matches_safe_bool():
+    values = ['TRUE', 'false', ' 1 ', '0', 'Yes', 'n', '', 'maybe']
+    result, invalid = converted(arrow_bool, values)
+    assert result == [safe_bool(value) for value in values]
+    assert invalid.to_pylist() == [False] * 7 + [True]
+
+
+def test_arrow_date_matches_parse_date():
+    values = ['2024-12-31', '12/31/2024', '2024/01/02', '31-12-2024', '', 'null', 'someday']
+    result, invalid = converted(arrow_date, values)
+    assert result == [parse_date(value) for value in values]
+    assert result[0] == date(2024, 12, 31)
+    assert invalid.to_pylist() == [False] * 6 + [True]
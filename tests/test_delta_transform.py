@@ -0,0 +1,53 @@
+import os
+import sys
+
+import pyarrow as pa
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ingest_engine import KeySnapshot, delta_transform
+
+
+class TableSource:
+    """Source yielding fixed tables, standing in for a QuerySource of the existing rows"""
+
+    def __init__(self, *tables):
+        self.tables = tables
+
+    def batches(self):
+        yield from self.tables
+
+
+def stored_snapshot():
+    existing = pa.table({'account': ['a', 'b', 'c'], 'proposal': [1, 1, 2], 'votes': [10, 20, 30]})
+    return KeySnapshot(['account', 'proposal'], ['votes']).load(TableSource(existing.slice(0, 2), existing.slice(2)))
+
+
+def test_classify_splits_new_unchanged_and_conflicting():
+    batch = pa.table({'account': ['a', 'b', 'c', 'd', None],
+                      'proposal': [1, 1, 1, 2, 1],
+                      'votes': [10, 21, 30, 40, 50]})
+    new, unchanged, conflicting = stored_snapshot().classify(batch)
+    assert new.tolist() == [False, False, True, True, True]
+    assert unchanged.tolist() == [True, False, False, False, False]
+    assert conflicting.tolist() == [False, True, False, False, False]
+
+
+def test_keys_are_exact():
+    # Keys are compared as stored, without trimming or case folding
+    snapshot = KeySnapshot(['account']).load(TableSource(pa.table({'account': ['a']})))
+    new, _, _ = snapshot.classify(pa.table({'account': ['a', 'a ', 'A']}))
+    assert new.tolist() == [False, True, True]
+
+
+def test_delta_transform_passes_only_new_rows_and_counts():
+    def lower(table):
+        return table.set_column(0, 'account', pa.array([value.lower() for value in table.column(0).to_pylist()]))
+    lower.state = {'errors': 0}
+
+    delta = delta_transform(lower, stored_snapshot())
+    out = delta(pa.table({'account': ['A', 'B', 'E'], 'proposal': [1, 1, 1], 'votes': [10, 99, 5]}))
+    assert out.column('account').to_pylist() == ['e']
+    assert delta(pa.table({'account': pa.array([], pa.string()), 'proposal': pa.array([], pa.int64()),
+                           'votes': pa.array([], pa.int64())})).num_rows == 0
+    assert delta.state == {'errors': 0, 'new': 1, 'unchanged': 1, 'conflicting': 1}
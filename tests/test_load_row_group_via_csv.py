@@ -0,0 +1,52 @@
+import os
+import sys
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import import_proxy_sds_calibrated_unified
+import import_sds_unified_parquet
+from parquet_ingest import get_table_config, open_account_parquet, read_account_row_group
+
+
+class CapturingCursor:
+    """Records the temp CSV handed to LOAD DATA instead of talking to MySQL"""
+
+    def __init__(self):
+        self.csv = None
+
+    def execute(self, query):
+        path = query.split("LOAD DATA LOCAL INFILE '")[1].split("'")[0]
+        with open(path) as f:
+            self.csv = f.read()
+
+
+@pytest.mark.parametrize("module", [import_sds_unified_parquet, import_proxy_sds_calibrated_unified])
+def test_null_in_dictionary_column_is_loaded(tmp_path, module):
+    config = get_table_config('account_voted', module.TABLE_VARIANT)
+    parquet_file = str(tmp_path / "accounts.parquet")
+    pq.write_table(pa.table({
+        'account_hash_key': ['a1', 'a2', 'a3'],
+        'proposal_master_skey': [1, 1, 2],
+        'director_master_skey': [-1, -1, 5],
+        'account_type': ['I', None, 'R'],
+        'shares_summable': [10.0, None, 3.5],
+        'rank_of_shareholding': [1, 2, 3],
+        config['score_field']: [0.5, 0.25, None],
+        config['prediction_field']: [1, 0, 1],
+        'Target_encoded': [0, 1, 0],
+    }), parquet_file)
+
+    pf = open_account_parquet(parquet_file)
+    df = read_account_row_group(pf, 0, config).to_pandas()
+    assert isinstance(df['account_type'].dtype, pd.CategoricalDtype)
+
+    cursor = CapturingCursor()
+    assert module.load_row_group_via_csv(cursor, df, 'account_voted', config) == 3
+    lines = cursor.csv.splitlines()
+    assert len(lines) == 3
+    assert '"a2"' in lines[1] and '""' in lines[1]
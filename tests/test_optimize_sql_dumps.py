@@ -0,0 +1,51 @@
+import gzip
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "docker"))
+
+from optimize_sql_dumps import optimize_sql_dump, optimize_sql_dump_parallel, rewrite_chunk
+
+
+def write_dump(path):
+    lines = ["-- dump header\n", "SET NAMES utf8mb4;\n"]
+    for table, count in (("alpha", 250), ("beta", 120)):
+        lines.append(f"CREATE TABLE `{table}` (id INT);\n")
+        lines.extend(f"INSERT INTO `{table}` VALUES ({i},'{table} {i}');\n" for i in range(count))
+        lines.append("UNLOCK TABLES;\n")
+    path.write_text("".join(lines))
+
+
+def rows_and_statements(text):
+    """VALUES rows in output order, and every other line (bulk INSERT headers left out)"""
+    rows, other = [], []
+    for line in text.splitlines():
+        if line.startswith("(") and line.endswith((",", ";")):
+            rows.append(line[:-1])
+        elif not line.startswith("INSERT INTO"):
+            other.append(line)
+    return rows, other
+
+
+def test_rewrite_chunk_batches_rows_in_order():
+    data = b"".join(f"INSERT INTO `t` VALUES ({i});\r\n".encode() for i in range(5)) + b"DROP TABLE x;\r\n"
+    output, lines, inserts = rewrite_chunk(data, 2, None)
+    assert (lines, inserts) == (6, 5)
+    assert output.decode() == ("INSERT INTO `t` VALUES\n(0),\n(1);\n"
+                               "INSERT INTO `t` VALUES\n(2),\n(3);\n"
+                               "INSERT INTO `t` VALUES\n(4);\n"
+                               "DROP TABLE x;\n")
+
+
+def test_parallel_chunks_are_written_in_input_order(tmp_path):
+    dump = tmp_path / "dump.sql"
+    write_dump(dump)
+    optimize_sql_dump(dump, tmp_path / "sequential.sql", batch_size=50)
+    # Tiny chunks: many more chunks than workers, finishing out of order
+    optimize_sql_dump_parallel(dump, tmp_path / "parallel.sql.gz", batch_size=50, workers=3, chunk_bytes=512)
+
+    with gzip.open(tmp_path / "parallel.sql.gz", "rt", encoding="utf-8") as f:
+        parallel = f.read()
+    sequential = (tmp_path / "sequential.sql").read_text()
+    assert rows_and_statements(parallel) == rows_and_statements(sequential)
+    assert len(rows_and_statements(parallel)[0]) == 370
@@ -0,0 +1,41 @@
+import os
+import sys
+
+import numpy as np
+import pyarrow as pa
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ingest_pipeline import partition_index, split_by_partition
+
+HASH_SCHEME = {'method': 'HASH', 'names': ['p0', 'p1', 'p2', 'p3'], 'bounds': None}
+RANGE_SCHEME = {'method': 'RANGE', 'names': ['low', 'mid', 'high'], 'bounds': [10, 20, None]}
+
+
+def test_hash_index_uses_mysql_remainder():
+    values = pa.array([0, 1, 5, -5, -4, 7, None], pa.int64())
+    # MySQL: ABS(MOD(value, 4)), MOD truncating toward zero; NULL goes to partition 0
+    assert partition_index(values, HASH_SCHEME).tolist() == [0, 1, 1, 1, 0, 3, 0]
+
+
+def test_range_index_uses_less_than_bounds():
+    values = pa.array([-3, 9, 10, 19, 20, 10 ** 9], pa.int64())
+    assert partition_index(values, RANGE_SCHEME).tolist() == [0, 0, 1, 1, 2, 2]
+
+
+def test_split_keeps_row_order_within_each_partition():
+    skeys = [7, 2, 4, 3, 8, 1, 6, 11]
+    table = pa.table({'proposal_master_skey': skeys, 'id': np.arange(len(skeys))})
+    pieces = split_by_partition(table, HASH_SCHEME, [0, 3, 2])
+
+    assert sorted(pieces) == [0, 2, 3]
+    assert pieces[0].column('proposal_master_skey').to_pylist() == [4, 8]
+    assert pieces[2].column('proposal_master_skey').to_pylist() == [2, 6]
+    assert pieces[3].column('proposal_master_skey').to_pylist() == [7, 3, 11]
+    # Partition 1 was not asked for; every other row lands in exactly one piece
+    assert sum(piece.num_rows for piece in pieces.values()) == len(skeys) - 1
+
+
+def test_split_omits_empty_partitions():
+    table = pa.table({'proposal_master_skey': [12, 15], 'id': [0, 1]})
+    assert list(split_by_partition(table, RANGE_SCHEME, [0, 1, 2])) == [1]
@@ -0,0 +1,78 @@
+import os
+import sys
+
+import pyarrow as pa
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import source_cache
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    path = tmp_path / "cache"
+    monkeypatch.setattr(source_cache, "CACHE_DIR", str(path))
+    monkeypatch.setattr(source_cache, "CACHE_BUDGET_MB", 1)
+    return path
+
+
+def read(path, calls, value=1):
+    """Batches of path through the cache, counting the parses"""
+    def parse():
+        calls.append(path)
+        yield pa.table({'value': [value] * 10})
+    return pa.concat_tables(source_cache.cached_batches(str(path), 'csv', {'delimiter': ','}, parse, 4))
+
+
+def test_second_read_comes_from_cache(tmp_path, cache_dir):
+    source = tmp_path / "a.csv"
+    source.write_text("value\n1\n")
+    calls = []
+    assert read(source, calls).num_rows == 10
+    assert read(source, calls).column('value').to_pylist() == [1] * 10
+    assert len(calls) == 1
+    assert len(source_cache.cache_entries()) == 1
+
+
+def test_changed_source_or_options_miss(tmp_path, cache_dir):
+    source = tmp_path / "a.csv"
+    source.write_text("value\n1\n")
+    key = source_cache.cache_key(str(source), 'csv', {'delimiter': ','})
+    assert source_cache.cache_key(str(source), 'csv', {'delimiter': ';'}) != key
+    assert source_cache.cache_key(str(source), 'excel', {'delimiter': ','}) != key
+
+    calls = []
+    read(source, calls)
+    source.write_text("value\n1\n2\n")
+    assert source_cache.cache_key(str(source), 'csv', {'delimiter': ','}) != key
+    assert read(source, calls, value=2).column('value').to_pylist() == [2] * 10
+    assert len(calls) == 2
+
+
+def test_evict_removes_least_recently_used_and_stale_temp_files(cache_dir):
+    cache_dir.mkdir()
+    for age, name in enumerate(['newest', 'middle', 'oldest']):
+        path = cache_dir / (name + source_cache.CACHE_SUFFIX)
+        path.write_bytes(b'x' * 100)
+        os.utime(path, (1000 - age, 1000 - age))
+    dead = cache_dir / f"partial{source_cache.CACHE_SUFFIX}.999999999{source_cache.TEMP_SUFFIX}"
+    dead.write_bytes(b'x')
+    live = cache_dir / f"partial{source_cache.CACHE_SUFFIX}.{os.getpid()}{source_cache.TEMP_SUFFIX}"
+    live.write_bytes(b'x')
+
+    source_cache.evict(200, keep=str(cache_dir / ("oldest" + source_cache.CACHE_SUFFIX)))
+    assert sorted(os.listdir(cache_dir)) == sorted(['newest' + source_cache.CACHE_SUFFIX,
+                                                    'oldest' + source_cache.CACHE_SUFFIX, live.name])
+
+
+def test_unreadable_entry_is_dropped_and_parsed_again(tmp_path, cache_dir):
+    source = tmp_path / "a.csv"
+    source.write_text("value\n1\n")
+    calls = []
+    read(source, calls)
+    (entry, _, _), = source_cache.cache_entries()
+    with open(entry, 'wb') as f:
+        f.write(b'not arrow')
+    assert read(source, calls).num_rows == 10
+    assert len(calls) == 2